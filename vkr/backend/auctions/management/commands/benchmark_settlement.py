@@ -0,0 +1,83 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from auctions.models import Auction
+from auctions.settlement import settle_auction
+from lots.models import Lot
+from bids.models import Bid
+from users.models import User, Charity, Balance, LedgerEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет подведение итогов аукциона: создает синтетический аукцион, "
+        "считает SQL-запросы и время settle_auction, затем откатывает все изменения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lots', type=int, default=10000)
+        parser.add_argument('--bids-per-lot', type=int, default=2)
+        parser.add_argument('--bidders', type=int, default=500)
+        parser.add_argument('--unsold-every', type=int, default=10, help='Каждый N-й лот остается без ставок')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            auction = self._seed(options)
+            self.stdout.write(
+                f"Аукцион: {options['lots']} лотов, до {options['bids_per_lot']} ставок на лот, "
+                f"{options['bidders']} участников"
+            )
+
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                settled = settle_auction(auction)
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Лотов обработано: {settled}, SQL-запросов: {len(queries)}, время: {elapsed:.2f} с"
+            ))
+            transaction.set_rollback(True)
+
+    def _seed(self, options):
+        now = timezone.now()
+        suffix = int(time.time() * 1000)
+        owner = User.objects.create_user(email=f'bench-org-{suffix}@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email=f'bench-donor-{suffix}@example.com', role=User.DONOR)
+        charity = Charity.objects.get(user=owner)
+
+        bidders = User.objects.bulk_create([
+            User(email=f'bench-{suffix}-{i}@example.com', username=f'bench-{suffix}-{i}', role=User.BUYER)
+            for i in range(options['bidders'])
+        ])
+        Balance.objects.bulk_create([Balance(user=user, amount=Decimal('0.00')) for user in bidders])
+
+        auction = Auction.objects.create(
+            charity=charity, name='Benchmark', start_time=now - timedelta(days=1), end_time=now
+        )
+        lots = Lot.objects.bulk_create([
+            Lot(auction=auction, donor=donor, title=f'Лот {i}', starting_price=Decimal('100.00'),
+                status=Lot.STATUS_APPROVED)
+            for i in range(options['lots'])
+        ], batch_size=2000)
+
+        bids = []
+        ledger = []
+        for index, lot in enumerate(lots):
+            if options['unsold_every'] and index % options['unsold_every'] == 0:
+                continue
+            for step in range(options['bids_per_lot']):
+                user = bidders[(index + step) % len(bidders)]
+                amount = Decimal('100.00') + 10 * (step + 1)
+                bids.append(Bid(lot=lot, user=user, amount=amount))
+                ledger.append(LedgerEntry(user=user, lot=lot, kind=LedgerEntry.KIND_HOLD, amount=amount))
+                if step < options['bids_per_lot'] - 1:
+                    ledger.append(LedgerEntry(user=user, lot=lot, kind=LedgerEntry.KIND_RELEASE, amount=amount))
+        Bid.objects.bulk_create(bids, batch_size=5000)
+        LedgerEntry.objects.bulk_create(ledger, batch_size=5000)
+        return auction
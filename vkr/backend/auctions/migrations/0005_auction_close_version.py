@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0004_merge_0002_initial_0003_add_ticket_purchased_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='close_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
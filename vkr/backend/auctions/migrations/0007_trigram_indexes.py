@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:52
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0006_search_vector'),
+        ('users', '0005_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auction',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='auction_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0007_trigram_indexes'),
+        ('users', '0005_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['status', 'end_time'], name='auction_status_end_time_idx'),
+        ),
+    ]
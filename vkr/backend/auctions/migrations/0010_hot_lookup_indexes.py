@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_image_variants'),
+        ('lots', '0011_lot_import'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auctionevent',
+            index=models.Index(fields=['auction', '-created_at'], name='auction_event_feed_idx'),
+        ),
+    ]
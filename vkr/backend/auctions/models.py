@@ -1,5 +1,11 @@
-from django.db import models
-from users.models import User, Charity
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.utils import timezone
+from users.models import User, Charity, Subscription
+from core.search import document_vector
+from core.cache import bump
+from core.images import delete_variants, is_current, render_variants, schedule
 
 
 class Auction(models.Model):
@@ -17,15 +23,105 @@ class Auction(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='auctions/', null=True, blank=True)
+    # Размеры изображения и его уменьшенные копии (см. core.images)
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
     created_at = models.DateTimeField(auto_now_add=True)
     is_paid = models.BooleanField(default=False, verbose_name='Платный аукцион')
     ticket_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Цена билета')
+    # Версия расписания закрытия: задачи с устаревшей версией игнорируются
+    close_version = models.PositiveIntegerField(default=0)
+    # Полнотекстовый индекс по названию и описанию (см. core.search)
+    search_vector = models.GeneratedField(
+        expression=document_vector('name', 'description'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector']),
+            GinIndex(fields=['name'], name='auction_name_trgm', opclasses=['gin_trgm_ops']),
+            # Завершение аукционов по расписанию и лента завершающихся лотов
+            models.Index(fields=['status', 'end_time'], name='auction_status_end_time_idx'),
+        ]
     
     def __str__(self):
         return self.name
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._scheduled_state = (instance.__dict__.get('end_time'), instance.__dict__.get('status'))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # При создании аукциона, переносе end_time или повторной активации
+        # ставим новую задачу закрытия на end_time, а старые становятся устаревшими
+        adding = self._state.adding
+        reschedule = self.status == self.STATUS_ACTIVE and (
+            adding or getattr(self, '_scheduled_state', None) != (self.end_time, self.status)
+        )
+        if reschedule:
+            # Версия увеличивается в самом UPDATE: при одновременных сохранениях
+            # каждое получает свою версию, и в силе остается задача последнего
+            if adding:
+                self.close_version = 1
+            else:
+                self.close_version = models.F('close_version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'close_version'}
+        super().save(*args, **kwargs)
+        self._scheduled_state = (self.end_time, self.status)
+        if reschedule:
+            if not adding:
+                self.refresh_from_db(fields=['close_version'])
+            from .tasks import schedule_auction_close
+            auction_id, version, eta = self.pk, self.close_version, self.end_time
+            transaction.on_commit(lambda: schedule_auction_close(auction_id, version, eta))
+        # Варианты нового или замененного изображения создаются в фоне
+        if self.image and not is_current(self.image, self.image_variants):
+            from .tasks import generate_auction_image_variants
+            image_owner_id = self.pk
+            transaction.on_commit(lambda: schedule(generate_auction_image_variants, [image_owner_id]))
+    
+    def generate_image_variants(self, force=False):
+        """
+        Создает варианты изображения аукциона и сохраняет их описание.
+        Возвращает False, если варианты текущего файла уже есть.
+        """
+        if not self.image or (is_current(self.image, self.image_variants) and not force):
+            return False
+        if not is_current(self.image, self.image_variants):
+            delete_variants(self.image.storage, self.image_variants)
+        width, height, variants = render_variants(self.image)
+        # Если файл успели заменить, варианты создаст задача для нового файла
+        updated = Auction.objects.filter(pk=self.pk, image=self.image.name).update(
+            image_width=width, image_height=height, image_variants=variants
+        )
+        if updated:
+            self.image_width, self.image_height, self.image_variants = width, height, variants
+            bump('auctions', f'auction:{self.pk}')
+        return bool(updated)
+    
+    def admits_without_ticket(self, user):
+        """
+        Доступ к аукциону без билета: бесплатный аукцион, организация-владелец,
+        доноры и пользователи с действующей подпиской
+        """
+        if not self.is_paid:
+            return True
+        if self.charity.user_id == user.id or user.role == User.DONOR:
+            return True
+        return Subscription.objects.filter(user=user, is_active=True, end_date__gt=timezone.now()).exists()
+    
+    def has_access(self, user):
+        """Может ли пользователь следить за торгами аукциона"""
+        return self.admits_without_ticket(user) or self.tickets.filter(user=user).exists()
 
 
 class AuctionTicket(models.Model):
@@ -66,5 +162,11 @@ class AuctionEvent(models.Model):
     details = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Лента событий аукциона: фильтр по аукциону с сортировкой по времени
+            models.Index(fields=['auction', '-created_at'], name='auction_event_feed_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.get_event_type_display()} - {self.auction.name}"
@@ -1,19 +1,22 @@
 from rest_framework import serializers
 from .models import Auction, AuctionEvent, AuctionTicket
+from core.images import ImageVariantsField
 
 
 class AuctionSerializer(serializers.ModelSerializer):
     charity_name = serializers.ReadOnlyField(source='charity.name')
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image', 'image_variants')
     
     class Meta:
         model = Auction
         fields = [
             'id', 'charity', 'charity_name', 'name', 'description',
             'start_time', 'end_time', 'status', 'created_at', 'image', 'image_url',
-            'is_paid', 'ticket_price'
+            'image_width', 'image_height', 'image_variants', 'is_paid', 'ticket_price'
         ]
-        read_only_fields = ['created_at']
+        read_only_fields = ['created_at', 'image_width', 'image_height']
+        select_related = ['charity']
         
     def get_image_url(self, obj):
         if obj.image:
@@ -35,6 +38,7 @@ class AuctionTicketSerializer(serializers.ModelSerializer):
             'purchase_date', 'is_used'
         ]
         read_only_fields = ['purchase_date', 'is_used']
+        select_related = ['user', 'auction']
 
 
 class AuctionEventSerializer(serializers.ModelSerializer):
@@ -49,3 +53,4 @@ class AuctionEventSerializer(serializers.ModelSerializer):
             'event_type', 'event_type_display', 'details', 'created_at'
         ]
         read_only_fields = ['created_at']
+        select_related = ['auction', 'lot']
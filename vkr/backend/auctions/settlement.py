@@ -0,0 +1,253 @@
+"""
+Подведение итогов аукциона набором запросов, число которых не зависит
+от количества лотов и ставок в аукционе.
+"""
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, When
+from django.utils import timezone
+
+from .models import Auction, AuctionEvent
+from lots.models import Lot
+from lots.feeds import invalidate_ending_soon
+from bids.models import Bid, Transaction
+from users.models import Notification, Balance, LedgerEntry
+from core.locks import advisory_lock
+from core.cache import bump
+from core.streams import publish, auction_channel, lot_channel
+
+
+def settle_auction(auction):
+    """
+    Подводит итоги всех необработанных лотов аукциона и завершает его.
+    Пока итоги подводит один воркер, остальные сразу получают 0 и не ждут
+    блокировки; строка аукциона дополнительно блокируется, поэтому
+    аукцион завершается ровно один раз.
+    """
+    with advisory_lock(f"settlement:auction:{auction.pk}") as acquired:
+        if not acquired:
+            return 0
+        with transaction.atomic():
+            if not Auction.objects.select_for_update().filter(pk=auction.pk, status=Auction.STATUS_ACTIVE).exists():
+                return 0
+            settled = settle_lots(auction)
+            complete_auction(auction)
+    return settled
+
+
+def settle_lots(auction, lot_ids=None, skip_locked=False):
+    """
+    Подводит итоги необработанных лотов аукциона (или переданного подмножества лотов):
+    - победители определяются одним запросом DISTINCT ON по лоту;
+    - итоги лотов записываются двумя UPDATE (проданные и непроданные);
+    - неизрасходованные удержания проигравших возвращаются одним UPDATE;
+    - транзакции, события и уведомления создаются через bulk_create.
+    Вместе с результатом каждому лоту проставляется settled_at, поэтому после
+    сбоя повторный запуск обрабатывает только оставшиеся лоты.
+    С skip_locked лоты, которые сейчас обрабатывает другой воркер, пропускаются.
+    Возвращает количество обработанных лотов.
+    """
+    with transaction.atomic():
+        # Строки лотов блокируются: если ту же часть лотов обрабатывают две задачи,
+        # вторая не увидит уже обработанных лотов
+        lots = Lot.objects.select_for_update(skip_locked=skip_locked).filter(
+            auction=auction, status=Lot.STATUS_APPROVED, settled_at__isnull=True
+        )
+        if lot_ids is not None:
+            lots = lots.filter(id__in=lot_ids)
+        lots = list(lots.order_by('id'))
+        if not lots:
+            return 0
+        lot_ids = [lot.id for lot in lots]
+
+        winning_bids = {
+            bid.lot_id: bid
+            for bid in Bid.objects.filter(lot_id__in=lot_ids)
+            .select_related('user')
+            .order_by('lot_id', '-amount', 'created_at')
+            .distinct('lot_id')
+        }
+
+        sold_lot_ids = []
+        unsold_lot_ids = []
+        transactions = []
+        captures = []
+        events = []
+        notifications = []
+
+        for lot in lots:
+            winning_bid = winning_bids.get(lot.id)
+            if winning_bid:
+                sold_lot_ids.append(lot.id)
+
+                transactions.append(Transaction(
+                    user_id=winning_bid.user_id,
+                    lot=lot,
+                    amount=winning_bid.amount,
+                    status=Transaction.STATUS_COMPLETED,
+                    payment_method='balance'
+                ))
+                # Удержанная ставка победителя списывается окончательно
+                captures.append(LedgerEntry(
+                    user_id=winning_bid.user_id,
+                    kind=LedgerEntry.KIND_CAPTURE,
+                    amount=winning_bid.amount,
+                    lot=lot
+                ))
+                notifications.append(Notification(
+                    user_id=winning_bid.user_id,
+                    subject="Вы выиграли лот!",
+                    message=f"Поздравляем! Вы выиграли лот '{lot.title}' за {winning_bid.amount} руб. "
+                            f"Деньги были списаны с вашего баланса."
+                ))
+                notifications.append(Notification(
+                    user_id=lot.donor_id,
+                    subject="Ваш лот выигран!",
+                    message=f"Ваш лот '{lot.title}' был выигран пользователем {winning_bid.user.username} "
+                            f"за {winning_bid.amount} руб."
+                ))
+                events.append(AuctionEvent(
+                    auction=auction,
+                    lot=lot,
+                    event_type=AuctionEvent.EVENT_LOT_SOLD,
+                    details=f"Лот '{lot.title}' продан пользователю {winning_bid.user.username} за {winning_bid.amount} руб."
+                ))
+            else:
+                unsold_lot_ids.append(lot.id)
+                events.append(AuctionEvent(
+                    auction=auction,
+                    lot=lot,
+                    event_type=AuctionEvent.EVENT_LOT_CANCELLED,
+                    details=f"Лот '{lot.title}' не был продан из-за отсутствия ставок."
+                ))
+                notifications.append(Notification(
+                    user_id=lot.donor_id,
+                    subject="Лот не продан",
+                    message=f"К сожалению, ваш лот '{lot.title}' не был продан. "
+                            f"На него не было сделано ни одной ставки."
+                ))
+
+        # Победитель и сумма проставляются одним UPDATE с коррелированным подзапросом
+        # по тому же порядку ставок, что и в DISTINCT ON выше
+        settled_at = timezone.now()
+        if sold_lot_ids:
+            top_bid = Bid.objects.filter(lot=OuterRef('pk')).order_by('-amount', 'created_at')
+            Lot.objects.filter(id__in=sold_lot_ids).update(
+                status=Lot.STATUS_SOLD,
+                winner=Subquery(top_bid.values('user')[:1]),
+                winning_bid_amount=Subquery(top_bid.values('amount')[:1]),
+                settled_at=settled_at,
+            )
+        if unsold_lot_ids:
+            Lot.objects.filter(id__in=unsold_lot_ids).update(status=Lot.STATUS_NOT_SOLD, settled_at=settled_at)
+        # UPDATE не отправляет сигналов: кэш ответов по этим лотам сбрасывается явно
+        bump('lots', f'auction:{auction.pk}', *(f'lot:{lot_id}' for lot_id in lot_ids))
+
+        # Транзакция, уже созданная для пары лот-покупатель, не дублируется
+        Transaction.objects.bulk_create(transactions, ignore_conflicts=True)
+        LedgerEntry.objects.bulk_create(captures)
+
+        lots_by_id = {lot.id: lot for lot in lots}
+        refunds = _collect_refunds(lots_by_id, winning_bids)
+        Balance.credit_many(refunds)
+
+        refunded = {(entry.user_id, entry.lot_id): entry.amount for entry in refunds}
+        losers = (
+            Bid.objects.filter(lot_id__in=lot_ids)
+            .exclude(user_id=F('lot__winner_id'))
+            .values_list('lot_id', 'user_id')
+            .order_by()
+            .distinct()
+        )
+        for lot_id, user_id in losers:
+            lot = lots_by_id[lot_id]
+            message = f"Ваша ставка на лот '{lot.title}' не выиграла."
+            if (user_id, lot_id) in refunded:
+                message += f" Средства в размере {refunded[(user_id, lot_id)]} руб. возвращены на ваш баланс."
+            else:
+                message += " Удержанные средства были возвращены на ваш баланс, когда ставку перебили."
+            notifications.append(Notification(
+                user_id=user_id,
+                subject="Ставка не выиграла",
+                message=message
+            ))
+
+        AuctionEvent.objects.bulk_create(events)
+        Notification.objects.bulk_create(notifications)
+
+        for lot_id in sold_lot_ids:
+            winning_bid = winning_bids[lot_id]
+            publish([auction_channel(auction.pk), lot_channel(lot_id)], 'lot_sold', {
+                'lot': lot_id,
+                'auction': auction.pk,
+                'winner': winning_bid.user_id,
+                'winner_username': winning_bid.user.username,
+                'amount': winning_bid.amount,
+            })
+
+    return len(lots)
+
+
+def _collect_refunds(lots_by_id, winning_bids):
+    """
+    Возвраты считаются по журналу операций: удержания за вычетом уже выполненных
+    возвратов. Перебитые ставки возвращаются сразу при перебитии, поэтому здесь
+    возвращается только то, что осталось удержанным, кроме выигравшей ставки.
+    """
+    outstanding = (
+        LedgerEntry.objects.filter(
+            lot_id__in=list(lots_by_id),
+            kind__in=[LedgerEntry.KIND_HOLD, LedgerEntry.KIND_RELEASE, LedgerEntry.KIND_REFUND],
+        )
+        .values('user_id', 'lot_id')
+        .order_by()
+        .annotate(held=Sum(Case(
+            When(kind=LedgerEntry.KIND_HOLD, then=F('amount')),
+            default=-F('amount'),
+        )))
+    )
+    refunds = []
+    for row in outstanding:
+        held = row['held']
+        winning_bid = winning_bids.get(row['lot_id'])
+        if winning_bid and winning_bid.user_id == row['user_id']:
+            held -= winning_bid.amount
+        if held > 0:
+            refunds.append(LedgerEntry(
+                user_id=row['user_id'],
+                kind=LedgerEntry.KIND_REFUND,
+                amount=held,
+                lot=lots_by_id[row['lot_id']]
+            ))
+    return refunds
+
+
+def lot_chunks(auction, chunk_size):
+    """Разбивает необработанные лоты аукциона на части по chunk_size идентификаторов"""
+    lot_ids = list(
+        Lot.objects.filter(auction=auction, status=Lot.STATUS_APPROVED, settled_at__isnull=True)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    return [lot_ids[i:i + chunk_size] for i in range(0, len(lot_ids), chunk_size)]
+
+
+def complete_auction(auction):
+    """Переводит аукцион в статус завершенного и уведомляет организацию"""
+    Auction.objects.filter(pk=auction.pk).update(status=Auction.STATUS_COMPLETED)
+    auction.status = Auction.STATUS_COMPLETED
+    transaction.on_commit(invalidate_ending_soon)
+    bump('auctions', f'auction:{auction.pk}')
+
+    AuctionEvent.objects.create(
+        auction=auction,
+        event_type=AuctionEvent.EVENT_AUCTION_ENDED,
+        details=f"Аукцион '{auction.name}' завершен"
+    )
+
+    Notification.objects.create(
+        user_id=auction.charity.user_id,
+        subject="Аукцион завершен",
+        message=f"Ваш аукцион '{auction.name}' успешно завершен."
+    )
+
+    publish([auction_channel(auction.pk)], 'auction_ended', {'auction': auction.pk})
@@ -1,125 +1,149 @@
-from celery import shared_task
+import logging
+
+from celery import chain, chord, shared_task
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Max, OuterRef, Subquery
-from django.db import transaction
 
-from .models import Auction, AuctionEvent
+from .models import Auction
+from .settlement import settle_auction, settle_lots, lot_chunks
 from lots.models import Lot
-from bids.models import Bid, Transaction
-from users.models import Notification, Balance
+from bids.models import Bid
+from users.models import Notification
+from core.locks import advisory_lock
 
 
 @shared_task
 def process_completed_auctions():
     """
-    Задача для обработки завершенных аукционов:
-    - Находит аукционы, которые только что завершились
-    - Определяет победителей для каждого лота
-    - Создает транзакции и уведомления
+    Задача-координатор для обработки завершенных аукционов:
+    - Находит аукционы, у которых наступил end_time
+    - Ставит для каждого отдельную задачу settle_auction_task
+    Итоги аукционов подводятся параллельно на всех воркерах, поэтому время
+    работы координатора не зависит от числа аукционов и лотов.
+    Аукционы закрываются задачами close_auction точно в end_time, эта задача
+    остается редкой страховкой на случай потерянных задач.
     """
     now = timezone.now()
-    completed_auctions = Auction.objects.filter(
+    auction_ids = list(Auction.objects.filter(
         end_time__lte=now,
         status='active'
-    )
+    ).values_list('id', flat=True))
     
-    if not completed_auctions.exists():
+    if not auction_ids:
         return "No auctions to process"
     
-    processed_auctions = 0
-    processed_lots = 0
+    for auction_id in auction_ids:
+        try:
+            settle_auction_task.delay(auction_id)
+        except Exception as e:
+            logging.error(f"Не удалось поставить подведение итогов аукциона {auction_id}: {e}")
+            settle_auction(Auction.objects.select_related('charity').get(pk=auction_id))
     
-    for auction in completed_auctions:
-        with transaction.atomic():
-            auction.status = 'completed'
-            auction.save()
-
-            AuctionEvent.objects.create(
-                auction=auction,
-                event_type='auction_ended',
-                details=f"Аукцион '{auction.name}' завершен"
-            )
-
-            Notification.objects.create(
-                user=auction.charity.user,
-                subject="Аукцион завершен",
-                message=f"Ваш аукцион '{auction.name}' успешно завершен."
-            )
-
-            lots = Lot.objects.filter(auction=auction, status='approved')
-            
-            for lot in lots:
-                winning_bid = Bid.objects.filter(lot=lot).order_by('-amount').first()
-                
-                if winning_bid:
-                    lot.status = Lot.STATUS_SOLD
-                    lot.winner = winning_bid.user
-                    lot.winning_bid_amount = winning_bid.amount
-                    lot.save()
-
-                    transaction_obj = Transaction.objects.create(
-                        user=winning_bid.user,
-                        lot=lot,
-                        amount=winning_bid.amount,
-                        status='completed',
-                        payment_method='balance'
-                    )
-
-                    Notification.objects.create(
-                        user=winning_bid.user,
-                        subject="Вы выиграли лот!",
-                        message=f"Поздравляем! Вы выиграли лот '{lot.title}' за {winning_bid.amount} руб. "
-                                f"Деньги были списаны с вашего баланса."
-                    )
-
-                    Notification.objects.create(
-                        user=lot.donor,
-                        subject="Ваш лот выигран!",
-                        message=f"Ваш лот '{lot.title}' был выигран пользователем {winning_bid.user.username} "
-                                f"за {winning_bid.amount} руб."
-                    )
-                    
-                    AuctionEvent.objects.create(
-                        auction=auction,
-                        lot=lot,
-                        event_type='lot_sold',
-                        details=f"Лот '{lot.title}' продан пользователю {winning_bid.user.username} за {winning_bid.amount} руб."
-                    )
-
-                    other_bids = Bid.objects.filter(lot=lot).exclude(id=winning_bid.id)
-                    for bid in other_bids:
-                        user_balance = Balance.objects.get(user=bid.user)
-                        user_balance.top_up(bid.amount)
-
-                        Notification.objects.create(
-                            user=bid.user,
-                            subject="Ставка не выиграла",
-                            message=f"Ваша ставка на лот '{lot.title}' не выиграла. "
-                                    f"Средства в размере {bid.amount} руб. возвращены на ваш баланс."
-                        )
-                else:
-                    lot.status = Lot.STATUS_NOT_SOLD
-                    lot.save()
-
-                    AuctionEvent.objects.create(
-                        auction=auction,
-                        lot=lot,
-                        event_type='lot_cancelled',
-                        details=f"Лот '{lot.title}' не был продан из-за отсутствия ставок."
-                    )
-
-                    Notification.objects.create(
-                        user=lot.donor,
-                        subject="Лот не продан",
-                        message=f"К сожалению, ваш лот '{lot.title}' не был продан. "
-                                f"На него не было сделано ни одной ставки."
-                    )
-                
-                processed_lots += 1
+    return f"Dispatched {len(auction_ids)} auctions"
+
+
+def dispatch_settlement(auction):
+    """
+    Подводит итоги аукциона. Небольшие аукционы обрабатываются сразу,
+    крупные делятся на части по SETTLEMENT_CHUNK_SIZE лотов, которые
+    обрабатываются параллельно (chord), после чего аукцион завершается.
+    Если бэкенд результатов не поддерживает chord (например, rpc://),
+    части выполняются цепочкой задач: каждая укладывается в лимит времени,
+    но обрабатываются они последовательно.
+    Части строятся только из лотов без settled_at, поэтому повторный запуск
+    после сбоя продолжает подведение итогов с того места, где оно прервалось.
+    """
+    with advisory_lock(f"settlement:dispatch:{auction.id}") as acquired:
+        if not acquired:
+            return f"Settlement of auction {auction.id} is already being dispatched"
         
-        processed_auctions += 1
+        chunks = lot_chunks(auction, settings.SETTLEMENT_CHUNK_SIZE)
+        if len(chunks) <= 1:
+            settled = settle_auction(auction)
+            return f"Processed auction {auction.id} with {settled} lots"
+        
+        header = [settle_lot_chunk.si(auction.id, lot_ids) for lot_ids in chunks]
+        finish = finish_auction_settlement.si(auction.id)
+        try:
+            chord(header)(finish)
+        except NotImplementedError:
+            chain(*header, finish).apply_async()
+    
+    return f"Dispatched auction {auction.id} in {len(chunks)} chunks"
+
+
+@shared_task
+def settle_auction_task(auction_id):
+    """Подведение итогов одного аукциона"""
+    try:
+        auction = Auction.objects.select_related('charity').get(pk=auction_id)
+    except Auction.DoesNotExist:
+        return "Auction not found"
     
-    return f"Processed {processed_auctions} auctions and {processed_lots} lots"
+    if auction.status != 'active':
+        return "Auction is not active"
+    
+    return dispatch_settlement(auction)
+
+
+@shared_task
+def settle_lot_chunk(auction_id, lot_ids):
+    """
+    Подведение итогов части лотов аукциона. Лоты, которые уже обработаны
+    или прямо сейчас обрабатываются другим воркером, пропускаются.
+    """
+    auction = Auction.objects.get(pk=auction_id)
+    if auction.status != 'active':
+        return 0
+    return settle_lots(auction, lot_ids, skip_locked=True)
+
+
+@shared_task
+def finish_auction_settlement(auction_id):
+    """
+    Завершающий шаг после обработки всех частей: подводит итоги лотов,
+    которые остались необработанными (например, после сбоя воркера),
+    и переводит аукцион в статус завершенного.
+    """
+    auction = Auction.objects.select_related('charity').get(pk=auction_id)
+    settled = settle_auction(auction)
+    return f"Completed auction {auction_id} with {settled} remaining lots"
+
+
+def schedule_auction_close(auction_id, close_version, end_time):
+    """
+    Ставит задачу закрытия аукциона точно на end_time. Если брокер недоступен,
+    аукцион закроет периодическая задача process_completed_auctions.
+    """
+    try:
+        close_auction.apply_async(args=(auction_id, close_version), eta=end_time)
+    except Exception as e:
+        logging.error(f"Не удалось запланировать закрытие аукциона {auction_id}: {e}")
+
+
+@shared_task
+def close_auction(auction_id, close_version):
+    """
+    Задача закрытия одного аукциона в момент его end_time.
+    Задачи, поставленные до переноса end_time, отбрасываются по close_version.
+    """
+    try:
+        auction = Auction.objects.select_related('charity').get(pk=auction_id)
+    except Auction.DoesNotExist:
+        return "Auction not found"
+    
+    if auction.close_version != close_version:
+        return "Stale close task"
+    
+    if auction.status != 'active':
+        return "Auction is not active"
+    
+    if auction.end_time > timezone.now():
+        # Задача пришла раньше срока (например, из-за расхождения часов)
+        schedule_auction_close(auction.id, close_version, auction.end_time)
+        return "Close rescheduled"
+    
+    return dispatch_settlement(auction)
 
 
 @shared_task
@@ -130,27 +154,45 @@ def check_auctions_ending_soon():
     now = timezone.now()
     ending_soon = now + timezone.timedelta(hours=24)
 
-    auctions = Auction.objects.filter(
-        end_time__range=(now, ending_soon),
-        status='active'
+    # Пары (участник, лот) одним запросом: аукционы выбираются по индексу (status, end_time)
+    pairs = (
+        Bid.objects
+        .filter(
+            lot__auction__status=Auction.STATUS_ACTIVE,
+            lot__auction__end_time__range=(now, ending_soon),
+            lot__status=Lot.STATUS_APPROVED,
+        )
+        .values_list('user_id', 'lot_id', 'lot__title', 'lot__auction_id', 'lot__auction__name')
+        .distinct()
     )
     
-    for auction in auctions:
-        lots_with_bids = Lot.objects.filter(
-            auction=auction,
-            status='approved',
-            bids__isnull=False
-        ).distinct()
-        
-        for lot in lots_with_bids:
-            bidders = Bid.objects.filter(lot=lot).values_list('user', flat=True).distinct()
-
-            for bidder_id in bidders:
-                Notification.objects.create(
-                    user_id=bidder_id,
-                    subject="Аукцион скоро завершится",
-                    message=f"Аукцион '{auction.name}' с лотом '{lot.title}', на который вы сделали ставку, "
-                            f"завершится через 24 часа или менее."
-                )
+    notifications = []
+    auction_ids = set()
+    for bidder_id, _, lot_title, auction_id, auction_name in pairs:
+        auction_ids.add(auction_id)
+        notifications.append(Notification(
+            user_id=bidder_id,
+            subject="Аукцион скоро завершится",
+            message=f"Аукцион '{auction_name}' с лотом '{lot_title}', на который вы сделали ставку, "
+                    f"завершится через 24 часа или менее."
+        ))
+    Notification.objects.bulk_create(notifications)
+    
+    return f"Sent notifications for {len(auction_ids)} auctions ending soon"
+
+
+@shared_task
+def generate_auction_image_variants(auction_ids, force=False):
+    """
+    Задача для создания вариантов изображений аукционов: после загрузки
+    или пачкой при заполнении вариантов уже загруженных изображений
+    """
+    created = 0
+    for auction in Auction.objects.filter(pk__in=auction_ids):
+        try:
+            created += auction.generate_image_variants(force=force)
+        except (OSError, ValueError) as e:
+            # Поврежденный файл не останавливает обработку пачки
+            logging.error(f"Не удалось создать варианты изображения аукциона {auction.pk}: {e}")
     
-    return f"Sent notifications for {auctions.count()} auctions ending soon"
+    return f"Created image variants for {created} of {len(auction_ids)} auctions"
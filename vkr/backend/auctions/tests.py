@@ -1,3 +1,378 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from celery.backends.rpc import RPCBackend
+from celery.contrib.testing.worker import start_worker
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bids.models import Bid, Transaction
+from lots.models import Lot
+from users.models import User, Balance, LedgerEntry, Notification
+from backend.celery import app as celery_app
+from .models import Auction, AuctionEvent
+from .settlement import settle_auction, settle_lots, lot_chunks
+from .tasks import check_auctions_ending_soon, close_auction, settle_auction_task
+
+
+class SettlementResultTest(TestCase):
+    """
+    Итоги лотов: победитель и сумма по наибольшей ставке (при равных суммах —
+    по более ранней), транзакции победителей и возвраты проигравшим по журналу.
+    """
+    START_BALANCE = Decimal('1000.00')
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        self.donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now() - timedelta(hours=1),
+            end_time=timezone.now() - timedelta(seconds=1),
+        )
+        self.tied, self.outbid, self.empty = [
+            Lot.objects.create(
+                auction=self.auction, donor=self.donor, title=f'Лот {i}',
+                starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+            )
+            for i in range(3)
+        ]
+        self.first, self.second, self.third = [
+            User.objects.create_user(email=f'buyer{i}@example.com', role=User.BUYER)
+            for i in range(3)
+        ]
+        for buyer in (self.first, self.second, self.third):
+            Balance.credit(buyer.id, self.START_BALANCE, LedgerEntry.KIND_TOP_UP)
+
+        now = timezone.now()
+        # Равные ставки: более поздняя создана раньше, победитель определяется по времени, а не по id
+        self._bid(self.second, self.tied, '50.00', now - timedelta(minutes=1))
+        self._bid(self.first, self.tied, '50.00', now - timedelta(minutes=2))
+        # Перебитая ставка third уже возвращена, удержание first осталось невозвращенным
+        self._bid(self.third, self.outbid, '40.00', now - timedelta(minutes=3))
+        Balance.credit(self.third.id, Decimal('40.00'), LedgerEntry.KIND_RELEASE, lot=self.outbid)
+        self._bid(self.first, self.outbid, '30.00', now - timedelta(minutes=4))
+        self._bid(self.second, self.outbid, '60.00', now - timedelta(minutes=2))
+
+    def _bid(self, buyer, lot, amount, created_at):
+        bid = Bid.objects.create(lot=lot, user=buyer, amount=Decimal(amount))
+        Bid.objects.filter(pk=bid.pk).update(created_at=created_at)
+        Balance.debit(buyer.id, Decimal(amount), LedgerEntry.KIND_HOLD, lot=lot)
+
+    def _entries(self, kind):
+        return set(
+            LedgerEntry.objects.filter(kind=kind).values_list('user_id', 'lot_id', 'amount')
+        )
+
+    def test_winners_transactions_and_refunds(self):
+        self.assertEqual(settle_auction(self.auction), 3)
+
+        self.tied.refresh_from_db()
+        self.outbid.refresh_from_db()
+        self.assertEqual(
+            (self.tied.status, self.tied.winner_id, self.tied.winning_bid_amount),
+            (Lot.STATUS_SOLD, self.first.id, Decimal('50.00')),
+        )
+        self.assertEqual(
+            (self.outbid.status, self.outbid.winner_id, self.outbid.winning_bid_amount),
+            (Lot.STATUS_SOLD, self.second.id, Decimal('60.00')),
+        )
+        self.assertEqual(
+            set(Transaction.objects.values_list('lot_id', 'user_id', 'amount', 'status')),
+            {
+                (self.tied.id, self.first.id, Decimal('50.00'), Transaction.STATUS_COMPLETED),
+                (self.outbid.id, self.second.id, Decimal('60.00'), Transaction.STATUS_COMPLETED),
+            },
+        )
+
+        self.assertEqual(self._entries(LedgerEntry.KIND_CAPTURE), {
+            (self.first.id, self.tied.id, Decimal('50.00')),
+            (self.second.id, self.outbid.id, Decimal('60.00')),
+        })
+        # Возвращается только то, что осталось удержанным; возвращенная ранее ставка не возвращается повторно
+        self.assertEqual(self._entries(LedgerEntry.KIND_REFUND), {
+            (self.second.id, self.tied.id, Decimal('50.00')),
+            (self.first.id, self.outbid.id, Decimal('30.00')),
+        })
+        expected = {
+            self.first: self.START_BALANCE - 50,
+            self.second: self.START_BALANCE - 60,
+            self.third: self.START_BALANCE,
+        }
+        for buyer, amount in expected.items():
+            self.assertEqual(Balance.objects.get(user=buyer).amount, amount, buyer.email)
+            self.assertEqual(LedgerEntry.balance_for(buyer.id), amount, buyer.email)
+
+    def test_lot_without_bids_is_not_sold(self):
+        settle_auction(self.auction)
+
+        self.empty.refresh_from_db()
+        self.assertEqual(
+            (self.empty.status, self.empty.winner_id, self.empty.winning_bid_amount),
+            (Lot.STATUS_NOT_SOLD, None, None),
+        )
+        self.assertIsNotNone(self.empty.settled_at)
+        self.assertFalse(Transaction.objects.filter(lot=self.empty).exists())
+        self.assertFalse(LedgerEntry.objects.filter(lot=self.empty).exists())
+        self.assertTrue(Notification.objects.filter(user=self.donor, subject="Лот не продан").exists())
+
+
+class SettlementIdempotencyTest(TestCase):
+    """
+    Повторное и прерванное подведение итогов: транзакции и возвраты
+    не дублируются, а повторный запуск продолжает с необработанных лотов.
+    """
+    START_BALANCE = Decimal('1000.00')
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        self.donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(hours=1),
+        )
+        self.lots = [
+            Lot.objects.create(
+                auction=self.auction, donor=self.donor, title=f'Лот {i}',
+                starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+            )
+            for i in range(4)
+        ]
+        self.buyers = [
+            User.objects.create_user(email=f'buyer{i}@example.com', role=User.BUYER)
+            for i in range(2)
+        ]
+        for buyer in self.buyers:
+            Balance.credit(buyer.id, self.START_BALANCE, LedgerEntry.KIND_TOP_UP)
+
+        # На первые три лота ставят оба покупателя, последний остается без ставок
+        for lot in self.lots[:3]:
+            self._place_bid(self.buyers[0], lot, 20)
+            self._place_bid(self.buyers[1], lot, 30)
+
+        Auction.objects.filter(pk=self.auction.pk).update(end_time=timezone.now() - timedelta(seconds=1))
+        self.auction.refresh_from_db()
+
+    def _place_bid(self, buyer, lot, amount):
+        client = APIClient()
+        client.force_authenticate(user=buyer)
+        response = client.post('/api/bids/', {'lot': lot.id, 'amount': amount}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def _assert_settled_once(self):
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.status, Auction.STATUS_COMPLETED)
+        self.assertFalse(Lot.objects.filter(auction=self.auction, settled_at__isnull=True).exists())
+        self.assertEqual(Transaction.objects.filter(lot__auction=self.auction).count(), 3)
+        self.assertEqual(LedgerEntry.objects.filter(kind=LedgerEntry.KIND_CAPTURE).count(), 3)
+
+        winner, loser = self.buyers[1], self.buyers[0]
+        self.assertEqual(Balance.objects.get(user=winner).amount, self.START_BALANCE - 90)
+        self.assertEqual(Balance.objects.get(user=loser).amount, self.START_BALANCE)
+        self.assertEqual(LedgerEntry.balance_for(winner.id), self.START_BALANCE - 90)
+        self.assertEqual(LedgerEntry.balance_for(loser.id), self.START_BALANCE)
+
+    def test_repeated_settlement_is_noop(self):
+        self.assertEqual(settle_auction(self.auction), 4)
+        self.assertEqual(settle_auction(self.auction), 0)
+        self.assertEqual(settle_lots(self.auction), 0)
+        self._assert_settled_once()
+
+    def test_interrupted_settlement_resumes_from_checkpoint(self):
+        first_chunk, *rest = lot_chunks(self.auction, 2)
+        self.assertEqual(settle_lots(self.auction, first_chunk), 2)
+
+        # Повторная доставка той же части ничего не меняет
+        self.assertEqual(settle_lots(self.auction, first_chunk, skip_locked=True), 0)
+        self.assertEqual(lot_chunks(self.auction, 2), rest)
+
+        self.assertEqual(settle_auction(self.auction), 2)
+        self._assert_settled_once()
+
+    def test_existing_transaction_is_not_duplicated(self):
+        winner = self.buyers[1]
+        Transaction.objects.create(user=winner, lot=self.lots[0], amount=Decimal('30.00'), payment_method='balance')
+
+        settle_auction(self.auction)
+
+        self.assertEqual(Transaction.objects.filter(lot=self.lots[0], user=winner).count(), 1)
+
+
+class AuctionCloseTaskTest(TestCase):
+    """Задача закрытия, поставленная до переноса end_time, ничего не делает"""
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now() - timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=1),
+        )
+        self.lot = Lot.objects.create(
+            auction=self.auction, donor=donor, title='Лот',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+
+    def test_stale_close_task_is_noop(self):
+        stale_version = self.auction.close_version
+        self.auction.end_time = timezone.now() - timedelta(seconds=1)
+        self.auction.save()
+        self.assertEqual(self.auction.close_version, stale_version + 1)
+
+        self.assertEqual(close_auction(self.auction.id, stale_version), "Stale close task")
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.status, Auction.STATUS_ACTIVE)
+        self.assertFalse(Lot.objects.filter(pk=self.lot.pk, settled_at__isnull=False).exists())
+
+        close_auction(self.auction.id, self.auction.close_version)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.status, Auction.STATUS_COMPLETED)
+        self.lot.refresh_from_db()
+        self.assertEqual(self.lot.status, Lot.STATUS_NOT_SOLD)
+
+    def test_concurrent_reschedules_get_distinct_versions(self):
+        first = Auction.objects.get(pk=self.auction.pk)
+        second = Auction.objects.get(pk=self.auction.pk)
+        first.end_time += timedelta(minutes=5)
+        second.end_time += timedelta(minutes=10)
+        first.save()
+        second.save()
+
+        self.assertEqual(
+            [first.close_version, second.close_version],
+            [self.auction.close_version + 1, self.auction.close_version + 2],
+        )
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.close_version, second.close_version)
+
+
+class SettlementFanOutMixin:
+    """Аукцион из пяти лотов, который подводится частями по два лота"""
+    LOTS = 5
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now() - timedelta(hours=1),
+            end_time=timezone.now() - timedelta(seconds=1),
+        )
+        self.lots = [
+            Lot.objects.create(
+                auction=self.auction, donor=donor, title=f'Лот {i}',
+                starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+            )
+            for i in range(self.LOTS)
+        ]
+        self.buyer = User.objects.create_user(email='buyer@example.com', role=User.BUYER)
+        Balance.credit(self.buyer.id, Decimal('1000.00'), LedgerEntry.KIND_TOP_UP)
+        # Ставки на все лоты, кроме последнего
+        for lot in self.lots[:-1]:
+            Bid.objects.create(lot=lot, user=self.buyer, amount=Decimal('20.00'))
+            Balance.debit(self.buyer.id, Decimal('20.00'), LedgerEntry.KIND_HOLD, lot=lot)
+
+    def assertSettledOnce(self):
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.status, Auction.STATUS_COMPLETED)
+        self.assertFalse(Lot.objects.filter(auction=self.auction, settled_at__isnull=True).exists())
+        sold = self.LOTS - 1
+        self.assertEqual(Lot.objects.filter(auction=self.auction, status=Lot.STATUS_SOLD).count(), sold)
+        self.assertEqual(Transaction.objects.filter(lot__auction=self.auction).count(), sold)
+        self.assertEqual(LedgerEntry.objects.filter(kind=LedgerEntry.KIND_CAPTURE).count(), sold)
+        for lot in self.lots:
+            self.assertEqual(
+                AuctionEvent.objects.filter(
+                    lot=lot, event_type__in=[AuctionEvent.EVENT_LOT_SOLD, AuctionEvent.EVENT_LOT_CANCELLED],
+                ).count(),
+                1,
+                lot.title,
+            )
+        self.assertEqual(
+            AuctionEvent.objects.filter(auction=self.auction, event_type=AuctionEvent.EVENT_AUCTION_ENDED).count(), 1
+        )
+        self.assertEqual(Balance.objects.get(user=self.buyer).amount, Decimal('1000.00') - 20 * sold)
+
+
+@override_settings(SETTLEMENT_CHUNK_SIZE=2)
+class SettlementChordTest(SettlementFanOutMixin, TestCase):
+    """Части выполняются chord: каждый лот подводится ровно один раз"""
+
+    def setUp(self):
+        super().setUp()
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', eager)
+
+    def test_chunks_settle_every_lot_once(self):
+        self.assertEqual(settle_auction_task(self.auction.id), f"Dispatched auction {self.auction.id} in 3 chunks")
+        self.assertSettledOnce()
+        # Повторная доставка задачи после завершения ничего не меняет
+        self.assertEqual(settle_auction_task(self.auction.id), "Auction is not active")
+        self.assertSettledOnce()
+
+
+@override_settings(SETTLEMENT_CHUNK_SIZE=2)
+class SettlementChainTest(SettlementFanOutMixin, TransactionTestCase):
+    """
+    Бэкенд rpc:// не поддерживает chord: части выполняются цепочкой
+    задач во встроенном воркере, каждый лот подводится ровно один раз.
+    """
+
+    def test_chain_fallback_settles_every_lot_once(self):
+        if not isinstance(celery_app.backend, RPCBackend):
+            self.skipTest("Цепочка используется только с бэкендом результатов rpc://")
+        with start_worker(celery_app, perform_ping_check=False):
+            self.assertEqual(
+                settle_auction_task(self.auction.id), f"Dispatched auction {self.auction.id} in 3 chunks"
+            )
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline:
+                if Auction.objects.filter(pk=self.auction.pk, status=Auction.STATUS_COMPLETED).exists():
+                    break
+                time.sleep(0.1)
+        self.assertSettledOnce()
+
+
+class AuctionsEndingSoonTest(TestCase):
+    """Участники торгов получают одно уведомление на лот аукциона, завершающегося в течение суток"""
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        self.donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.charity = organization.charity
+        self.buyer = User.objects.create_user(email='buyer@example.com', role=User.BUYER)
+
+    def _lot(self, ends_in, status=Auction.STATUS_ACTIVE):
+        auction = Auction.objects.create(
+            charity=self.charity, name=f'Аукцион через {ends_in}', status=status,
+            start_time=timezone.now() - timedelta(hours=1), end_time=timezone.now() + ends_in,
+        )
+        return Lot.objects.create(
+            auction=auction, donor=self.donor, title='Лот',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+
+    def test_one_notification_per_bidder_and_lot(self):
+        soon = self._lot(timedelta(hours=2))
+        other = Lot.objects.create(
+            auction=soon.auction, donor=self.donor, title='Второй лот',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+        later = self._lot(timedelta(days=3))
+        completed = self._lot(timedelta(hours=2), status=Auction.STATUS_COMPLETED)
+        for lot, amount in ((soon, 20), (soon, 30), (other, 20), (later, 20), (completed, 20)):
+            Bid.objects.create(lot=lot, user=self.buyer, amount=Decimal(amount))
+
+        self.assertEqual(check_auctions_ending_soon(), "Sent notifications for 1 auctions ending soon")
+        notifications = Notification.objects.filter(user=self.buyer, subject="Аукцион скоро завершится")
+        self.assertEqual(notifications.count(), 2)
+        self.assertTrue(all(soon.auction.name in notification.message for notification in notifications))
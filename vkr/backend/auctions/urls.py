@@ -2,7 +2,8 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import (
     AuctionCreateView, AuctionListView, AuctionDetailView, 
-    AuctionUpdateView, AuctionDeleteView, AuctionTicketViewSet
+    AuctionUpdateView, AuctionDeleteView, AuctionTicketViewSet,
+    auction_stream
 )
 
 app_name = 'auctions'
@@ -13,6 +14,7 @@ urlpatterns = [
     path('<int:pk>/', AuctionDetailView.as_view(), name='auction-detail'),
     path('<int:pk>/update/', AuctionUpdateView.as_view(), name='auction-update'),
     path('<int:pk>/delete/', AuctionDeleteView.as_view(), name='auction-delete'),
+    path('<int:pk>/stream/', auction_stream, name='auction-stream'),
 
     path('tickets/', AuctionTicketViewSet.as_view({'get': 'list'}), name='auction-tickets-list'),
     path('tickets/<int:pk>/', AuctionTicketViewSet.as_view({'get': 'retrieve'}), name='auction-ticket-detail'),
@@ -1,4 +1,7 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404
+from django.http import Http404
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -13,6 +16,10 @@ from .models import Auction, AuctionEvent, AuctionTicket
 from .serializers import AuctionSerializer, AuctionEventSerializer, AuctionTicketSerializer
 from users.permissions import IsOrganization, IsOwner, IsAuctionOwner
 from users.models import Balance
+from core.streams import auction_channel, event_stream_response, stream_error, stream_user
+from core.views import EagerLoadingMixin
+from core.search import FullTextSearchFilter
+from core.cache import cache_response
 
 
 
@@ -36,15 +43,14 @@ class AuctionCreateView(CreateAPIView):
         serializer.save(charity=self.request.user.charity)
 
 
-class AuctionListView(ListAPIView):
+class AuctionListView(EagerLoadingMixin, ListAPIView):
     """
     Представление для получения списка всех аукционов.
     Доступно для всех пользователей.
     """
     queryset = Auction.objects.all()
     serializer_class = AuctionSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
     ordering_fields = ['created_at', 'start_time', 'end_time']
     
     @swagger_auto_schema(
@@ -64,6 +70,7 @@ class AuctionListView(ListAPIView):
         ],
         responses={200: AuctionSerializer(many=True)}
     )
+    @cache_response('auctions')
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
         
@@ -119,11 +126,10 @@ class AuctionDeleteView(DestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
-class AuctionViewSet(viewsets.ModelViewSet):
+class AuctionViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Auction.objects.all()
     serializer_class = AuctionSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['name', 'description']
+    filter_backends = [FullTextSearchFilter]
     
     def get_permissions(self):
         """
@@ -149,14 +155,27 @@ class AuctionViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
     
+    @cache_response('auctions')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response('auction:{pk}')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @swagger_auto_schema(
         operation_summary="Получить активные аукционы",
         operation_description="Возвращает список всех активных аукционов.",
         responses={200: AuctionSerializer(many=True)}
     )
     @action(detail=False, methods=['get'])
+    @cache_response('auctions')
     def active(self, request):
         active_auctions = Auction.objects.filter(status='active')
+        page = self.paginate_queryset(active_auctions)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(active_auctions, many=True)
         return Response(serializer.data)
     
@@ -166,13 +185,18 @@ class AuctionViewSet(viewsets.ModelViewSet):
         responses={200: AuctionSerializer(many=True)}
     )
     @action(detail=False, methods=['get'])
+    @cache_response('auctions')
     def completed(self, request):
         completed_auctions = Auction.objects.filter(status='completed')
+        page = self.paginate_queryset(completed_auctions)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(completed_auctions, many=True)
         return Response(serializer.data)
 
 
-class AuctionEventViewSet(viewsets.ModelViewSet):
+class AuctionEventViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = AuctionEvent.objects.all()
     serializer_class = AuctionEventSerializer
     
@@ -196,11 +220,34 @@ class AuctionEventViewSet(viewsets.ModelViewSet):
         auction_id = request.query_params.get('auction_id', None)
         if auction_id:
             events = AuctionEvent.objects.filter(auction_id=auction_id).order_by('-created_at')
+            page = self.paginate_queryset(events)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
             serializer = self.get_serializer(events, many=True)
             return Response(serializer.data)
         return Response({"error": "Auction ID is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class AuctionDetailView(RetrieveAPIView):
+@require_GET
+async def auction_stream(request, pk):
+    """
+    Поток событий аукциона в формате Server-Sent Events:
+    bid_placed, outbid, lot_sold, auction_ended.
+    Заменяет периодический опрос AuctionEventViewSet.by_auction и, как он,
+    требует аутентификации; за платным аукционом следят только с билетом.
+    """
+    user = await stream_user(request)
+    if user is None:
+        return stream_error(401, "Учетные данные не были предоставлены.")
+    auction = await Auction.objects.select_related('charity').filter(pk=pk).afirst()
+    if auction is None:
+        raise Http404("Аукцион не найден")
+    if not await sync_to_async(auction.has_access)(user):
+        return stream_error(403, "Для доступа к платному аукциону нужен билет")
+    return event_stream_response([auction_channel(pk)])
+
+
+class AuctionDetailView(EagerLoadingMixin, RetrieveAPIView):
     """
     Представление для получения информации об отдельном аукционе.
     Доступно для всех пользователей.
@@ -214,6 +261,7 @@ class AuctionDetailView(RetrieveAPIView):
         operation_description="Возвращает подробную информацию об аукционе по его ID.",
         responses={200: AuctionSerializer, 404: "Аукцион не найден"}
     )
+    @cache_response('auction:{pk}')
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
     
@@ -222,7 +270,7 @@ class AuctionDetailView(RetrieveAPIView):
         context['request'] = self.request
         return context
     
-class AuctionTicketViewSet(viewsets.ModelViewSet):
+class AuctionTicketViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = AuctionTicket.objects.all()
     serializer_class = AuctionTicketSerializer
     
@@ -321,29 +369,11 @@ class AuctionTicketViewSet(viewsets.ModelViewSet):
             return Response({"error": "Необходимо указать ID аукциона"}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            auction = Auction.objects.get(pk=auction_id)
+            auction = Auction.objects.select_related('charity').get(pk=auction_id)
         except Auction.DoesNotExist:
             return Response({"error": "Аукцион не найден"}, status=status.HTTP_404_NOT_FOUND)
 
-        if not auction.is_paid:
-            return Response({"has_ticket": True, "ticket": None}, status=status.HTTP_200_OK)
-
-        if hasattr(request.user, 'charity') and request.user.charity.id == auction.charity.id:
-            return Response({"has_ticket": True, "ticket": None}, status=status.HTTP_200_OK)
-
-        if request.user.role == 'donor':
-            return Response({"has_ticket": True, "ticket": None}, status=status.HTTP_200_OK)
-
-        from django.utils import timezone
-        from users.models import Subscription
-        
-        active_subscription = Subscription.objects.filter(
-            user=request.user,
-            is_active=True,
-            end_date__gt=timezone.now()
-        ).exists()
-        
-        if active_subscription:
+        if auction.admits_without_ticket(request.user):
             return Response({"has_ticket": True, "ticket": None}, status=status.HTTP_200_OK)
 
         try:
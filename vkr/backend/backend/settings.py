@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'core',
@@ -95,6 +99,35 @@ DATABASES = {
         'PORT': os.getenv('DB_PORT', '5432'),
     }
 }
+
+# Кэш: Redis в продакшене (общий для всех процессов), локальная память
+# процесса при разработке и в тестах. Версии областей в core/cache.py
+# меняются только в кэше процесса, сделавшего запись, поэтому без общего
+# кэша другие воркеры отдавали бы устаревшие ответы
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+if not CACHE_REDIS_URL and not DEBUG:
+    raise ImproperlyConfigured('CACHE_REDIS_URL обязателен при DEBUG = False: кэш ответов должен быть общим')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'charity-auction',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Время жизни ответов публичных эндпоинтов в кэше (core/cache.py), в секундах
+RESPONSE_CACHE_TIMEOUT = 300
+# Списки лотов с ценой и числом ставок: ставка не сбрасывает их версию,
+# поэтому они живут в кэше недолго
+RESPONSE_CACHE_BIDS_TIMEOUT = 10
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -173,8 +206,13 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Верхняя граница параметра page_size для списков
+PAGINATION_MAX_PAGE_SIZE = 200
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -236,17 +274,88 @@ CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 50
 
+# Крупные аукционы подводятся частями по столько лотов (chord из задач settle_lot_chunk).
+# Для параллельной обработки частей нужен бэкенд результатов с поддержкой chord
+# (например, redis://); с rpc:// части выполняются последовательной цепочкой.
+SETTLEMENT_CHUNK_SIZE = int(os.getenv('SETTLEMENT_CHUNK_SIZE', 1000))
+
+# Поток событий аукционов (core/streams.py). Без Redis события раздаются только
+# внутри одного процесса веб-сервера
+EVENT_STREAM_REDIS_URL = os.getenv('EVENT_STREAM_REDIS_URL')
+EVENT_STREAM_HEARTBEAT = 15
+EVENT_STREAM_QUEUE_SIZE = 100
+# Время жизни билета на подключение к потоку (StreamTicket), в секундах: за это
+# время клиент должен открыть поток, переподключение после него требует нового билета
+EVENT_STREAM_TICKET_LIFETIME = 60
+
+# Подсказки при наборе (core/suggest.py): минимальная длина запроса,
+# число подсказок каждого типа, порог word_similarity и время жизни результата в кэше
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_LIMIT = 5
+SUGGEST_MAX_LIMIT = 10
+SUGGEST_SIMILARITY_THRESHOLD = 0.5
+SUGGEST_CACHE_TIMEOUT = 60
+
+# Рейтинг популярных лотов за час и день (lots/leaderboard.py). Без Redis
+# рейтинг считается по таблице LotPopularity
+LEADERBOARD_REDIS_URL = os.getenv('LEADERBOARD_REDIS_URL')
+LEADERBOARD_WINDOW_CACHE_TIMEOUT = 10
+
+# Лента завершающихся лотов (lots/feeds.py): окно, интервал пересчета ленты
+# и время кэширования ответа клиентом, в секундах
+ENDING_SOON_WINDOW = 3 * 24 * 3600
+ENDING_SOON_BUCKET = 300
+ENDING_SOON_MAX_AGE = 30
+
+# Загрузка изображений лотов частями (lots/uploads.py): каталог незавершенных
+# файлов (общий для всех процессов веб-сервера), наибольший размер файла и части
+# в байтах, время хранения брошенных загрузок в секундах
+LOT_IMAGE_UPLOAD_DIR = os.getenv('LOT_IMAGE_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads'))
+LOT_IMAGE_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+LOT_IMAGE_UPLOAD_PART_SIZE = 5 * 1024 * 1024
+LOT_IMAGE_UPLOAD_EXPIRY = 24 * 3600
+
+# Импорт лотов (lots/imports.py): каталог манифестов и архивов, строк в одной
+# транзакции, предельные размеры манифеста и архива в байтах, число
+# сохраняемых ошибок строк
+LOT_IMPORT_DIR = os.getenv('LOT_IMPORT_DIR', os.path.join(BASE_DIR, 'imports'))
+LOT_IMPORT_CHUNK_SIZE = 100
+LOT_IMPORT_MAX_MANIFEST_SIZE = 10 * 1024 * 1024
+LOT_IMPORT_MAX_ARCHIVE_SIZE = 1024 * 1024 * 1024
+LOT_IMPORT_MAX_ERRORS = 100
+
+# Наибольшее число лотов в одном запросе пакетной модерации (lots/moderation.py)
+LOT_MODERATION_MAX_BATCH = 500
+
 from celery.schedules import crontab
 
 CELERY_BEAT_SCHEDULE = {
+    # Аукционы закрываются задачами close_auction точно в end_time,
+    # периодический обход остается страховкой
     'process-completed-auctions': {
         'task': 'auctions.tasks.process_completed_auctions',
-        'schedule': crontab(minute='*/5'), 
+        'schedule': crontab(minute='*/30'), 
     },
     'check-auctions-ending-soon': {
         'task': 'auctions.tasks.check_auctions_ending_soon',
         'schedule': crontab(hour='*/1'), 
     },
+    'take-balance-snapshots': {
+        'task': 'users.tasks.take_balance_snapshots',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'prune-lot-popularity': {
+        'task': 'lots.tasks.prune_lot_popularity',
+        'schedule': crontab(minute=15),
+    },
+    'compact-lot-facet-counts': {
+        'task': 'lots.tasks.compact_lot_facet_counts',
+        'schedule': crontab(minute='*/10'),
+    },
+    'prune-lot-image-uploads': {
+        'task': 'lots.tasks.prune_lot_image_uploads',
+        'schedule': crontab(minute=45),
+    },
 }
 
 MAILGUN_API_KEY = os.getenv('MAILGUN_API_KEY', 'e63955b5a39a336be3f0df4301ffc489-e71583bb-2f1b1131')
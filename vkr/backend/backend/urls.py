@@ -29,10 +29,11 @@ from rest_framework import permissions
 from auctions.views import AuctionViewSet, AuctionEventViewSet
 from lots.views import (
     LotViewSet, CategoryViewSet, LotCategoryViewSet, 
-    LotImageViewSet, DeliveryDetailViewSet
+    LotImageViewSet, LotImageUploadViewSet, LotImportViewSet, DeliveryDetailViewSet
 )
 from bids.views import BidViewSet, TransactionViewSet
 from comments.views import CommentViewSet
+from core.views import StreamTicketView, SuggestView
 
 router = DefaultRouter()
 
@@ -43,6 +44,8 @@ router.register(r'lots', LotViewSet)
 router.register(r'categories', CategoryViewSet)
 router.register(r'lot-categories', LotCategoryViewSet)
 router.register(r'lot-images', LotImageViewSet)
+router.register(r'lot-image-uploads', LotImageUploadViewSet, basename='lot-image-upload')
+router.register(r'lot-imports', LotImportViewSet, basename='lot-import')
 router.register(r'delivery-details', DeliveryDetailViewSet)
 
 router.register(r'bids', BidViewSet)
@@ -73,6 +76,9 @@ urlpatterns = [
 
     path('api/v1/auctions/', include('auctions.urls')),
     path('api/v1/lots/', include('lots.urls')),
+
+    path('api/suggest/', SuggestView.as_view(), name='suggest'),
+    path('api/stream-ticket/', StreamTicketView.as_view(), name='stream-ticket'),
     
     path('api-auth/', include('rest_framework.urls')),
 
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:39
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+
+def remove_duplicate_transactions(apps, schema_editor):
+    # Для каждой пары лот-покупатель остается одна транзакция: с оформленной доставкой,
+    # затем завершенная, затем самая ранняя
+    Transaction = apps.get_model('bids', 'Transaction')
+    DeliveryDetail = apps.get_model('lots', 'DeliveryDetail')
+    transactions = (
+        Transaction.objects
+        .annotate(has_delivery=Exists(DeliveryDetail.objects.filter(transaction=OuterRef('pk'))))
+        .order_by('lot_id', 'user_id', '-has_delivery', 'status', 'id')
+        .values_list('id', 'lot_id', 'user_id')
+    )
+    seen = set()
+    duplicates = []
+    for transaction_id, lot_id, user_id in transactions.iterator():
+        if (lot_id, user_id) in seen:
+            duplicates.append(transaction_id)
+        else:
+            seen.add((lot_id, user_id))
+    Transaction.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+    # Ограничение добавляется следующей миграцией: удаление транзакций, на которые
+    # ссылается доставка, оставляет отложенные проверки внешних ключей, и
+    # ALTER TABLE той же таблицы в этой транзакции не пройдет
+
+    dependencies = [
+        ('bids', '0003_initial'),
+        ('lots', '0004_lot_settled_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_transactions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bids', '0004_remove_duplicate_transactions'),
+        ('lots', '0004_lot_settled_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('lot', 'user'), name='unique_transaction_lot_user'),
+        ),
+    ]
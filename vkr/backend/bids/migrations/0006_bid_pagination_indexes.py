@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bids', '0005_transaction_unique_lot_user'),
+        ('lots', '0004_lot_settled_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['lot', '-amount', '-id'], name='bids_bid_lot_id_05f8d8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='bids_bid_user_id_7bbd8c_idx'),
+        ),
+    ]
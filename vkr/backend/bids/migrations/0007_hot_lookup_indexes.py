@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bids', '0006_bid_pagination_indexes'),
+        ('lots', '0012_hot_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'status', '-payment_time'], name='transaction_purchases_idx'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from lots.models import Lot
 from users.models import User
+from core.cache import bump
 
 
 class Bid(models.Model):
@@ -10,6 +13,13 @@ class Bid(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Сортировки keyset-пагинации: ставки на лот и ставки пользователя
+            models.Index(fields=['lot', '-amount', '-id']),
+            models.Index(fields=['user', '-created_at', '-id']),
+        ]
+    
     def __str__(self):
         return f"{self.user.username} - {self.amount} руб. for {self.lot.title}"
 
@@ -32,5 +42,23 @@ class Transaction(models.Model):
     payment_method = models.CharField(max_length=50, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
     
+    class Meta:
+        constraints = [
+            # Одна транзакция на пару лот-покупатель: повторное подведение итогов
+            # или повторная оплата не создают дубликатов
+            models.UniqueConstraint(fields=['lot', 'user'], name='unique_transaction_lot_user'),
+        ]
+        indexes = [
+            # Покупки пользователя (my_purchases); поиск по лоту и покупателю
+            # в pay/confirm_delivery обслуживает индекс уникальности
+            models.Index(fields=['user', 'status', '-payment_time'], name='transaction_purchases_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.username} - {self.amount} руб. for {self.lot.title}"
+
+
+@receiver([post_save, post_delete], sender=Bid)
+def invalidate_bid_responses(sender, instance, **kwargs):
+    """Список ставок входит в ответы с лотом"""
+    bump(f'lot:{instance.lot_id}')
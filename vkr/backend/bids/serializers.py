@@ -1,9 +1,9 @@
 from rest_framework import serializers
 from .models import Bid, Transaction
-from users.models import Balance
+from users.models import Balance, LedgerEntry
 from django.shortcuts import get_object_or_404
-from django.db.models import Max
 from django.db import transaction
+from lots import leaderboard
 
 
 class BidSerializer(serializers.ModelSerializer):
@@ -16,6 +16,7 @@ class BidSerializer(serializers.ModelSerializer):
         model = Bid
         fields = ['id', 'lot', 'user', 'user_username', 'user_email', 'user_first_name', 'user_last_name', 'amount', 'created_at']
         read_only_fields = ['created_at']
+        select_related = ['user']
     
     def validate(self, data):
         user = data['user']
@@ -23,8 +24,7 @@ class BidSerializer(serializers.ModelSerializer):
         amount = data['amount']
         
         # Правило 1: Ставка должна быть строго больше текущей максимальной ставки на этот лот
-        highest_bid = Bid.objects.filter(lot=lot).aggregate(Max('amount'))
-        highest_amount = highest_bid['amount__max'] or lot.starting_price
+        highest_amount = lot.get_highest_amount()
         
         if amount <= highest_amount:
             raise serializers.ValidationError(
@@ -46,15 +46,17 @@ class BidSerializer(serializers.ModelSerializer):
         user = validated_data['user']
         amount = validated_data['amount']
         
-        # Списываем средства с баланса
-        balance = get_object_or_404(Balance, user=user)
+        # Удерживаем сумму ставки с баланса атомарным UPDATE
         try:
-            balance.withdraw(amount)
+            Balance.debit(user.id, amount, LedgerEntry.KIND_HOLD, lot=validated_data['lot'])
         except ValueError as e:
             raise serializers.ValidationError(str(e))
         
-        # Создаем ставку
-        return super().create(validated_data)
+        # Создаем ставку и обновляем текущее состояние торгов по лоту
+        bid = super().create(validated_data)
+        validated_data['lot'].record_bid(bid)
+        leaderboard.record_bid(validated_data['lot'], bid)
+        return bid
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -69,3 +71,4 @@ class TransactionSerializer(serializers.ModelSerializer):
             'id', 'user', 'user_username', 'user_first_name', 'user_last_name', 'lot', 'lot_title',
             'amount', 'payment_time', 'payment_method', 'status'
         ]
+        select_related = ['user', 'lot']
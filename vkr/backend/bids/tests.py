@@ -1,3 +1,83 @@
-from django.test import TestCase
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auctions.models import Auction
+from lots.models import Lot
+from users.models import User, Balance, LedgerEntry
+from .models import Bid
+
+
+class ConcurrentBiddingTest(TransactionTestCase):
+    """
+    Сотни одновременных ставок на один лот: лидер должен быть ровно один,
+    а деньги должны оставаться удержанными только у него.
+    """
+    BUYERS = 40
+    BIDS = 300
+    WORKERS = 32
+    START_BALANCE = Decimal('100000.00')
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(hours=1),
+        )
+        self.lot = Lot.objects.create(
+            auction=auction, donor=donor, title='Горячий лот',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+        self.buyers = [
+            User.objects.create_user(email=f'buyer{i}@example.com', role=User.BUYER)
+            for i in range(self.BUYERS)
+        ]
+        for buyer in self.buyers:
+            Balance.credit(buyer.id, self.START_BALANCE, LedgerEntry.KIND_TOP_UP)
+
+    def _place_bid(self, buyer, amount):
+        client = APIClient()
+        client.force_authenticate(user=buyer)
+        try:
+            return client.post('/api/bids/', {'lot': self.lot.id, 'amount': amount}, format='json').status_code
+        finally:
+            connection.close()
+
+    def test_single_leader_and_no_double_charges(self):
+        rng = random.Random(42)
+        attempts = [
+            (rng.choice(self.buyers), 11 + rng.randint(0, self.BIDS * 10))
+            for _ in range(self.BIDS)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            codes = list(pool.map(lambda args: self._place_bid(*args), attempts))
+
+        self.assertTrue(set(codes) <= {201, 400}, codes)
+        self.assertIn(201, codes)
+
+        self.lot.refresh_from_db()
+        accepted = list(Bid.objects.filter(lot=self.lot).order_by('id'))
+        amounts = [bid.amount for bid in accepted]
+        self.assertEqual(codes.count(201), len(accepted))
+        self.assertEqual(amounts, sorted(set(amounts)), "Принятые ставки должны строго возрастать")
+
+        top = accepted[-1]
+        self.assertEqual(self.lot.current_price, top.amount)
+        self.assertEqual(self.lot.current_leader_id, top.user_id)
+        self.assertEqual(self.lot.bid_count, len(accepted))
+
+        balances = dict(Balance.objects.filter(user__in=self.buyers).values_list('user_id', 'amount'))
+        for buyer in self.buyers:
+            expected = self.START_BALANCE - (top.amount if buyer.id == top.user_id else 0)
+            self.assertEqual(balances[buyer.id], expected, f"Баланс покупателя {buyer.email}")
+            self.assertEqual(LedgerEntry.balance_for(buyer.id), expected, f"Журнал покупателя {buyer.email}")
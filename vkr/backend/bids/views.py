@@ -2,7 +2,6 @@ from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Max
 from django.db import transaction
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -10,11 +9,14 @@ from drf_yasg import openapi
 from .models import Bid, Transaction
 from .serializers import BidSerializer, TransactionSerializer
 from lots.models import Lot, DeliveryDetail
-from users.models import Notification, Balance, User
+from users.models import Notification, Balance, LedgerEntry, User
 from auctions.models import AuctionEvent
+from core.streams import publish, auction_channel, lot_channel
+from core.views import EagerLoadingMixin
+from core.cache import cache_response
 
 
-class BidViewSet(viewsets.ModelViewSet):
+class BidViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Bid.objects.all()
     serializer_class = BidSerializer
     
@@ -45,9 +47,10 @@ class BidViewSet(viewsets.ModelViewSet):
         user_id = request.user.id
         amount = float(request.data.get('amount'))
         
-        # Проверяем, существует ли лот
+        # Проверяем, существует ли лот, и блокируем его строку до конца транзакции:
+        # ставки на один лот принимаются строго по очереди, ставки на разные лоты — параллельно
         try:
-            lot = Lot.objects.get(id=lot_id)
+            lot = Lot.objects.select_for_update(of=('self',)).select_related('auction').get(id=lot_id)
         except Lot.DoesNotExist:
             return Response({"error": "Lot not found"}, status=status.HTTP_404_NOT_FOUND)
         
@@ -73,9 +76,8 @@ class BidViewSet(viewsets.ModelViewSet):
         if user.role != User.BUYER:
             return Response({"error": "Только пользователи с ролью 'Покупатель' могут делать ставки"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Находим текущую максимальную ставку
-        highest_bid = Bid.objects.filter(lot=lot).aggregate(Max('amount'))
-        highest_amount = highest_bid['amount__max'] or lot.starting_price
+        # Текущая максимальная ставка хранится в самом лоте
+        highest_amount = lot.get_highest_amount()
         
         # Проверяем, достаточно ли высока новая ставка
         if amount <= highest_amount:
@@ -84,19 +86,23 @@ class BidViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Проверяем, достаточно ли средств на балансе пользователя
-        try:
-            balance = Balance.objects.select_for_update().get(user_id=user_id)
-            if balance.amount < amount:
-                return Response(
-                    {"error": "Insufficient funds in your balance"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        except Balance.DoesNotExist:
+        # Запоминаем предыдущего лидера до того, как новая ставка обновит лот
+        previous_leader_id = lot.current_leader_id
+        previous_amount = lot.current_price
+        
+        # Предварительная проверка средств. Окончательно сумма удерживается
+        # условным UPDATE в сериализаторе, поэтому блокировать баланс не нужно
+        balance = Balance.objects.filter(user_id=user_id).only('amount').first()
+        if balance is None:
             return Response(
                 {"error": "User balance not found"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if balance.amount < amount:
+            return Response(
+                {"error": "Insufficient funds in your balance"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Создаем новую ставку
         serializer = self.get_serializer(data={
@@ -105,9 +111,16 @@ class BidViewSet(viewsets.ModelViewSet):
             'amount': amount
         })
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
         
-        # Списываем средства с баланса пользователя уже выполнено в сериализаторе
+        # Возврат предыдущему лидеру и удержание ставки (в сериализаторе) меняют
+        # строки балансов в порядке user_id, чтобы встречные ставки на разные лоты
+        # не взаимоблокировались
+        release_first = previous_leader_id is not None and previous_leader_id < user_id
+        if release_first:
+            Balance.credit(previous_leader_id, previous_amount, LedgerEntry.KIND_RELEASE, lot=lot)
+        self.perform_create(serializer)
+        if previous_leader_id is not None and not release_first:
+            Balance.credit(previous_leader_id, previous_amount, LedgerEntry.KIND_RELEASE, lot=lot)
         
         # Создаем событие аукциона
         AuctionEvent.objects.create(
@@ -124,19 +137,37 @@ class BidViewSet(viewsets.ModelViewSet):
             message=f"На ваш лот '{lot.title}' была сделана новая ставка: {amount} руб."
         )
         
-        # Если есть предыдущий лидер ставок, возвращаем ему деньги
-        previous_highest_bid = Bid.objects.filter(lot=lot).exclude(id=serializer.instance.id).order_by('-amount').first()
-        if previous_highest_bid:
-            previous_user_balance = Balance.objects.get(user=previous_highest_bid.user)
-            previous_user_balance.top_up(previous_highest_bid.amount)
-            
+        # Если есть предыдущий лидер ставок, сообщаем ему о возврате средств
+        if previous_leader_id is not None:
             # Создаем уведомление для предыдущего лидера
             Notification.objects.create(
-                user=previous_highest_bid.user,
+                user_id=previous_leader_id,
                 subject="Ваша ставка перебита",
-                message=f"Ваша ставка на лот '{lot.title}' была перебита. Средства в размере {previous_highest_bid.amount} руб. возвращены на ваш баланс."
+                message=f"Ваша ставка на лот '{lot.title}' была перебита. Средства в размере {previous_amount} руб. возвращены на ваш баланс."
             )
         
+        # Событие уходит наблюдателям аукциона и лота после фиксации транзакции
+        bid = serializer.instance
+        channels = [auction_channel(lot.auction_id), lot_channel(lot.id)]
+        publish(channels, 'bid_placed', {
+            'id': bid.id,
+            'lot': lot.id,
+            'auction': lot.auction_id,
+            'user': bid.user_id,
+            'user_username': request.user.username,
+            'amount': bid.amount,
+            'bid_count': bid.lot.bid_count,
+            'created_at': bid.created_at,
+        })
+        if previous_leader_id is not None and previous_leader_id != user_id:
+            publish(channels, 'outbid', {
+                'lot': lot.id,
+                'auction': lot.auction_id,
+                'user': previous_leader_id,
+                'amount': previous_amount,
+                'new_amount': bid.amount,
+            })
+        
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     @swagger_auto_schema(
@@ -152,6 +183,10 @@ class BidViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_bids(self, request):
         bids = Bid.objects.filter(user=request.user).order_by('-created_at')
+        page = self.paginate_queryset(bids)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(bids, many=True)
         return Response(serializer.data)
     
@@ -167,6 +202,7 @@ class BidViewSet(viewsets.ModelViewSet):
         tags=['bids']
     )
     @action(detail=False, methods=['get'])
+    @cache_response('lot:{lot_id}')
     def by_lot(self, request):
         lot_id = request.query_params.get('lot_id')
         if not lot_id:
@@ -178,6 +214,10 @@ class BidViewSet(viewsets.ModelViewSet):
             return Response({"error": "Lot not found"}, status=status.HTTP_404_NOT_FOUND)
             
         bids = Bid.objects.filter(lot_id=lot_id).order_by('-amount')
+        page = self.paginate_queryset(bids)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(bids, many=True)
         return Response(serializer.data)
 
@@ -247,17 +287,19 @@ class BidViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Создание транзакции
-            transaction = Transaction.objects.create(
+            # Создание транзакции (незавершенная транзакция по этому лоту используется повторно)
+            transaction, _ = Transaction.objects.update_or_create(
                 user=request.user,
                 lot=bid.lot,
-                amount=bid.amount,
-                payment_method='balance',  # По умолчанию используем баланс
-                status='pending'
+                defaults={
+                    'amount': bid.amount,
+                    'payment_method': 'balance',  # По умолчанию используем баланс
+                    'status': 'pending',
+                }
             )
             
             # Списание средств
-            balance.withdraw(bid.amount)
+            balance.withdraw(bid.amount, kind=LedgerEntry.KIND_PAYMENT, lot=bid.lot)
             
             # Обновление статуса транзакции
             transaction.status = 'completed'
@@ -390,7 +432,7 @@ class BidViewSet(viewsets.ModelViewSet):
             )
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     
@@ -409,6 +451,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
         transactions = Transaction.objects.filter(
             user=request.user,
             status='completed'
-        )
+        ).order_by('-payment_time')
+        page = self.paginate_queryset(transactions)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(transactions, many=True)
         return Response(serializer.data)
@@ -10,6 +10,7 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'lot', 'user', 'user_username', 'user_display_name', 'content', 'created_at']
         read_only_fields = ['created_at', 'user']
+        select_related = ['user']
 
     def get_user_display_name(self, obj):
         user = obj.user
@@ -8,9 +8,10 @@ from lots.models import Lot
 from .models import Comment
 from .serializers import CommentSerializer
 from .permissions import IsAuthorOrReadOnly
+from core.views import EagerLoadingMixin
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     CRUD для комментариев к лотам.
     - List/Read: публично
@@ -0,0 +1,213 @@
+"""
+Замеры эндпоинтов API на синтетическом наборе данных (core.seed).
+
+Каждый сценарий вызывает настоящее представление DRF через тестовый клиент
+(или функцию подведения итогов) и замеряется в два прохода:
+1. Время: iterations вызовов без инструментирования, из них p50/p95/p99.
+2. Профиль: несколько вызовов с подсчетом SQL-запросов и tracemalloc —
+   наибольшее число запросов и пик выделенной памяти за вызов.
+Пишущие сценарии (ставка, подведение итогов) выполняются в точке сохранения,
+которая откатывается после каждого вызова, поэтому данные набора не меняются
+и каждый вызов видит одно и то же состояние. Кэш ответов очищается перед
+каждым вызовом: замеряется работа представления, а не чтение из кэша.
+
+Результаты сравниваются с базовым файлом (compare). Проверяемая метрика —
+число запросов: оно не зависит от машины, и любой его рост — регрессия.
+Время p95 и память зависят от машины, поэтому сравниваются, только если
+задан допуск, и имеют смысл лишь для базы, записанной на той же машине.
+"""
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from auctions.models import Auction
+from auctions.settlement import settle_auction
+from bids.models import Bid
+from lots.models import Lot
+from users.models import Balance, Notification, User
+from . import seed
+
+PROFILE_ITERATIONS = 5
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _rolled_back(call):
+    """Выполняет call в точке сохранения и откатывает ее"""
+    def wrapper():
+        try:
+            with transaction.atomic():
+                result = call()
+                raise _Rollback
+        except _Rollback:
+            pass
+        return result
+    return wrapper
+
+
+class Fixtures:
+    """Объекты набора, к которым обращаются сценарии"""
+
+    def __init__(self, seed_value):
+        users = User.objects.filter(email__startswith=f'load{seed_value}-', email__endswith=f'@{seed.EMAIL_DOMAIN}')
+        active = Lot.objects.filter(
+            auction__status=Auction.STATUS_ACTIVE, status=Lot.STATUS_APPROVED,
+            bid_count__gt=0, donor__in=users,
+        )
+        self.lot = active.select_related('auction').order_by('-bid_count', 'id').first()
+        if self.lot is None:
+            raise BenchmarkError("В наборе нет лотов идущих аукционов со ставками")
+        self.auction = self.lot.auction
+        # Платный аукцион проходит все проверки доступа по билету
+        self.paid_auction = (
+            Auction.objects.filter(charity__user__in=users, is_paid=True).order_by('id').first() or self.auction
+        )
+        self.settlement_auction = (
+            Auction.objects.filter(status=Auction.STATUS_ACTIVE, charity__user__in=users)
+            .annotate(total=Count('lots')).order_by('-total', 'id').first()
+        )
+        self.bidder = User.objects.get(
+            pk=Bid.objects.filter(user__in=users).values('user').annotate(total=Count('id'))
+            .order_by('-total', 'user').values('user')[:1]
+        )
+        # Новая ставка не должна совпасть с лидером и донором лота
+        self.buyer = (
+            users.filter(role=User.BUYER).exclude(pk=self.lot.current_leader_id).order_by('id').first()
+        )
+        self.notified = User.objects.get(
+            pk=Notification.objects.filter(user__in=users).values('user').annotate(total=Count('id'))
+            .order_by('-total', 'user').values('user')[:1]
+        )
+
+
+def scenarios(fixtures):
+    """Имя сценария -> функция одного вызова, возвращающая код ответа"""
+    anonymous = APIClient()
+    bidder = APIClient()
+    bidder.force_authenticate(user=fixtures.bidder)
+    buyer = APIClient()
+    buyer.force_authenticate(user=fixtures.buyer)
+    notified = APIClient()
+    notified.force_authenticate(user=fixtures.notified)
+
+    amount = fixtures.lot.get_highest_amount() + Decimal('100.00')
+
+    def place_bid():
+        Balance.objects.filter(user=fixtures.buyer).update(amount=amount)
+        return buyer.post('/api/bids/', {'lot': fixtures.lot.pk, 'amount': str(amount)}, format='json').status_code
+
+    def settle():
+        settle_auction(fixtures.settlement_auction)
+        return 200
+
+    return {
+        'bid_create': _rolled_back(place_bid),
+        'lot_list': lambda: anonymous.get('/api/lots/').status_code,
+        'auction_detail': lambda: anonymous.get(f'/api/auctions/{fixtures.auction.pk}/').status_code,
+        'bids_by_lot': lambda: bidder.get('/api/bids/by_lot/', {'lot_id': fixtures.lot.pk}).status_code,
+        'my_bids': lambda: bidder.get('/api/bids/my_bids/').status_code,
+        'notifications': lambda: notified.get('/api/users/notifications/').status_code,
+        'check_access': lambda: buyer.get(
+            '/api/v1/auctions/tickets/check-access/', {'auction_id': fixtures.paid_auction.pk}
+        ).status_code,
+        'settlement': _rolled_back(settle),
+    }
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(call, iterations, warmup=3):
+    """Замеряет один сценарий. Ошибочный код ответа прерывает замер"""
+    for _ in range(warmup):
+        cache.clear()
+        status = call()
+        if status >= 400:
+            raise BenchmarkError(f"Код ответа {status}")
+
+    durations = []
+    for _ in range(iterations):
+        cache.clear()
+        started = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - started) * 1000)
+
+    queries = 0
+    memory = 0
+    tracemalloc.start()
+    try:
+        for _ in range(PROFILE_ITERATIONS):
+            cache.clear()
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            with CaptureQueriesContext(connection) as captured:
+                call()
+            _, peak = tracemalloc.get_traced_memory()
+            queries = max(queries, len(captured))
+            memory = max(memory, peak - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(statistics.median(durations), 3),
+        'p95_ms': round(_percentile(durations, 95), 3),
+        'p99_ms': round(_percentile(durations, 99), 3),
+        'queries': queries,
+        'memory_kb': round(memory / 1024, 1),
+    }
+
+
+def run(seed_value, iterations, only=None, progress=None):
+    """Замеряет сценарии на наборе с seed_value. Возвращает {сценарий: метрики}"""
+    calls = scenarios(Fixtures(seed_value))
+    unknown = set(only or ()) - set(calls)
+    if unknown:
+        raise BenchmarkError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+    results = {}
+    for name, call in calls.items():
+        if only and name not in only:
+            continue
+        try:
+            results[name] = measure(call, iterations)
+        except BenchmarkError as e:
+            raise BenchmarkError(f"{name}: {e}")
+        if progress:
+            progress(name, results[name])
+    return results
+
+
+def compare(results, baseline, latency_tolerance=None, memory_tolerance=None):
+    """
+    Регрессии относительно базового файла: список строк с описанием.
+    p95 и память сравниваются, только если задан допуск и метрика есть в базе.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(f"{name}: SQL-запросов {current['queries']} вместо {base['queries']}")
+        if latency_tolerance is not None and 'p95_ms' in base:
+            if current['p95_ms'] > base['p95_ms'] * (1 + latency_tolerance):
+                regressions.append(f"{name}: p95 {current['p95_ms']} мс при базе {base['p95_ms']} мс")
+        if memory_tolerance is not None and 'memory_kb' in base:
+            if current['memory_kb'] > base['memory_kb'] * (1 + memory_tolerance):
+                regressions.append(f"{name}: память {current['memory_kb']} КБ при базе {base['memory_kb']} КБ")
+    return regressions
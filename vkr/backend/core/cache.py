@@ -0,0 +1,123 @@
+"""
+Кэш ответов публичных эндпоинтов каталога с версиями.
+
+Ответ зависит от набора областей: списков ('auctions', 'lots', 'categories')
+и отдельных объектов ('auction:5', 'lot:7'). У каждой области в кэше хранится
+версия — случайный токен. Ключ ответа составляется из эндпоинта, параметров
+запроса, класса видимости пользователя и версий его областей, поэтому запись
+в модель (сигналы в models.py приложений) меняет версии затронутых областей,
+и старые ответы больше не читаются, а вытесняются из кэша по времени жизни.
+
+Ставка меняет только версии лота и его аукциона: сбрасывать при каждой ставке
+общий список 'lots' значило бы пересобирать каталог на каждый запрос во время
+торгов. Поэтому списки с ценой и числом ставок кэшируются на короткое время
+RESPONSE_CACHE_BIDS_TIMEOUT и отстают от торгов не дольше него.
+
+Версии меняются после фиксации транзакции: ответ, собранный по данным до
+записи, сохраняется под старыми версиями и не будет прочитан. Поля связанных
+моделей, изменения которых не меняют версии (например, имя донора), устаревают
+не дольше чем на RESPONSE_CACHE_TIMEOUT.
+
+Вместе с ответом хранится его ETag (хеш содержимого). Клиент, повторяющий
+запрос с If-None-Match, получает 304 без обращения к базе и без сериализации,
+пока версии областей не изменились. Last-Modified не отдается: точности
+в секунду не хватает, чтобы отличить ответы до и после записи в ту же секунду,
+и If-Modified-Since вернул бы 304 на устаревший ответ.
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+VERSION_PREFIX = 'version:'
+
+
+def _token():
+    return uuid.uuid4().hex[:12]
+
+
+def bump(*scopes):
+    """Меняет версии областей после фиксации текущей транзакции"""
+    keys = [f"{VERSION_PREFIX}{scope}" for scope in scopes]
+    transaction.on_commit(lambda: cache.set_many({key: _token() for key in keys}, None))
+
+
+def versions(scopes):
+    """Текущие версии областей одним обращением к кэшу"""
+    keys = [f"{VERSION_PREFIX}{scope}" for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Версия вытеснена из кэша или еще не создавалась: новая версия не
+            # совпадает ни с одной прежней, поэтому старые ответы не вернутся
+            cache.add(key, _token(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def visibility(user):
+    """
+    Класс видимости: пользователи одного класса видят одинаковые ответы.
+    Аноним и покупатель видят только опубликованное, донор — еще свои лоты,
+    организация — лоты своих аукционов.
+    """
+    if not user.is_authenticated:
+        return 'public'
+    if user.is_staff:
+        return 'staff'
+    if user.role == user.BUYER:
+        return 'public'
+    if user.role == user.CHARITY and hasattr(user, 'charity'):
+        return f'charity:{user.charity.pk}'
+    return f'{user.role}:{user.pk}'
+
+
+def cache_response(*scopes, timeout='RESPONSE_CACHE_TIMEOUT'):
+    """
+    Кэширует успешный ответ метода представления и отвечает на условные
+    запросы. Области могут ссылаться на аргументы URL и параметры запроса:
+    cache_response('auction:{pk}'), cache_response('lot:{lot_id}').
+    timeout — имя настройки со временем жизни ответа в кэше.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            try:
+                names = [scope.format_map({**request.query_params.dict(), **kwargs}) for scope in scopes]
+            except KeyError:
+                # Без параметра, от которого зависит ответ, запрос не кэшируется:
+                # представление само ответит ошибкой
+                return method(view, request, *args, **kwargs)
+            query = sorted(request.query_params.lists())
+            fingerprint = repr((request.get_host(), request.path, query, request.accepted_renderer.format))
+            key = ':'.join([
+                'response',
+                type(view).__name__,
+                method.__name__,
+                visibility(request.user),
+                *versions(names),
+                hashlib.md5(fingerprint.encode()).hexdigest(),
+            ])
+
+            entry = cache.get(key)
+            if entry is None:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                content = JSONRenderer().render(response.data) + request.accepted_renderer.format.encode()
+                entry = (hashlib.md5(content).hexdigest(), response.data)
+                cache.set(key, entry, getattr(settings, timeout))
+            else:
+                response = Response(entry[1])
+
+            response['ETag'] = quote_etag(entry[0])
+            return get_conditional_response(request, etag=response['ETag'], response=response)
+        return wrapper
+    return decorator
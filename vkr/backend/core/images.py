@@ -0,0 +1,152 @@
+"""
+Варианты загруженных изображений для списков и адаптивной верстки.
+
+Для каждого изображения создаются уменьшенные копии (VARIANTS) в форматах
+WebP и JPEG без метаданных: поворот по EXIF применяется к пикселям, сами
+EXIF, XMP и ICC в варианты не попадают. Имена файлов вариантов зависят только
+от имени исходного файла, поэтому повторная обработка перезаписывает те же
+файлы. Описание вариантов хранится в JSON-поле модели:
+
+    {'source': 'lot_images/a.jpg',
+     'sizes': {'thumb': {'width': 320, 'height': 240,
+                         'webp': 'variants/lot_images/a/thumb.webp',
+                         'jpeg': 'variants/lot_images/a/thumb.jpg'}, ...}}
+
+Варианты создают задачи Celery приложений после загрузки файла.
+"""
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+# Вариант -> наибольшая сторона в пикселях
+VARIANTS = {
+    'thumb': 320,
+    'medium': 800,
+    'large': 1600,
+}
+# Формат в ответе API -> (формат Pillow, расширение файла, параметры сохранения)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'variants'
+
+
+def variant_path(source, variant, extension):
+    """Имя файла варианта в хранилище"""
+    root, _ = posixpath.splitext(source)
+    return f"{VARIANTS_DIR}/{root}/{variant}.{extension}"
+
+
+def is_current(field_file, variants):
+    """Варианты созданы для текущего файла поля"""
+    return bool(field_file) and variants.get('source') == field_file.name
+
+
+def _prepare(image, image_format):
+    """Приводит режим к поддерживаемому форматом: JPEG без прозрачности"""
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if image_format == 'JPEG' and has_alpha:
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+        return background
+    if has_alpha:
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def render_variants(field_file):
+    """
+    Создает варианты изображения в хранилище поля.
+    Возвращает (ширина, высота) исходного изображения с учетом поворота
+    и описание вариантов для JSON-поля модели.
+    """
+    storage = field_file.storage
+    with field_file.open('rb'):
+        image = Image.open(field_file)
+        image = ImageOps.exif_transpose(image)
+    width, height = image.size
+
+    sizes = {}
+    for name, side in VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail((side, side), Image.Resampling.LANCZOS)
+        entry = {'width': variant.width, 'height': variant.height}
+        for key, (image_format, extension, options) in FORMATS.items():
+            converted = _prepare(variant, image_format)
+            # Метаданные исходного файла не передаются в кодировщик
+            converted.info = {}
+            buffer = io.BytesIO()
+            converted.save(buffer, image_format, **options)
+
+            path = variant_path(field_file.name, name, extension)
+            if storage.exists(path):
+                storage.delete(path)
+            entry[key] = storage.save(path, ContentFile(buffer.getvalue()))
+        sizes[name] = entry
+    return width, height, {'source': field_file.name, 'sizes': sizes}
+
+
+def delete_variants(storage, variants):
+    """Удаляет файлы вариантов из хранилища"""
+    for entry in variants.get('sizes', {}).values():
+        for key in FORMATS:
+            if entry.get(key):
+                storage.delete(entry[key])
+
+
+def schedule(task, ids):
+    """
+    Ставит задачу создания вариантов. Если брокер недоступен, варианты
+    создаст команда backfill_image_variants.
+    """
+    try:
+        task.delay(list(ids))
+    except Exception as e:
+        logging.error(f"Не удалось поставить задачу {task.name} для {list(ids)}: {e}")
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Варианты изображения в ответе API: размеры и ссылки на каждый формат,
+    а в srcset — готовые значения атрибута srcset для каждого формата.
+    Пока варианты текущего файла не созданы, возвращает пустые словари.
+    """
+
+    def __init__(self, image_field, variants_field, **kwargs):
+        self.image_field = image_field
+        self.variants_field = variants_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        variants = getattr(instance, self.variants_field)
+        if not is_current(getattr(instance, self.image_field), variants):
+            return {'sizes': {}, 'srcset': {}}
+        request = self.context.get('request')
+
+        def url(name):
+            location = default_storage.url(name)
+            return request.build_absolute_uri(location) if request else location
+
+        sizes = {}
+        srcset = {key: {} for key in FORMATS}
+        for name, entry in variants['sizes'].items():
+            sizes[name] = {'width': entry['width'], 'height': entry['height']}
+            for key in FORMATS:
+                sizes[name][key] = url(entry[key])
+                # Исходник меньше нескольких вариантов: в srcset одна ссылка на ширину
+                srcset[key].setdefault(entry['width'], sizes[name][key])
+        return {
+            'sizes': sizes,
+            'srcset': {
+                key: ', '.join(f"{link} {width}w" for width, link in sorted(links.items()))
+                for key, links in srcset.items()
+            },
+        }
@@ -0,0 +1,331 @@
+"""
+Нагрузочный тест последней минуты аукциона: тысячи покупателей одновременно
+торгуются за несколько лотов через настоящий HTTP-сервер (gunicorn + Postgres).
+
+1. prepare() создает платный аукцион, который завершится через duration секунд,
+   горячие лоты, покупателей с пополненным балансом и билетами (у половины)
+   и JWT-токены для них.
+2. storm() запускает по сопрограмме на покупателя, у каждой — свое keep-alive
+   соединение. Покупатель проверяет доступ (check-access), затем до конца
+   аукциона опрашивает ставки лота (by_lot) и перебивает лидера (POST /api/bids/).
+   Пауза между ставками сокращается к концу аукциона: основной поток ставок
+   приходится на последние секунды. Клиент сам следит, чтобы лидер каждого
+   лота, которого он видел, не становился ниже (немонотонный лидер).
+3. check() после подведения итогов сверяет базу: ставки каждого лота строго
+   возрастают, состояние торгов лота совпадает со ставками, балансы
+   неотрицательны и совпадают с журналом, каждое удержание возвращено или
+   списано ровно один раз (без двойных возвратов).
+
+HTTP-клиент написан на asyncio без сторонних библиотек; он понимает ответы
+с Content-Length и chunked и переподключается после ошибок.
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, When
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from auctions.models import Auction, AuctionTicket
+from bids.models import Bid
+from lots.models import Lot
+from users.models import Balance, LedgerEntry, User
+from .seed import EMAIL_DOMAIN
+
+STARTING_PRICE = Decimal('1000.00')
+# Шаг ставки поверх увиденного лидера, в рублях
+RAISE_STEPS = (10, 20, 50, 100, 200, 500)
+
+
+class Setup:
+    """Созданные для прогона объекты"""
+
+    def __init__(self, tag, auction, lot_ids, buyer_ids, tokens, owner_ids):
+        self.tag = tag
+        self.auction = auction
+        self.lot_ids = lot_ids
+        self.buyer_ids = buyer_ids
+        self.tokens = tokens
+        self.owner_ids = owner_ids
+
+
+def _user(tag, kind, index, role):
+    return User(
+        email=f'storm{tag}-{kind}-{index}@{EMAIL_DOMAIN}', username=f'storm{tag}-{kind}-{index}',
+        role=role, password=UNUSABLE_PASSWORD_PREFIX, is_email_verified=True,
+    )
+
+
+def prepare(buyers, lots, duration, balance, lead=5):
+    """Создает аукцион, завершающийся через lead + duration секунд, лоты и покупателей"""
+    tag = int(time.time())
+    now = timezone.now()
+    with transaction.atomic():
+        organization = User.objects.create_user(
+            email=f'storm{tag}-charity@{EMAIL_DOMAIN}', role=User.CHARITY,
+        )
+        donor = User.objects.create_user(email=f'storm{tag}-donor@{EMAIL_DOMAIN}', role=User.DONOR)
+        auction = Auction.objects.create(
+            charity=organization.charity, name=f'Нагрузочный аукцион {tag}',
+            start_time=now - timedelta(hours=1), end_time=now + timedelta(seconds=lead + duration),
+            is_paid=True, ticket_price=Decimal('100.00'),
+        )
+        lot_ids = [
+            Lot.objects.create(
+                auction=auction, donor=donor, title=f'Горячий лот {index + 1}',
+                starting_price=STARTING_PRICE, status=Lot.STATUS_APPROVED,
+            ).pk
+            for index in range(lots)
+        ]
+
+        users = User.objects.bulk_create(
+            [_user(tag, 'buyer', index, User.BUYER) for index in range(buyers)], batch_size=2000,
+        )
+        Balance.objects.bulk_create([Balance(user=user) for user in users], batch_size=2000)
+        # Пополнение проходит через журнал, чтобы баланс сходился с ним после прогона
+        Balance.credit_many([
+            LedgerEntry(user_id=user.pk, kind=LedgerEntry.KIND_TOP_UP, amount=balance) for user in users
+        ])
+        AuctionTicket.objects.bulk_create([
+            AuctionTicket(auction=auction, user=user) for user in users[::2]
+        ], batch_size=2000)
+    tokens = {user.pk: str(AccessToken.for_user(user)) for user in users}
+    return Setup(tag, auction, lot_ids, [user.pk for user in users], tokens, [organization.pk, donor.pk])
+
+
+def cleanup(setup):
+    """Удаляет аукцион и пользователей прогона"""
+    with transaction.atomic():
+        Auction.objects.filter(pk=setup.auction.pk).delete()
+        User.objects.filter(pk__in=setup.buyer_ids + setup.owner_ids).delete()
+
+
+class HttpClient:
+    """Одно keep-alive соединение HTTP/1.1 с JSON-запросами"""
+
+    def __init__(self, url, token, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.token = token
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, params=None, body=None):
+        """Возвращает (код ответа, разобранный JSON или None)"""
+        try:
+            return await asyncio.wait_for(self._request(method, path, params, body), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _request(self, method, path, params, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        if params:
+            path = f'{path}?{urlencode(params)}'
+        data = json.dumps(body).encode() if body is not None else b''
+        head = (
+            f'{method} {path} HTTP/1.1\r\n'
+            f'Host: {self.host}:{self.port}\r\n'
+            f'Authorization: Bearer {self.token}\r\n'
+            'Accept: application/json\r\n'
+            f'Content-Length: {len(data)}\r\n'
+        )
+        if body is not None:
+            head += 'Content-Type: application/json\r\n'
+        self.writer.write(head.encode() + b'\r\n' + data)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Сервер закрыл соединение")
+        status = int(status_line.split()[1])
+        headers = await self._headers()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if not size:
+                    await self._headers()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            payload = b''.join(chunks)
+        else:
+            payload = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+    async def _headers(self):
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Stats:
+    """Время ответа и коды по эндпоинтам; код 0 — ошибка соединения или таймаут"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    def add(self, name, started, status):
+        self.latencies.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        self.statuses.setdefault(name, Counter())[status] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for name, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            statuses = self.statuses[name]
+            total = len(ordered)
+            errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+            endpoints[name] = {
+                'requests': total,
+                'rps': round(total / elapsed, 1),
+                'error_rate': round(errors / total, 4),
+                'rejected': sum(count for status, count in statuses.items() if 400 <= status < 500),
+                'p50_ms': round(statistics.median(ordered), 1),
+                'p95_ms': round(ordered[min(total - 1, int(total * 0.95))], 1),
+                'p99_ms': round(ordered[min(total - 1, int(total * 0.99))], 1),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            }
+        return endpoints
+
+
+async def _buyer(url, setup, user_id, rng, deadline, think, timeout, stats, violations):
+    client = HttpClient(url, setup.tokens[user_id], timeout)
+    seen = {}
+
+    async def call(name, method, path, params=None, body=None):
+        started = time.perf_counter()
+        try:
+            status, data = await client.request(method, path, params, body)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+            status, data = 0, None
+        stats.add(name, started, status)
+        return status, data
+
+    try:
+        await call('check_access', 'GET', '/api/v1/auctions/tickets/check-access/', {'auction_id': setup.auction.pk})
+        end = setup.auction.end_time.timestamp()
+        while time.time() < deadline:
+            lot_id = rng.choice(setup.lot_ids)
+            status, data = await call('by_lot', 'GET', '/api/bids/by_lot/', {'lot_id': lot_id, 'page_size': 1})
+            if status == 200 and data and data.get('results'):
+                leader = Decimal(data['results'][0]['amount'])
+                if leader < seen.get(lot_id, 0):
+                    violations.append(f"Лот {lot_id}: лидер {leader} после уже увиденного {seen[lot_id]}")
+                seen[lot_id] = max(leader, seen.get(lot_id, 0))
+
+            amount = max(seen.get(lot_id, 0), STARTING_PRICE) + rng.choice(RAISE_STEPS)
+            status, data = await call('bid', 'POST', '/api/bids/', body={'lot': lot_id, 'amount': str(amount)})
+            if status == 201:
+                seen[lot_id] = max(amount, seen.get(lot_id, 0))
+            # К концу аукциона пауза между ставками сокращается до нуля
+            remaining = max(0.0, end - time.time())
+            await asyncio.sleep(rng.uniform(0, think) * min(1.0, remaining / 60))
+    finally:
+        client.close()
+
+
+async def storm(url, setup, think=2.0, timeout=10.0, grace=2.0, seed=0):
+    """
+    Торги всех покупателей до конца аукциона плюс grace секунд.
+    Возвращает (статистика по эндпоинтам, нарушения, увиденные клиентами).
+    """
+    stats = Stats()
+    violations = []
+    deadline = setup.auction.end_time.timestamp() + grace
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _buyer(url, setup, user_id, random.Random(f'{seed}-{index}'), deadline, think, timeout, stats, violations)
+        for index, user_id in enumerate(setup.buyer_ids)
+    ))
+    return stats.report(time.perf_counter() - started), violations
+
+
+def check(setup):
+    """Нарушения инвариантов в базе после прогона (и подведения итогов)"""
+    violations = []
+    lots = Lot.objects.filter(pk__in=setup.lot_ids).order_by('id')
+    settled = all(lot.settled_at for lot in lots)
+    for lot in lots:
+        bids = list(Bid.objects.filter(lot=lot).order_by('id').values_list('amount', 'user_id'))
+        for (previous, _), (amount, _) in zip(bids, bids[1:]):
+            if amount <= previous:
+                violations.append(f"Лот {lot.pk}: ставка {amount} принята после {previous}")
+        if not bids:
+            continue
+        top_amount, top_user = max(bids, key=lambda bid: bid[0])
+        if (lot.current_price, lot.current_leader_id, lot.bid_count) != (top_amount, top_user, len(bids)):
+            violations.append(
+                f"Лот {lot.pk}: состояние торгов {lot.current_price}/{lot.current_leader_id}/{lot.bid_count}, "
+                f"по ставкам {top_amount}/{top_user}/{len(bids)}"
+            )
+        if settled and (lot.winner_id, lot.winning_bid_amount) != (top_user, top_amount):
+            violations.append(f"Лот {lot.pk}: победитель {lot.winner_id} за {lot.winning_bid_amount}")
+
+    balances = dict(Balance.objects.filter(user_id__in=setup.buyer_ids).values_list('user_id', 'amount'))
+    for user_id, amount in balances.items():
+        if amount < 0:
+            violations.append(f"Покупатель {user_id}: отрицательный баланс {amount}")
+    ledger = (
+        LedgerEntry.objects.filter(user_id__in=setup.buyer_ids)
+        .values('user_id').order_by().annotate(total=Sum(LedgerEntry.signed_amount()))
+    )
+    for row in ledger:
+        if row['total'] != balances.get(row['user_id']):
+            violations.append(
+                f"Покупатель {row['user_id']}: баланс {balances.get(row['user_id'])}, по журналу {row['total']}"
+            )
+
+    # Удержание под ставку возвращается (release, refund) или списывается (capture) ровно один раз.
+    # До подведения итогов удержанной остается только ставка текущего лидера
+    leaders = {(lot.current_leader_id, lot.pk): lot.current_price for lot in lots if not settled}
+    outstanding = (
+        LedgerEntry.objects.filter(user_id__in=setup.buyer_ids, lot_id__in=setup.lot_ids)
+        .values('user_id', 'lot_id').order_by()
+        .annotate(held=Sum(Case(
+            When(kind=LedgerEntry.KIND_HOLD, then=F('amount')),
+            When(kind__in=[LedgerEntry.KIND_RELEASE, LedgerEntry.KIND_REFUND, LedgerEntry.KIND_CAPTURE],
+                 then=-F('amount')),
+            default=0,
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )))
+    )
+    for row in outstanding:
+        expected = leaders.get((row['user_id'], row['lot_id']), 0)
+        if row['held'] < expected:
+            violations.append(
+                f"Покупатель {row['user_id']}, лот {row['lot_id']}: возвращено на {expected - row['held']} больше удержанного"
+            )
+        elif row['held'] > expected:
+            violations.append(
+                f"Покупатель {row['user_id']}, лот {row['lot_id']}: не возвращено {row['held'] - expected}"
+            )
+    return violations
@@ -0,0 +1,40 @@
+"""
+Распределенные блокировки между воркерами Celery и процессами веб-сервера.
+"""
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+
+
+@contextmanager
+def advisory_lock(name, timeout=30 * 60):
+    """
+    Неблокирующая именованная блокировка. Возвращает True, если блокировка
+    получена, и False, если ее уже держит другой процесс.
+
+    На PostgreSQL используется сессионная advisory-блокировка: она снимается
+    при выходе из блока или при обрыве соединения упавшего воркера.
+    На других базах используется блокировка в кэше, которая истекает через timeout.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [name])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [name])
+        return
+
+    key = f"lock:{name}"
+    token = uuid.uuid4().hex
+    acquired = cache.add(key, token, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
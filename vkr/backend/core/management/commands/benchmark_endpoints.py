@@ -0,0 +1,102 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from core import benchmark, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет эндпоинты API (ставка, список лотов, аукцион, ставки лота, мои ставки, "
+        "уведомления, проверка билета, подведение итогов) на синтетическом наборе данных: "
+        "p50/p95/p99, число SQL-запросов и пик памяти за вызов (см. core/benchmark.py). "
+        "Если набора с --seed нет, он создается и после замеров откатывается. "
+        "С --baseline регрессией считается только рост числа SQL-запросов: время и память "
+        "зависят от машины и сравниваются лишь с --latency-tolerance/--memory-tolerance "
+        "против результатов (--output), записанных на той же машине"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Набор данных seed_load')
+        parser.add_argument('--iterations', type=int, default=50, help='Замеров времени на сценарий')
+        parser.add_argument('--only', nargs='+', help='Замерить только указанные сценарии')
+        parser.add_argument('--output', help='Записать результаты в JSON-файл')
+        parser.add_argument('--baseline', help='Базовый JSON-файл для сравнения')
+        parser.add_argument(
+            '--write-baseline', action='store_true',
+            help='Перезаписать базовый файл числом SQL-запросов сценариев',
+        )
+        parser.add_argument(
+            '--latency-tolerance', type=float,
+            help='Сравнивать и p95 с этим допустимым ростом (доля); только для базы с той же машины',
+        )
+        parser.add_argument(
+            '--memory-tolerance', type=float,
+            help='Сравнивать и память с этим допустимым ростом (доля); только для базы с той же машины',
+        )
+        # Размер набора, который создается, если набора с --seed нет
+        parser.add_argument('--charities', type=int, default=5)
+        parser.add_argument('--auctions-per-charity', type=int, default=10)
+        parser.add_argument('--lots-per-auction', type=int, default=20)
+        parser.add_argument('--bids-per-lot', type=int, default=10)
+        parser.add_argument('--buyers', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['write_baseline'] and not options['baseline']:
+            raise CommandError("Для --write-baseline нужен --baseline")
+
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            if seed.exists(options['seed']):
+                dataset = {'seed': options['seed']}
+            else:
+                dataset = {
+                    'seed': options['seed'],
+                    'charities': options['charities'],
+                    'auctions_per_charity': options['auctions_per_charity'],
+                    'lots_per_auction': options['lots_per_auction'],
+                    'bids_per_lot': options['bids_per_lot'],
+                    'buyers': options['buyers'],
+                }
+                self.stdout.write("Набор данных не найден, создается временный: " + json.dumps(dataset))
+                seed.generate(**dataset)
+
+            try:
+                results = benchmark.run(
+                    options['seed'], options['iterations'], only=options['only'], progress=self._report,
+                )
+            except benchmark.BenchmarkError as e:
+                raise CommandError(str(e))
+            transaction.set_rollback(True)
+
+        report = {'dataset': dataset, 'iterations': options['iterations'], 'endpoints': results}
+        if options['output']:
+            self._write(options['output'], report)
+        if options['write_baseline']:
+            # В базу попадает только метрика, не зависящая от машины
+            self._write(options['baseline'], dict(report, endpoints={
+                name: {'queries': metrics['queries']} for name, metrics in results.items()
+            }))
+            return
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as source:
+                baseline = json.load(source)
+            regressions = benchmark.compare(
+                results, baseline['endpoints'], options['latency_tolerance'], options['memory_tolerance'],
+            )
+            if regressions:
+                raise CommandError("Регрессии относительно базы:\n" + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS("Регрессий относительно базы нет"))
+
+    def _report(self, name, metrics):
+        self.stdout.write(
+            f"{name}: p50 {metrics['p50_ms']} мс, p95 {metrics['p95_ms']} мс, p99 {metrics['p99_ms']} мс, "
+            f"запросов {metrics['queries']}, память {metrics['memory_kb']} КБ"
+        )
+
+    def _write(self, path, report):
+        with open(path, 'w', encoding='utf-8') as target:
+            json.dump(report, target, ensure_ascii=False, indent=2)
+            target.write('\n')
+        self.stdout.write(f"Результаты записаны в {path}")
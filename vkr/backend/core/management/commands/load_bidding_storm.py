@@ -0,0 +1,81 @@
+import asyncio
+import json
+import resource
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from auctions.models import Auction
+from auctions.settlement import settle_auction
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест последней минуты аукциона (см. core/loadtest.py): покупатели одновременно "
+        "торгуются за горячие лоты через запущенный сервер, после подведения итогов сверяются "
+        "инварианты. Сервер должен работать с той же базой, например: "
+        "gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker -w 4 --bind 127.0.0.1:8000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--buyers', type=int, default=2000)
+        parser.add_argument('--lots', type=int, default=5, help='Число горячих лотов')
+        parser.add_argument('--duration', type=int, default=60, help='Секунд до конца аукциона')
+        parser.add_argument('--think', type=float, default=2.0, help='Наибольшая пауза между ставками, с')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Таймаут запроса, с')
+        parser.add_argument('--balance', type=Decimal, default=Decimal('1000000.00'), help='Баланс покупателя')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--max-error-rate', type=float, default=0.01, help='Допустимая доля ошибок')
+        parser.add_argument('--output', help='Записать отчет в JSON-файл')
+        parser.add_argument('--no-settle', action='store_true', help='Не подводить итоги после торгов')
+        parser.add_argument('--keep', action='store_true', help='Не удалять созданные данные')
+
+    def handle(self, *args, **options):
+        # Каждому покупателю нужно свое соединение
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < options['buyers'] + 100:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, options['buyers'] + 100), hard))
+
+        setup = loadtest.prepare(options['buyers'], options['lots'], options['duration'], options['balance'])
+        self.stdout.write(
+            f"Аукцион {setup.auction.pk}: {options['lots']} лотов, {options['buyers']} покупателей, "
+            f"завершение в {timezone.localtime(setup.auction.end_time):%H:%M:%S}"
+        )
+        try:
+            endpoints, violations = asyncio.run(loadtest.storm(
+                options['url'], setup, think=options['think'], timeout=options['timeout'], seed=options['seed'],
+            ))
+            if not options['no_settle']:
+                # Итоги мог подвести и воркер Celery сервера: тогда settle_auction вернет 0
+                auction = Auction.objects.select_related('charity').get(pk=setup.auction.pk)
+                started = time.perf_counter()
+                settled = settle_auction(auction)
+                self.stdout.write(f"Подведение итогов: {settled} лотов, {time.perf_counter() - started:.2f} с")
+            violations += loadtest.check(setup)
+        finally:
+            if not options['keep']:
+                loadtest.cleanup(setup)
+
+        for name, metrics in endpoints.items():
+            self.stdout.write(
+                f"{name}: {metrics['requests']} запросов, {metrics['rps']} в секунду, "
+                f"ошибок {metrics['error_rate']:.2%}, отказов {metrics['rejected']}, "
+                f"p50 {metrics['p50_ms']} мс, p95 {metrics['p95_ms']} мс, p99 {metrics['p99_ms']} мс"
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump({'endpoints': endpoints, 'violations': violations}, target, ensure_ascii=False, indent=2)
+                target.write('\n')
+
+        problems = [f"Нарушение: {violation}" for violation in violations]
+        problems += [
+            f"{name}: доля ошибок {metrics['error_rate']:.2%}"
+            for name, metrics in endpoints.items() if metrics['error_rate'] > options['max_error_rate']
+        ]
+        if problems:
+            raise CommandError('\n'.join(problems[:50]))
+        self.stdout.write(self.style.SUCCESS("Нарушений инвариантов нет"))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Создает синтетический набор данных для нагрузочных тестов и замеров: организации, "
+        "аукционы, лоты, изображения, ставки, комментарии, уведомления и транзакции "
+        "(см. core/seed.py). Набор определяется параметрами и --seed. "
+        "Около 10 млн ставок: --charities 100 --auctions-per-charity 40 --lots-per-auction 50 --bids-per-lot 50"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Зерно генератора')
+        parser.add_argument('--charities', type=int, default=10)
+        parser.add_argument('--auctions-per-charity', type=int, default=20)
+        parser.add_argument('--lots-per-auction', type=int, default=50)
+        parser.add_argument('--bids-per-lot', type=int, default=20, help='Среднее число ставок на лот')
+        parser.add_argument('--donors', type=int, default=100)
+        parser.add_argument('--buyers', type=int, default=1000)
+        parser.add_argument('--images-per-lot', type=int, default=2)
+        parser.add_argument('--comments-per-lot', type=int, default=2, help='Среднее число комментариев на лот')
+        parser.add_argument('--notifications-per-user', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options['charities'] < 1 or options['donors'] < 1 or options['buyers'] < 2:
+            raise CommandError("Нужны хотя бы одна организация, один донор и два покупателя")
+        if seed.exists(options['seed']):
+            raise CommandError(
+                f"Набор с seed {options['seed']} уже создан: укажите другой --seed или пустую базу"
+            )
+
+        started = time.perf_counter()
+        counts = seed.generate(
+            seed=options['seed'],
+            charities=options['charities'],
+            auctions_per_charity=options['auctions_per_charity'],
+            lots_per_auction=options['lots_per_auction'],
+            bids_per_lot=options['bids_per_lot'],
+            donors=options['donors'],
+            buyers=options['buyers'],
+            images_per_lot=options['images_per_lot'],
+            comments_per_lot=options['comments_per_lot'],
+            notifications_per_user=options['notifications_per_user'],
+            progress=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{table}: {count}" for table, count in counts.items()) + f", время: {elapsed:.1f} с"
+        ))
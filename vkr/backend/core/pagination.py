@@ -0,0 +1,192 @@
+"""
+Keyset-пагинация списков.
+
+Страница выбирается условием по значениям полей сортировки последней
+записи предыдущей страницы, а не OFFSET, поэтому время ответа не растет
+с номером страницы и размером таблицы.
+"""
+import datetime
+import json
+from decimal import InvalidOperation
+from bisect import bisect_left, bisect_right
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Сохраняет микросекунды: DjangoJSONEncoder округляет время до миллисекунд"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Пагинация по непрозрачному курсору с сортировкой по нескольким полям.
+
+    Сортировка берется из запроса (order_by в представлении или OrderingFilter),
+    иначе из Meta.ordering модели, иначе по убыванию pk. Для однозначности
+    к ней всегда добавляется pk, так что сортировка (created_at, id) или
+    (amount, id) дает устойчивый порядок даже при совпадающих значениях.
+    Поля сортировки не должны содержать NULL.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', 200)
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor['reverse']
+        ordering = _invert(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            # Значения позиции приводятся к типам полей здесь: подделанный
+            # курсор с неверной датой или числом дает 404, а не ошибку сервера
+            try:
+                queryset = queryset.filter(_keyset_filter(ordering, self.cursor['position']))
+            except (ValidationError, ValueError, TypeError, InvalidOperation):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        if self.page:
+            self.first_position = [_value(self.page[0], field) for field in self.ordering]
+            self.last_position = [_value(self.page[-1], field) for field in self.ordering]
+
+        self.request = request
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering:
+            ordering = ['-pk']
+        elif not all(isinstance(field, str) and field != '?' for field in ordering):
+            # Позицию курсора можно составить только из значений полей: другой
+            # порядок незаметно отличался бы от объявленного представлением
+            raise ImproperlyConfigured(
+                f'{type(view).__name__}: keyset-пагинация поддерживает сортировку только по полям, '
+                f'получено {ordering!r}'
+            )
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor({'position': self.last_position, 'reverse': False})
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor({'position': self.first_position, 'reverse': True})
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position = data['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            return {'position': position, 'reverse': bool(data['r'])}
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        data = json.dumps({'p': cursor['position'], 'r': int(cursor['reverse'])}, cls=CursorEncoder)
+        encoded = urlsafe_b64encode(data.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+
+class ListKeysetPagination(KeysetPagination):
+    """
+    Та же курсорная пагинация для заранее посчитанного упорядоченного списка
+    пар (ключ сортировки, id), например из кэша. Страница находится бинарным
+    поиском по позиции курсора, формат курсора и ссылок тот же.
+    """
+
+    def paginate_list(self, items, request):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = ['key', 'pk']
+        self.cursor = self.decode_cursor(request)
+
+        try:
+            if self.cursor is None:
+                start, end = 0, self.page_size
+            elif self.cursor['reverse']:
+                end = bisect_left(items, tuple(self.cursor['position']))
+                start = max(end - self.page_size, 0)
+            else:
+                start = bisect_right(items, tuple(self.cursor['position']))
+                end = start + self.page_size
+        except TypeError:
+            # Позиция с типами, несравнимыми с ключами списка
+            raise NotFound(self.invalid_cursor_message)
+        self.page = items[start:end]
+        self.has_next = end < len(items)
+        self.has_previous = start > 0
+
+        if self.page:
+            self.first_position = list(self.page[0])
+            self.last_position = list(self.page[-1])
+
+        self.request = request
+        return self.page
+
+
+def _invert(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def _value(instance, field):
+    value = instance
+    for attr in field.lstrip('-').split('__'):
+        value = getattr(value, attr)
+    return value
+
+
+def _keyset_filter(ordering, position):
+    """
+    Условие "строго после позиции" для сортировки по нескольким полям:
+    (a > x) OR (a = x AND b > y) ... Дополнительное условие a >= x по первому
+    полю позволяет PostgreSQL начать просмотр индекса сразу с нужного места.
+    """
+    first = ordering[0]
+    bound = 'lte' if first.startswith('-') else 'gte'
+    condition = Q()
+    for i, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {ordering[j].lstrip('-'): position[j] for j in range(i)}
+        condition |= Q(**equal, **{f"{field.lstrip('-')}__{lookup}": position[i]})
+    return Q(**{f"{first.lstrip('-')}__{bound}": position[0]}) & condition
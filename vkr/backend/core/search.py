@@ -0,0 +1,50 @@
+"""
+Полнотекстовый поиск PostgreSQL по лотам и аукционам.
+
+Документ индексируется в двух конфигурациях: russian (со стеммингом,
+"картины" находит "картина") и simple (без изменения слов: фамилии,
+бренды, артикулы). Вектор хранится в генерируемой колонке с GIN-индексом.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+from rest_framework import filters
+
+SEARCH_CONFIGS = ('russian', 'simple')
+
+
+def document_vector(primary, secondary):
+    """Вектор документа: основное поле с весом A, дополнительное с весом B"""
+    vector = None
+    for config in SEARCH_CONFIGS:
+        part = SearchVector(primary, config=config, weight='A') + SearchVector(secondary, config=config, weight='B')
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def search_query(terms):
+    """Запрос в синтаксисе веб-поиска ("кавычки", OR, -исключение) для обеих конфигураций"""
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(terms, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return query
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Замена SearchFilter с тем же параметром ?search=. Вместо ILIKE по полям
+    использует GIN-индекс по колонке search_vector и сортирует по ts_rank.
+    """
+    search_vector_field = 'search_vector'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+        if not terms:
+            return queryset
+        query = search_query(terms)
+        return (
+            queryset
+            .filter(**{self.search_vector_field: query})
+            .annotate(search_rank=SearchRank(F(self.search_vector_field), query))
+            .order_by('-search_rank', '-pk')
+        )
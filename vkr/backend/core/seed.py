@@ -0,0 +1,329 @@
+"""
+Синтетические данные для нагрузочных тестов и замеров производительности.
+
+generate() создает организации, доноров и покупателей, аукционы, лоты с
+категориями и изображениями, ставки, комментарии, уведомления и транзакции.
+Содержимое зависит только от параметров и seed: повторный запуск на пустой
+базе с тем же seed дает те же строки (отличаются только id и время, которое
+отсчитывается от момента запуска). Пользователи набора получают адреса
+вида load<seed>-...@load.example, поэтому наборы с разными seed не пересекаются.
+
+Небольшие таблицы заполняются через bulk_create, крупные (ставки, комментарии,
+уведомления, связи с категориями, изображения) — через COPY. Аукционы
+обрабатываются частями по CHUNK_LOTS лотов, каждая часть — в своей транзакции,
+поэтому память процесса не зависит от размера набора.
+
+save() и сигналы не вызываются, поэтому состояние торгов лотов (current_price,
+current_leader, bid_count, last_bid_at) и итоги завершенных аукционов (winner,
+winning_bid_amount, settled_at) считаются при генерации ставок. Изображения
+ссылаются на несколько общих файлов-заглушек; их варианты создает команда
+backfill_image_variants.
+"""
+import csv
+import datetime
+import io
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from auctions.models import Auction
+from bids.models import Bid, Transaction
+from comments.models import Comment
+from lots.feeds import invalidate_ending_soon
+from lots.models import Category, Lot, LotCategory, LotFacetCount, LotImage
+from users.models import Balance, Charity, Notification, User
+from .cache import bump
+
+EMAIL_DOMAIN = 'load.example'
+# Лотов в одной транзакции записи
+CHUNK_LOTS = 5000
+# Строк в одном COPY
+COPY_ROWS = 100000
+# Доля идущих аукционов, остальные уже завершены
+ACTIVE_SHARE = 0.2
+# Доля лотов идущих аукционов, которые еще на рассмотрении
+PENDING_SHARE = 0.1
+PLACEHOLDERS = 8
+PLACEHOLDER_SIZE = (1200, 900)
+
+CATEGORIES = ['Искусство', 'Книги', 'Антиквариат', 'Украшения', 'Спорт', 'Музыка', 'Техника', 'Одежда']
+ADJECTIVES = ['Старинный', 'Редкий', 'Авторский', 'Коллекционный', 'Винтажный', 'Подписанный', 'Уникальный']
+NOUNS = ['сервиз', 'альбом', 'мяч', 'плакат', 'браслет', 'портрет', 'проигрыватель', 'шарф', 'атлас']
+COMMENTS = [
+    'Отличный лот!', 'Есть ли доставка в другой город?', 'Какое состояние предмета?',
+    'Участвую ради доброго дела', 'Можно больше фотографий?', 'Удачи всем участникам',
+]
+NOTIFICATIONS = [
+    ('Ставка перебита', 'Вашу ставку на лот перебили.'),
+    ('Аукцион завершается', 'Аукцион, в котором вы участвуете, скоро завершится.'),
+    ('Вы выиграли лот', 'Поздравляем! Ваша ставка оказалась победной.'),
+]
+
+
+def email(seed, kind, index):
+    return f'load{seed}-{kind}-{index}@{EMAIL_DOMAIN}'
+
+
+def exists(seed):
+    """Набор с этим seed уже создан"""
+    return User.objects.filter(email__startswith=f'load{seed}-', email__endswith=f'@{EMAIL_DOMAIN}').exists()
+
+
+def _timestamp(moment):
+    return datetime.datetime.fromtimestamp(moment, tz=datetime.timezone.utc).isoformat()
+
+
+def _money(kopecks):
+    return f'{kopecks // 100}.{kopecks % 100:02d}'
+
+
+def _decimal(kopecks):
+    return Decimal(kopecks) / 100
+
+
+def _column(model, name):
+    return model._meta.get_field(name).column
+
+
+class _Copy:
+    """Буфер строк таблицы, который отправляется в базу COPY каждые COPY_ROWS строк"""
+
+    def __init__(self, cursor, model, fields):
+        self.cursor = cursor
+        self.sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            model._meta.db_table, ', '.join(_column(model, name) for name in fields)
+        )
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.pending = 0
+        self.total = 0
+
+    def add(self, row):
+        # None записывается пустым полем без кавычек, которое COPY читает как NULL
+        self.writer.writerow(row)
+        self.pending += 1
+        if self.pending >= COPY_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.buffer.seek(0)
+            self.cursor.copy_expert(self.sql, self.buffer)
+            self.total += self.pending
+            self.buffer = io.StringIO()
+            self.writer = csv.writer(self.buffer)
+            self.pending = 0
+
+
+def _placeholders():
+    """Общие файлы изображений лотов набора"""
+    images = []
+    for index in range(PLACEHOLDERS):
+        name = f'lot_images/load/{index}.jpg'
+        if not default_storage.exists(name):
+            buffer = io.BytesIO()
+            color = (index * 73 % 256, index * 151 % 256, index * 199 % 256)
+            Image.new('RGB', PLACEHOLDER_SIZE, color).save(buffer, 'JPEG', quality=80)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        images.append(name)
+    return images
+
+
+def _users(seed, kind, role, count):
+    users = User.objects.bulk_create([
+        User(
+            email=email(seed, kind, index), username=f'load{seed}-{kind}-{index}', role=role,
+            password=UNUSABLE_PASSWORD_PREFIX, is_email_verified=True,
+        )
+        for index in range(count)
+    ], batch_size=2000)
+    Balance.objects.bulk_create([Balance(user=user) for user in users], batch_size=2000)
+    return users
+
+
+def _bids(rng, starting_price, count, buyers, start, end):
+    """
+    Возрастающая последовательность из count ставок на лот: каждая следующая
+    выше предыдущей на 2–10% стартовой цены и сделана другим участником позже
+    предыдущей. Возвращает [(id участника, сумма в копейках, время)].
+    """
+    price = starting_price * 100
+    bidder = None
+    sequence = []
+    span = (end - start) / max(count, 1)
+    for step in range(count):
+        price += max(100, starting_price * rng.randint(2, 10))
+        candidate = rng.randrange(len(buyers))
+        if bidder is not None and buyers[candidate] == bidder:
+            candidate = (candidate + 1) % len(buyers)
+        bidder = buyers[candidate]
+        sequence.append((bidder, price, start + span * (step + rng.random())))
+    return sequence
+
+
+def generate(seed=0, charities=10, auctions_per_charity=20, lots_per_auction=50, bids_per_lot=20,
+             donors=100, buyers=1000, images_per_lot=2, comments_per_lot=2, notifications_per_user=10,
+             progress=None):
+    """
+    Создает набор данных. progress(сообщение) вызывается после каждого этапа
+    и каждой записанной части. Возвращает число созданных строк по таблицам.
+    """
+    rng = random.Random(seed)
+    now = timezone.now().timestamp()
+    report = progress or (lambda message: None)
+    counts = {}
+
+    with transaction.atomic():
+        charity_users = _users(seed, 'charity', User.CHARITY, charities)
+        charity_rows = Charity.objects.bulk_create([
+            Charity(user=user, name=f'Фонд {index + 1} (load{seed})', description='Синтетическая организация')
+            for index, user in enumerate(charity_users)
+        ])
+        donor_ids = [user.pk for user in _users(seed, 'donor', User.DONOR, donors)]
+        buyer_ids = [user.pk for user in _users(seed, 'buyer', User.BUYER, buyers)]
+        categories = list(Category.objects.order_by('id').values_list('id', flat=True))
+        if not categories:
+            categories = [category.pk for category in Category.objects.bulk_create([
+                Category(name=name) for name in CATEGORIES
+            ])]
+
+        auction_rows = []
+        for charity in charity_rows:
+            for index in range(auctions_per_charity):
+                active = rng.random() < ACTIVE_SHARE
+                # Идущие аукционы завершаются в ближайшие две недели, завершенные — за последний год
+                end = now + rng.uniform(600, 14 * 86400) if active else now - rng.uniform(3600, 365 * 86400)
+                start = end - rng.uniform(3, 30) * 86400
+                paid = rng.random() < 0.1
+                auction_rows.append(Auction(
+                    charity=charity, name=f'Аукцион {index + 1}: {charity.name}',
+                    description='Синтетический аукцион',
+                    start_time=datetime.datetime.fromtimestamp(start, tz=datetime.timezone.utc),
+                    end_time=datetime.datetime.fromtimestamp(end, tz=datetime.timezone.utc),
+                    status=Auction.STATUS_ACTIVE if active else Auction.STATUS_COMPLETED,
+                    is_paid=paid, ticket_price=rng.choice([100, 300, 500]) if paid else 0,
+                ))
+        auctions = Auction.objects.bulk_create(auction_rows, batch_size=2000)
+        counts.update(users=charities + donors + buyers, charities=charities, auctions=len(auctions))
+    images = _placeholders()
+    report(f"Пользователей: {counts['users']}, аукционов: {counts['auctions']}")
+
+    for key in ('lots', 'bids', 'lot_categories', 'lot_images', 'comments', 'transactions'):
+        counts[key] = 0
+    per_chunk = max(1, CHUNK_LOTS // max(lots_per_auction, 1))
+    for first in range(0, len(auctions), per_chunk):
+        chunk = auctions[first:first + per_chunk]
+        with transaction.atomic(), connection.cursor() as cursor:
+            _write_lots(rng, cursor, chunk, donor_ids, buyer_ids, categories, images, counts, now, options={
+                'lots_per_auction': lots_per_auction, 'bids_per_lot': bids_per_lot,
+                'images_per_lot': images_per_lot, 'comments_per_lot': comments_per_lot,
+            })
+        report(f"Аукционов: {first + len(chunk)}/{len(auctions)}, лотов: {counts['lots']}, ставок: {counts['bids']}")
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        notifications = _Copy(cursor, Notification, ['user', 'subject', 'message', 'is_read', 'sent_at'])
+        for user_id in buyer_ids:
+            for _ in range(notifications_per_user):
+                subject, message = rng.choice(NOTIFICATIONS)
+                notifications.add([
+                    user_id, subject, message, rng.random() < 0.8, _timestamp(now - rng.uniform(0, 30 * 86400)),
+                ])
+        notifications.flush()
+        counts['notifications'] = notifications.total
+
+        # Триггеры добавили по записи счетчиков фасетов на каждый лот
+        LotFacetCount.compact()
+        bump('auctions', 'lots', 'categories')
+        transaction.on_commit(invalidate_ending_soon)
+    with connection.cursor() as cursor:
+        for model in (Auction, Lot, LotCategory, LotImage, Bid, Comment, Notification, Transaction):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+    report(f"Уведомлений: {counts['notifications']}")
+    return counts
+
+
+def _write_lots(rng, cursor, auctions, donor_ids, buyer_ids, categories, images, counts, now, options):
+    lots = []
+    plans = []
+    for auction in auctions:
+        start = auction.start_time.timestamp()
+        end = auction.end_time.timestamp()
+        active = auction.status == Auction.STATUS_ACTIVE
+        for index in range(options['lots_per_auction']):
+            starting_price = rng.choice([100, 500, 1000, 3000, 5000, 10000, 25000])
+            lot = Lot(
+                auction=auction, donor_id=rng.choice(donor_ids),
+                title=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} №{index + 1}',
+                description=f'Лот аукциона «{auction.name}»',
+                starting_price=starting_price,
+            )
+            # Лоты на рассмотрении и лоты еще не начавшихся аукционов ставок не принимают
+            pending = active and rng.random() < PENDING_SHARE
+            count = rng.randint(0, 2 * options['bids_per_lot'])
+            sequence = [] if pending or start >= now else _bids(
+                rng, starting_price, count, buyer_ids, start, min(end, now)
+            )
+            if sequence:
+                bidder, price, moment = sequence[-1]
+                lot.current_leader_id = bidder
+                lot.current_price = _decimal(price)
+                lot.bid_count = len(sequence)
+                lot.last_bid_at = datetime.datetime.fromtimestamp(moment, tz=datetime.timezone.utc)
+            if active:
+                lot.status = Lot.STATUS_PENDING if pending else Lot.STATUS_APPROVED
+            else:
+                lot.status = Lot.STATUS_SOLD if sequence else Lot.STATUS_NOT_SOLD
+                lot.settled_at = auction.end_time
+                if sequence:
+                    lot.winner_id = lot.current_leader_id
+                    lot.winning_bid_amount = lot.current_price
+            lots.append(lot)
+            plans.append((
+                sequence,
+                rng.sample(categories, min(len(categories), rng.randint(1, 2))),
+                [rng.choice(images) for _ in range(options['images_per_lot'])],
+                [
+                    (rng.choice(buyer_ids), rng.choice(COMMENTS), rng.uniform(start, max(start, min(end, now))))
+                    for _ in range(rng.randint(0, 2 * options['comments_per_lot']))
+                ],
+                rng.random() < 0.7,
+            ))
+    lots = Lot.objects.bulk_create(lots, batch_size=2000)
+
+    bids = _Copy(cursor, Bid, ['lot', 'user', 'amount', 'created_at'])
+    lot_categories = _Copy(cursor, LotCategory, ['lot', 'category'])
+    lot_images = _Copy(cursor, LotImage, ['lot', 'image', 'created_at', 'width', 'height', 'variants'])
+    comments = _Copy(cursor, Comment, ['lot', 'user', 'content', 'created_at'])
+    transactions = []
+    for lot, (sequence, lot_category_ids, lot_image_names, lot_comments, paid) in zip(lots, plans):
+        for bidder, price, moment in sequence:
+            bids.add([lot.pk, bidder, _money(price), _timestamp(moment)])
+        for category_id in lot_category_ids:
+            lot_categories.add([lot.pk, category_id])
+        created = _timestamp(lot.auction.start_time.timestamp())
+        for name in lot_image_names:
+            lot_images.add([lot.pk, name, created, PLACEHOLDER_SIZE[0], PLACEHOLDER_SIZE[1], '{}'])
+        for user_id, content, moment in lot_comments:
+            comments.add([lot.pk, user_id, content, _timestamp(moment)])
+        if lot.status == Lot.STATUS_SOLD:
+            transactions.append(Transaction(
+                lot=lot, user_id=lot.winner_id, amount=lot.winning_bid_amount, payment_method='balance',
+                payment_time=lot.settled_at + datetime.timedelta(hours=1),
+                status=Transaction.STATUS_COMPLETED if paid else Transaction.STATUS_PENDING,
+            ))
+    for buffer in (bids, lot_categories, lot_images, comments):
+        buffer.flush()
+    Transaction.objects.bulk_create(transactions, batch_size=2000)
+
+    counts['lots'] += len(lots)
+    counts['bids'] += bids.total
+    counts['lot_categories'] += lot_categories.total
+    counts['lot_images'] += lot_images.total
+    counts['comments'] += comments.total
+    counts['transactions'] += len(transactions)
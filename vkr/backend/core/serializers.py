@@ -0,0 +1,15 @@
+def eager_load(queryset, serializer_class):
+    """
+    Применяет к queryset связи, которые объявлены в Meta сериализатора:
+    select_related для ForeignKey/OneToOne и prefetch_related для обратных
+    и ManyToMany связей. Так список из N объектов сериализуется
+    фиксированным числом запросов, а не 1 + N.
+    """
+    meta = getattr(serializer_class, 'Meta', None)
+    select_related = getattr(meta, 'select_related', ())
+    prefetch_related = getattr(meta, 'prefetch_related', ())
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
@@ -0,0 +1,258 @@
+"""
+Поток событий аукционов и лотов для клиентов (Server-Sent Events).
+
+Каждое событие сериализуется один раз и раздается всем подписчикам канала
+в процессе, поэтому тысячи наблюдателей за аукционом обходятся одной
+рассылкой на ставку вместо запроса к базе на каждый опрос.
+
+Без EVENT_STREAM_REDIS_URL события раздаются только внутри процесса.
+Если веб-серверов несколько или события публикуют воркеры Celery,
+нужен Redis: каждый процесс держит одну подписку и раздает события
+своим клиентам сам.
+
+Потоки доступны тем же пользователям, что и заменяемые ими эндпоинты:
+запрос аутентифицируется JWT из заголовка, как в DRF, или билетом потока
+(stream_user), а представления проверяют доступ к аукциону и лоту до подписки.
+"""
+import asyncio
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import Token
+
+
+CHANNEL_PREFIX = 'events:'
+
+
+def auction_channel(auction_id):
+    return f"{CHANNEL_PREFIX}auction:{auction_id}"
+
+
+def lot_channel(lot_id):
+    return f"{CHANNEL_PREFIX}lot:{lot_id}"
+
+
+class Subscription:
+    """Очередь событий одного клиента, привязанная к его циклу событий"""
+
+    def __init__(self, channels, maxsize):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, message):
+        # Вызывается из цикла событий подписчика
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Медленный клиент отключается и переподключается сам (EventSource),
+            # вместо того чтобы копить события в памяти
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class LocalBroker:
+    """Раздача событий подписчикам внутри текущего процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, settings.EVENT_STREAM_QUEUE_SIZE)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def publish(self, channels, message):
+        self.fan_out(channels, message)
+
+    def fan_out(self, channels, message):
+        with self._lock:
+            subscriptions = set()
+            for channel in channels:
+                subscriptions.update(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            # Публикация может прийти из потока синхронного представления или задачи
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # Цикл событий клиента уже закрыт
+                self.unsubscribe(subscription)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Публикация через Redis PUBLISH. Каждый процесс держит одну подписку
+    на все каналы событий и раздает полученные сообщения своим клиентам.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._client = None
+        self._listeners = {}
+
+    def _get_client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def subscribe(self, channels):
+        subscription = super().subscribe(channels)
+        loop = subscription.loop
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            self._listeners[loop] = loop.create_task(self._listen())
+        return subscription
+
+    def publish(self, channels, message):
+        client = self._get_client()
+        for channel in channels:
+            client.publish(channel, message)
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            async for item in pubsub.listen():
+                if item['type'] != 'pmessage':
+                    continue
+                self.fan_out([item['channel'].decode()], item['data'].decode())
+        except Exception as e:
+            logging.error(f"Подписка на события в Redis прервана: {e}")
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = settings.EVENT_STREAM_REDIS_URL
+            _broker = RedisBroker(url) if url else LocalBroker()
+        return _broker
+
+
+def format_event(event_type, data):
+    """Сообщение в формате text/event-stream"""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"event: {event_type}\ndata: {payload}\n\n"
+
+
+def publish(channels, event_type, data):
+    """
+    Публикует событие после фиксации текущей транзакции, чтобы клиенты
+    не увидели ставку или итог, который затем откатится.
+    """
+    message = format_event(event_type, data)
+
+    def send():
+        try:
+            get_broker().publish(list(channels), message)
+        except Exception as e:
+            logging.error(f"Не удалось опубликовать событие {event_type}: {e}")
+
+    transaction.on_commit(send)
+
+
+async def _stream(channels):
+    broker = get_broker()
+    subscription = broker.subscribe(channels)
+    heartbeat = settings.EVENT_STREAM_HEARTBEAT
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # Комментарий не дает прокси закрыть простаивающее соединение
+                yield ": ping\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def event_stream_response(channels):
+    response = StreamingHttpResponse(_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class StreamTicket(Token):
+    """
+    Билет на подключение к потоку событий. EventSource не умеет передавать
+    заголовки, и учетные данные попадают в URL, а с ним в журналы прокси
+    и историю браузера. Поэтому в URL передается не токен доступа, а билет:
+    он живет EVENT_STREAM_TICKET_LIFETIME секунд и из-за своего token_type
+    не принимается остальными эндпоинтами API.
+    """
+    token_type = 'stream'
+    lifetime = timedelta(seconds=settings.EVENT_STREAM_TICKET_LIFETIME)
+
+
+def _authenticate(request):
+    authentication = JWTAuthentication()
+    try:
+        result = authentication.authenticate(request)
+        if result is not None:
+            return result[0]
+        raw_ticket = request.GET.get('ticket')
+        if not raw_ticket:
+            return None
+        return authentication.get_user(StreamTicket(raw_ticket))
+    except (TokenError, InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def stream_user(request):
+    """
+    Пользователь по JWT из заголовка Authorization или по билету из параметра
+    ticket. None, если учетных данных нет или они недействительны.
+    """
+    return await sync_to_async(_authenticate)(request)
+
+
+def stream_error(status, detail):
+    """Ответ об ошибке в формате DRF"""
+    response = JsonResponse({'detail': detail}, status=status)
+    if status == 401:
+        response['WWW-Authenticate'] = 'Bearer realm="api"'
+    return response
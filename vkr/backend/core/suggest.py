@@ -0,0 +1,83 @@
+"""
+Подсказки при наборе поискового запроса.
+
+Совпадения ищутся по триграммам (pg_trgm) названий лотов, аукционов,
+фондов и категорий: оператор word_similarity находит и начало слова
+("карт" -> "Картина маслом"), и слово с опечаткой ("картена"), и
+обслуживается GIN-индексом gin_trgm_ops по названию. Ответ содержит
+только id и название, а результаты для частых префиксов кэшируются.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Length
+
+from auctions.models import Auction
+from lots.models import Lot, Category
+from users.models import Charity
+
+MAX_QUERY_LENGTH = 64
+
+# Тип подсказки -> (queryset, поле названия). В подсказки попадают только
+# объекты, которые видны в публичных списках
+SOURCES = {
+    'lots': (lambda: Lot.objects.filter(status__in=[Lot.STATUS_APPROVED, Lot.STATUS_SOLD]), 'title'),
+    'auctions': (lambda: Auction.objects.exclude(status=Auction.STATUS_CANCELLED), 'name'),
+    'charities': (lambda: Charity.objects.all(), 'name'),
+    'categories': (lambda: Category.objects.all(), 'name'),
+}
+
+
+def normalize(query):
+    """Приводит запрос к виду, по которому строится ключ кэша"""
+    return ' '.join(query.replace('\x00', '').lower().split())[:MAX_QUERY_LENGTH]
+
+
+def _matches(source, query, limit):
+    queryset, field = SOURCES[source]
+    return list(
+        queryset()
+        .filter(**{f'{field}__trigram_word_similar': query})
+        .annotate(
+            # Названия, начинающиеся с запроса, выше остальных совпадений
+            prefix=Case(
+                When(**{f'{field}__istartswith': query}, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+            similarity=TrigramWordSimilarity(query, field),
+        )
+        .order_by('prefix', '-similarity', Length(field), 'pk')
+        .values('id', field)[:limit]
+    )
+
+
+def suggest(query, types=None, limit=None):
+    """
+    Подсказки по нормализованному запросу: {тип: [{"id": ..., "title"|"name": ...}]}.
+    Пустой результат для запросов короче SUGGEST_MIN_LENGTH.
+    """
+    types = [source for source in SOURCES if types is None or source in types]
+    limit = limit or settings.SUGGEST_LIMIT
+    if len(query) < settings.SUGGEST_MIN_LENGTH:
+        return {source: [] for source in types}
+
+    digest = hashlib.md5(query.encode()).hexdigest()
+    key = f"suggest:{','.join(types)}:{limit}:{digest}"
+    result = cache.get(key)
+    if result is None:
+        with transaction.atomic():
+            # Порог по умолчанию (0.6) отсекает опечатку в коротком слове;
+            # set_config(..., true) действует только до конца транзакции
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                    [str(settings.SUGGEST_SIMILARITY_THRESHOLD)],
+                )
+            result = {source: _matches(source, query, limit) for source in types}
+        cache.set(key, result, settings.SUGGEST_CACHE_TIMEOUT)
+    return result
@@ -1,2 +1,647 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
 
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import F, Prefetch
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from auctions.models import Auction, AuctionEvent, AuctionTicket
+from bids.models import Bid, Transaction
+from comments.models import Comment
+from lots.models import Lot, Category, LotCategory, LotImage
+from users.models import LedgerEntry, User, Notification
+from . import benchmark, loadtest, seed
+from .pagination import KeysetPagination, ListKeysetPagination
+from .streams import LocalBroker, StreamTicket, auction_channel, lot_channel, format_event
+
+
+class LocalBrokerTest(SimpleTestCase):
+    """Раздача событий подписчикам каналов внутри процесса"""
+
+    def test_publish_from_thread_reaches_channel_subscribers_once(self):
+        async def scenario():
+            broker = LocalBroker()
+            watchers = [broker.subscribe([auction_channel(1)]) for _ in range(3)]
+            both = broker.subscribe([auction_channel(1), lot_channel(5)])
+            other = broker.subscribe([auction_channel(2)])
+
+            message = format_event('bid_placed', {'lot': 5})
+            # Публикация приходит из потока синхронного представления
+            await asyncio.to_thread(broker.publish, [auction_channel(1), lot_channel(5)], message)
+            await asyncio.sleep(0)
+
+            for subscription in watchers + [both]:
+                self.assertEqual(subscription.queue.get_nowait(), message)
+                self.assertTrue(subscription.queue.empty())
+            self.assertTrue(other.queue.empty())
+
+            broker.unsubscribe(other)
+            self.assertNotIn(auction_channel(2), broker._subscriptions)
+
+        asyncio.run(scenario())
+
+    def test_slow_subscriber_is_disconnected(self):
+        async def scenario():
+            broker = LocalBroker()
+            with self.settings(EVENT_STREAM_QUEUE_SIZE=2):
+                subscription = broker.subscribe([lot_channel(1)])
+            for i in range(3):
+                broker.publish([lot_channel(1)], f"event {i}")
+            await asyncio.sleep(0)
+
+            self.assertTrue(subscription.overflowed)
+            self.assertIsNone(subscription.queue.get_nowait())
+
+        asyncio.run(scenario())
+
+
+class EventStreamAccessTest(TestCase):
+    """Потоки событий доступны тем же пользователям, что и by_lot/by_auction"""
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        self.donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.buyer = User.objects.create_user(email='buyer@example.com', role=User.BUYER)
+        self.ticket_holder = User.objects.create_user(email='holder@example.com', role=User.BUYER)
+        self.auction = Auction.objects.create(
+            charity=organization.charity, name='Платный аукцион', is_paid=True, ticket_price=Decimal('100.00'),
+            start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=1),
+        )
+        AuctionTicket.objects.create(auction=self.auction, user=self.ticket_holder)
+        self.lot = Lot.objects.create(
+            auction=self.auction, donor=self.donor, title='Лот',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+        self.pending = Lot.objects.create(
+            auction=self.auction, donor=self.donor, title='Лот на рассмотрении', starting_price=Decimal('10.00'),
+        )
+
+    def _get(self, path, user=None, header=False):
+        if user is None:
+            return self.client.get(path)
+        if header:
+            return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return self.client.get(path, {'ticket': str(StreamTicket.for_user(user))})
+
+    def test_anonymous_and_invalid_token_are_rejected(self):
+        for path in (f'/api/v1/auctions/{self.auction.pk}/stream/', f'/api/v1/lots/{self.lot.pk}/stream/'):
+            self.assertEqual(self._get(path).status_code, 401, path)
+            self.assertEqual(self.client.get(path, {'ticket': 'broken'}).status_code, 401, path)
+
+    def test_access_token_is_not_accepted_in_url(self):
+        path = f'/api/v1/auctions/{self.auction.pk}/stream/'
+        access = str(AccessToken.for_user(self.donor))
+        self.assertEqual(self.client.get(path, {'token': access}).status_code, 401)
+        self.assertEqual(self.client.get(path, {'ticket': access}).status_code, 401)
+
+        expired = StreamTicket.for_user(self.donor)
+        expired.set_exp(lifetime=-timedelta(seconds=1))
+        self.assertEqual(self.client.get(path, {'ticket': str(expired)}).status_code, 401)
+
+    def test_ticket_is_issued_only_for_streams(self):
+        self.assertEqual(self.client.post('/api/stream-ticket/').status_code, 401)
+        response = self.client.post(
+            '/api/stream-ticket/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.ticket_holder)}',
+        )
+        self.assertEqual(response.status_code, 200)
+        ticket = response.data['ticket']
+
+        path = f'/api/v1/lots/{self.lot.pk}/stream/'
+        self.assertEqual(self.client.get(path, {'ticket': ticket}).status_code, 200)
+        # Билет не заменяет токен доступа в остальном API
+        self.assertEqual(self.client.get('/api/users/profile/', HTTP_AUTHORIZATION=f'Bearer {ticket}').status_code, 401)
+
+    def test_paid_auction_requires_ticket(self):
+        for path in (f'/api/v1/auctions/{self.auction.pk}/stream/', f'/api/v1/lots/{self.lot.pk}/stream/'):
+            self.assertEqual(self._get(path, self.buyer).status_code, 403, path)
+            for user, header in ((self.ticket_holder, False), (self.ticket_holder, True), (self.donor, False)):
+                response = self._get(path, user, header)
+                self.assertEqual(response.status_code, 200, path)
+                self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    def test_pending_lot_is_hidden(self):
+        path = f'/api/v1/lots/{self.pending.pk}/stream/'
+        self.assertEqual(self._get(path, self.ticket_holder).status_code, 404)
+        self.assertEqual(self._get(path, self.donor).status_code, 200)
+        self.assertEqual(self._get('/api/v1/lots/0/stream/', self.donor).status_code, 404)
+        self.assertEqual(self._get('/api/v1/auctions/0/stream/', self.donor).status_code, 404)
+
+
+class KeysetPaginationTest(TestCase):
+    """Обход списка по курсорам при совпадающих значениях поля сортировки"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com')
+        Notification.objects.bulk_create([
+            Notification(user=self.user, subject=f'Уведомление {i}', message='')
+            for i in range(23)
+        ])
+        # Половина уведомлений с одинаковым временем: порядок задает id
+        same_time = timezone.now()
+        ids = list(Notification.objects.order_by('id').values_list('id', flat=True))
+        Notification.objects.filter(id__in=ids[5:17]).update(sent_at=same_time)
+        self.queryset = Notification.objects.filter(user=self.user).order_by('-sent_at')
+        self.expected = list(self.queryset.order_by('-sent_at', '-id').values_list('id', flat=True))
+
+    def _page(self, url):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get(url))
+        page = paginator.paginate_queryset(self.queryset, request)
+        return [item.id for item in page], paginator.get_next_link(), paginator.get_previous_link()
+
+    def test_walk_forward_and_back(self):
+        pages = []
+        ids, next_link, previous_link = self._page('/items/?page_size=5')
+        self.assertIsNone(previous_link)
+        pages.append(ids)
+        links = []
+        while next_link:
+            links.append(next_link)
+            ids, next_link, previous_link = self._page(next_link)
+            pages.append(ids)
+
+        self.assertEqual([item for page in pages for item in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+
+        # Назад от последней страницы возвращаются те же страницы
+        ids, _, previous_link = self._page(links[-1])
+        for page in reversed(pages[:-1]):
+            ids, _, previous_link = self._page(previous_link)
+            self.assertEqual(ids, page)
+        self.assertIsNone(previous_link)
+
+    def test_page_size_is_capped(self):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get('/items/', {'page_size': 10000}))
+        self.assertEqual(paginator.get_page_size(request), paginator.max_page_size)
+
+    def test_expression_ordering_is_rejected(self):
+        # Порядок, который не выразить позицией курсора, не подменяется сортировкой по id
+        for ordering in (F('sent_at').desc(nulls_last=True), '?'):
+            self.queryset = Notification.objects.order_by(ordering)
+            with self.subTest(ordering=ordering), self.assertRaises(ImproperlyConfigured):
+                self._page('/items/')
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(NotFound):
+            self._page('/items/?cursor=invalid')
+
+    def test_tampered_cursor_values(self):
+        def cursor(position):
+            data = json.dumps({'p': position, 'r': 0}).encode('ascii')
+            return '/items/?cursor=' + base64.urlsafe_b64encode(data).decode('ascii')
+
+        for position in (['not a date', 1], ['2026-10-18T12:00:00+00:00', 'x'], [[1], 1], [{'a': 1}, 1]):
+            with self.subTest(position=position), self.assertRaises(NotFound):
+                self._page(cursor(position))
+
+        # Неверное число в позиции сортировки по сумме
+        self.queryset = Bid.objects.order_by('-amount')
+        with self.assertRaises(NotFound):
+            self._page(cursor(['1e1000000x', 1]))
+
+        paginator = ListKeysetPagination()
+        request = Request(APIRequestFactory().get(cursor(['x', 1])))
+        with self.assertRaises(NotFound):
+            paginator.paginate_list([(1, 1), (2, 2)], request)
+
+
+class ListQueryCountTest(TestCase):
+    """
+    Число запросов списочных эндпоинтов не зависит от числа объектов:
+    связи подгружаются по объявлениям в Meta сериализаторов.
+    """
+    ENDPOINTS = [
+        '/api/v1/lots/',
+        '/api/v1/lots/auction/{auction}/',
+        '/api/lots/popular/',
+        '/api/lots/ending_soon/',
+        '/api/lots/by_category/?category_id={category}',
+        '/api/categories/',
+        '/api/lot-categories/',
+        '/api/v1/auctions/',
+        '/api/auctions/',
+        '/api/auctions/active/',
+        '/api/auction-events/',
+        '/api/auction-events/by_auction/?auction_id={auction}',
+        '/api/v1/auctions/tickets/',
+        '/api/bids/',
+        '/api/bids/my_bids/',
+        '/api/bids/by_lot/?lot_id={lot}',
+        '/api/transactions/',
+        '/api/transactions/my_purchases/',
+        '/api/comments/',
+        '/api/users/charities/',
+    ]
+
+    def setUp(self):
+        self.organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        self.buyer = User.objects.create_user(email='buyer@example.com', role=User.BUYER)
+        self.category = Category.objects.create(name='Категория')
+        self.auction = self._create_auction()
+        self.lot = self._create_lot(self.auction)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.buyer)
+
+    def _create_auction(self):
+        number = Auction.objects.count()
+        organization = User.objects.create_user(email=f'org{number}@example.com', role=User.CHARITY)
+        auction = Auction.objects.create(
+            charity=organization.charity,
+            name=f'Аукцион {number}',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(days=1),
+            status='active',
+        )
+        AuctionTicket.objects.create(auction=auction, user=self.buyer)
+        return auction
+
+    def _create_lot(self, auction):
+        number = Lot.objects.count()
+        donor = User.objects.create_user(email=f'donor{number}@example.com', role=User.DONOR)
+        lot = Lot.objects.create(
+            auction=auction, donor=donor, title=f'Лот {number}',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+        LotCategory.objects.create(lot=lot, category=self.category)
+        LotImage.objects.create(lot=lot, image=f'lot_images/{number}.jpg')
+
+        bidder = User.objects.create_user(email=f'bidder{number}@example.com', role=User.BUYER)
+        for user, amount in ((bidder, 20), (self.buyer, 30)):
+            Bid.objects.create(lot=lot, user=user, amount=Decimal(amount))
+        Transaction.objects.create(user=self.buyer, lot=lot, amount=Decimal('30.00'), status=Transaction.STATUS_COMPLETED)
+        Comment.objects.create(lot=lot, user=bidder, content='Комментарий')
+        AuctionEvent.objects.create(auction=auction, lot=lot, event_type='bid_placed', details='Ставка')
+        return lot
+
+    def _count_queries(self, url):
+        url = url.format(auction=self.auction.id, lot=self.lot.id, category=self.category.id)
+        # Считаются запросы самого представления, а не чтение из кэша ответов
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, f"{url}: {response.content[:200]}")
+        return len(queries)
+
+    def test_list_endpoints_use_constant_number_of_queries(self):
+        baseline = {url: self._count_queries(url) for url in self.ENDPOINTS}
+
+        for _ in range(3):
+            self._create_lot(self.auction)
+            self._create_lot(self._create_auction())
+
+        for url in self.ENDPOINTS:
+            with self.subTest(url=url):
+                self.assertEqual(self._count_queries(url), baseline[url])
+
+
+class SuggestTest(TestCase):
+    """Подсказки при наборе: префиксы, опечатки, видимость и кэш"""
+
+    def setUp(self):
+        cache.clear()
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        organization.charity.name = 'Фонд Добрые руки'
+        organization.charity.save()
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Картинная галерея',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(days=1),
+        )
+        for title, status in (
+            ('Старая картина', Lot.STATUS_APPROVED),
+            ('Картина маслом', Lot.STATUS_SOLD),
+            ('Картина на рассмотрении', Lot.STATUS_PENDING),
+            ('Книга', Lot.STATUS_APPROVED),
+        ):
+            Lot.objects.create(
+                auction=auction, donor=donor, title=title,
+                starting_price=Decimal('10.00'), status=status,
+            )
+        Category.objects.create(name='Картины')
+        self.client = APIClient()
+
+    def _suggest(self, **params):
+        response = self.client.get('/api/suggest/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_prefix_matches_ranked_first_and_hidden_lots_excluded(self):
+        data = self._suggest(q='Карт')
+        self.assertEqual([lot['title'] for lot in data['lots']], ['Картина маслом', 'Старая картина'])
+        self.assertEqual([auction['name'] for auction in data['auctions']], ['Картинная галерея'])
+        self.assertEqual([category['name'] for category in data['categories']], ['Картины'])
+        self.assertEqual(data['charities'], [])
+        self.assertEqual(set(data['lots'][0]), {'id', 'title'})
+
+    def test_typo_and_types_filter(self):
+        data = self._suggest(q='картена', types='lots,charities')
+        self.assertEqual(list(data), ['lots', 'charities'])
+        self.assertEqual({lot['title'] for lot in data['lots']}, {'Картина маслом', 'Старая картина'})
+        self.assertEqual(len(self._suggest(q='картена', types='lots', limit=1)['lots']), 1)
+        self.assertEqual(self._suggest(q='добрые', types='charities')['charities'][0]['name'], 'Фонд Добрые руки')
+
+    def test_repeated_prefix_is_served_from_cache(self):
+        first = self._suggest(q='карт')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._suggest(q='  КАРТ '), first)
+            self.assertEqual(self._suggest(q='к'), {'lots': [], 'auctions': [], 'charities': [], 'categories': []})
+        self.assertEqual(len(queries), 0)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/suggest/', {'q': 'карт', 'types': 'users'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/suggest/', {'q': 'карт', 'limit': 'много'}).status_code, 400)
+
+
+class ResponseCacheTest(TestCase):
+    """Кэш ответов каталога: повторные запросы без базы, сброс по записи, видимость"""
+
+    def setUp(self):
+        cache.clear()
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        self.donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(days=1),
+        )
+        self.lot = Lot.objects.create(
+            auction=self.auction, donor=self.donor, title='Картина',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+        Lot.objects.create(
+            auction=self.auction, donor=self.donor, title='На рассмотрении',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_PENDING,
+        )
+        self.client = APIClient()
+
+    def test_repeated_request_is_served_from_cache_until_write(self):
+        url = f'/api/lots/{self.lot.id}/'
+        first = self.client.get(url).data
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).data, first)
+        self.assertEqual(len(queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lot.title = 'Новое название'
+            self.lot.save()
+        self.assertEqual(self.client.get(url).data['title'], 'Новое название')
+
+    def test_conditional_requests_get_not_modified_without_queries(self):
+        url = f'/api/v1/auctions/{self.auction.id}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(len(queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.auction.name = 'Другой аукцион'
+            self.auction.save()
+        # Ответ после записи в ту же секунду не должен совпасть по дате
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time())).status_code, 200)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bid_refreshes_lot_and_auction_but_not_lot_list(self):
+        buyer = User.objects.create_user(email='buyer@example.com', role=User.BUYER)
+        detail, of_auction, catalog = (
+            f'/api/lots/{self.lot.id}/', f'/api/lots/auction/{self.auction.id}/', '/api/v1/lots/',
+        )
+        for url in (detail, of_auction, catalog):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bid = Bid.objects.create(lot=self.lot, user=buyer, amount=Decimal('25.00'))
+            self.lot.record_bid(bid)
+
+        self.assertEqual(self.client.get(detail).data['current_price'], '25.00')
+        self.assertEqual(self.client.get(of_auction).data['results'][0]['current_price'], '25.00')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(catalog)
+        self.assertEqual(len(queries), 0)
+
+    def test_lots_of_auction_are_cached_per_visibility(self):
+        url = f'/api/lots/auction/{self.auction.id}/'
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+        self.client.force_authenticate(user=self.donor)
+        self.assertEqual(len(self.client.get(url).data['results']), 2)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+
+class QueryPlanTest(TestCase):
+    """
+    Частые выборки не переходят на последовательное чтение таблиц при
+    размерах, близких к рабочим: каждая обслуживается индексом
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        buyers = User.objects.bulk_create([
+            User(email=f'buyer{i}@example.com', username=f'buyer{i}', role=User.BUYER) for i in range(100)
+        ])
+        # Большинство аукционов уже завершены, идет небольшая часть
+        auctions = Auction.objects.bulk_create([
+            Auction(
+                charity=organization.charity, name=f'Аукцион {i}',
+                status=Auction.STATUS_ACTIVE if i % 20 == 0 else Auction.STATUS_COMPLETED,
+                start_time=now - timedelta(days=30), end_time=now + timedelta(hours=i - 500),
+            )
+            for i in range(1000)
+        ])
+        lots = Lot.objects.bulk_create([
+            Lot(
+                auction=auction, donor=donor, title=f'Лот {auction.pk}-{i}', starting_price=Decimal('10.00'),
+                status=(Lot.STATUS_SOLD, Lot.STATUS_NOT_SOLD, Lot.STATUS_REJECTED, Lot.STATUS_APPROVED)[(auction.pk + i) % 4],
+            )
+            for auction in auctions for i in range(2)
+        ])
+        Bid.objects.bulk_create([
+            Bid(lot=lot, user=buyers[(lot.pk + i) % len(buyers)], amount=Decimal(10 + i))
+            for lot in lots for i in range(3)
+        ])
+        Transaction.objects.bulk_create([
+            Transaction(
+                lot=lot, user=buyers[lot.pk % len(buyers)], amount=Decimal('20.00'),
+                status=Transaction.STATUS_COMPLETED,
+            )
+            for lot in lots
+        ])
+        AuctionEvent.objects.bulk_create([
+            AuctionEvent(auction=auction, event_type=AuctionEvent.EVENT_BID_PLACED)
+            for auction in auctions for _ in range(5)
+        ])
+        # Почти все уведомления прочитаны
+        Notification.objects.bulk_create([
+            Notification(user=buyer, subject='Ставка', message='Ставка перебита', is_read=i >= 5)
+            for buyer in buyers for i in range(60)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.auction = auctions[500]
+        cls.lot = lots[1200]
+        cls.buyer = buyers[17]
+
+    def assertIndexScan(self, queryset):
+        """Ни один узел плана не читает таблицу модели queryset последовательно"""
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        table = queryset.model._meta.db_table
+        nodes = [plan]
+        while nodes:
+            node = nodes.pop()
+            self.assertFalse(
+                node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table,
+                f"Последовательное чтение {table}: {queryset.query}",
+            )
+            nodes.extend(node.get('Plans', []))
+
+    def test_highest_bid(self):
+        self.assertIndexScan(Bid.objects.filter(lot=self.lot).order_by('-amount', '-id')[:1])
+
+    def test_notifications(self):
+        self.assertIndexScan(Notification.objects.filter(user=self.buyer, is_read=False))
+        self.assertIndexScan(Notification.objects.filter(user=self.buyer).order_by('-sent_at', '-id')[:20])
+
+    def test_auction_events(self):
+        self.assertIndexScan(AuctionEvent.objects.filter(auction=self.auction).order_by('-created_at'))
+
+    def test_auctions_to_settle_and_ending_soon(self):
+        now = timezone.now()
+        self.assertIndexScan(Auction.objects.filter(status=Auction.STATUS_ACTIVE, end_time__lte=now))
+        self.assertIndexScan(Auction.objects.filter(
+            status=Auction.STATUS_ACTIVE, end_time__gt=now, end_time__lte=now + timedelta(hours=24),
+        ))
+
+    def test_lots_by_auction(self):
+        self.assertIndexScan(Lot.objects.filter(
+            auction=self.auction, status__in=[Lot.STATUS_APPROVED, Lot.STATUS_SOLD],
+        ))
+
+    def test_transactions(self):
+        self.assertIndexScan(Transaction.objects.filter(
+            lot=self.lot, user=self.buyer, status=Transaction.STATUS_COMPLETED,
+        ))
+        self.assertIndexScan(Transaction.objects.filter(
+            user=self.buyer, status=Transaction.STATUS_COMPLETED,
+        ).order_by('-payment_time'))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SeedLoadTest(TestCase):
+    """Синтетический набор данных: воспроизводимость и согласованность"""
+
+    def _fingerprint(self):
+        return [
+            (lot.title, lot.status, lot.current_price, [(bid.user.email, bid.amount) for bid in lot.bids.all()])
+            for lot in Lot.objects.filter(donor__email__endswith='@load.example')
+            .prefetch_related(Prefetch('bids', Bid.objects.select_related('user').order_by('created_at')))
+            .order_by('auction__name', 'title', 'id')
+        ]
+
+    def _generate(self):
+        return seed.generate(
+            seed=7, charities=2, auctions_per_charity=3, lots_per_auction=4, bids_per_lot=3,
+            donors=2, buyers=5, notifications_per_user=2,
+        )
+
+    def test_same_seed_gives_same_data(self):
+        with transaction.atomic():
+            counts = self._generate()
+            first = self._fingerprint()
+            transaction.set_rollback(True)
+        self.assertEqual(self._generate(), counts)
+        self.assertEqual(self._fingerprint(), first)
+        self.assertEqual(counts['lots'], 24)
+        self.assertEqual(Bid.objects.count(), counts['bids'])
+
+    def test_lot_bid_state_matches_bids(self):
+        self._generate()
+        for lot in Lot.objects.prefetch_related('bids'):
+            amounts = [bid.amount for bid in sorted(lot.bids.all(), key=lambda bid: bid.created_at)]
+            self.assertEqual(amounts, sorted(set(amounts)))
+            self.assertEqual(lot.bid_count, len(amounts))
+            self.assertEqual(lot.current_price, amounts[-1] if amounts else None)
+            if lot.status == Lot.STATUS_SOLD:
+                self.assertEqual(lot.winner_id, lot.current_leader_id)
+                self.assertTrue(Transaction.objects.filter(lot=lot, user_id=lot.winner_id).exists())
+        self.assertTrue(seed.exists(7))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class EndpointBenchmarkTest(TestCase):
+    """Сценарии замеров проходят на небольшом наборе, сравнение с базой находит регрессии"""
+
+    def test_all_scenarios_run(self):
+        seed.generate(seed=3, charities=2, auctions_per_charity=15, lots_per_auction=3, bids_per_lot=3, buyers=10)
+        results = benchmark.run(3, iterations=2)
+        self.assertEqual(set(results), {
+            'bid_create', 'lot_list', 'auction_detail', 'bids_by_lot', 'my_bids',
+            'notifications', 'check_access', 'settlement',
+        })
+        for metrics in results.values():
+            self.assertGreater(metrics['queries'], 0)
+            self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+        # Ставка и подведение итогов откатываются после каждого вызова
+        self.assertFalse(Auction.objects.filter(status=Auction.STATUS_COMPLETED, events__event_type='auction_ended').exists())
+
+    def test_compare_flags_regressions(self):
+        base = {'p50_ms': 5.0, 'p95_ms': 10.0, 'p99_ms': 12.0, 'queries': 3, 'memory_kb': 100.0}
+        within = dict(base, p95_ms=14.0, memory_kb=120.0)
+        worse = dict(base, p95_ms=16.0, queries=4, memory_kb=130.0)
+        self.assertEqual(benchmark.compare({'lot_list': within}, {'lot_list': base}, 0.5, 0.25), [])
+        self.assertEqual(len(benchmark.compare({'lot_list': worse}, {'lot_list': base}, 0.5, 0.25)), 3)
+        self.assertEqual(benchmark.compare({'new': worse}, {'lot_list': base}, 0.5, 0.25), [])
+        # Без допусков и для базы только с числом запросов сравниваются одни запросы
+        self.assertEqual(len(benchmark.compare({'lot_list': worse}, {'lot_list': base})), 1)
+        self.assertEqual(len(benchmark.compare({'lot_list': worse}, {'lot_list': {'queries': 3}}, 0.5, 0.25)), 1)
+        self.assertEqual(benchmark.compare({'lot_list': dict(worse, queries=3)}, {'lot_list': {'queries': 3}}), [])
+
+
+class LoadCheckTest(TestCase):
+    """Сверка инвариантов после прогона находит расхождения журнала и торгов"""
+
+    def test_check_after_bidding(self):
+        setup = loadtest.prepare(buyers=3, lots=1, duration=60, balance=Decimal('5000.00'))
+        lot_id = setup.lot_ids[0]
+        client = APIClient()
+        for amount, user_id in zip(('1100.00', '1200.00', '1300.00'), setup.buyer_ids):
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup.tokens[user_id]}')
+            response = client.post('/api/bids/', {'lot': lot_id, 'amount': amount}, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(loadtest.check(setup), [])
+
+        # Лишний возврат перебитой ставки — двойной возврат и расхождение баланса с журналом
+        LedgerEntry.objects.create(
+            user_id=setup.buyer_ids[0], lot_id=lot_id, kind=LedgerEntry.KIND_RELEASE, amount=Decimal('1100.00'),
+        )
+        self.assertEqual(len(loadtest.check(setup)), 2)
+
+        loadtest.cleanup(setup)
+        self.assertFalse(Lot.objects.filter(pk=lot_id).exists())
+        self.assertFalse(User.objects.filter(pk__in=setup.buyer_ids).exists())
@@ -1,2 +1,99 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .serializers import eager_load
+from .streams import StreamTicket
+from .suggest import SOURCES, normalize, suggest
+
+
+class EagerLoadingMixin:
+    """
+    Подгружает связи, объявленные в Meta сериализатора представления,
+    и для queryset представления, и для querysets, которые собираются
+    вручную в дополнительных действиях и передаются в paginate_queryset.
+    """
+
+    def eager_load(self, queryset):
+        return eager_load(queryset, self.get_serializer_class())
+
+    def get_queryset(self):
+        return self.eager_load(super().get_queryset())
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(self.eager_load(queryset))
+
+
+class SuggestView(APIView):
+    """
+    Подсказки при наборе по названиям лотов, аукционов, фондов и категорий.
+    Ответ одинаков для всех пользователей, поэтому токен не проверяется.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_summary="Подсказки при наборе",
+        operation_description=(
+            "Возвращает до limit совпадений каждого типа по началу слова и с учетом опечаток. "
+            "Каждая подсказка содержит id и название: title у лотов, name у остальных типов."
+        ),
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Набранный текст", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter(
+                'types', openapi.IN_QUERY,
+                description=f"Типы через запятую: {', '.join(SOURCES)}. По умолчанию все",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'limit', openapi.IN_QUERY,
+                description=f"Число подсказок каждого типа (не больше {settings.SUGGEST_MAX_LIMIT})",
+                type=openapi.TYPE_INTEGER
+            ),
+        ],
+        responses={200: "Подсказки по типам", 400: "Неверные параметры"}
+    )
+    def get(self, request):
+        types = request.query_params.get('types')
+        if types:
+            types = [source.strip() for source in types.split(',') if source.strip()]
+            unknown = set(types) - set(SOURCES)
+            if unknown:
+                raise ValidationError({'types': f"Неизвестные типы: {', '.join(sorted(unknown))}"})
+
+        limit = request.query_params.get('limit')
+        if limit is not None:
+            try:
+                limit = min(max(int(limit), 1), settings.SUGGEST_MAX_LIMIT)
+            except ValueError:
+                raise ValidationError({'limit': 'Ожидается целое число'})
+
+        response = Response(suggest(normalize(request.query_params.get('q', '')), types, limit))
+        patch_cache_control(response, public=True, max_age=settings.SUGGEST_CACHE_TIMEOUT)
+        return response
+
+
+class StreamTicketView(APIView):
+    """
+    Выдает короткоживущий билет для подключения к потоку событий
+    (параметр ticket в /stream/). Токен доступа в URL не передается.
+    """
+
+    @swagger_auto_schema(
+        operation_summary="Билет для потока событий",
+        operation_description=(
+            "Возвращает билет для параметра ticket потоков /api/v1/auctions/{id}/stream/ и "
+            "/api/v1/lots/{id}/stream/. Билет действует expires_in секунд и только для потоков."
+        ),
+        responses={200: "Билет и время его действия", 401: "Требуется аутентификация"}
+    )
+    def post(self, request):
+        return Response({
+            'ticket': str(StreamTicket.for_user(request.user)),
+            'expires_in': settings.EVENT_STREAM_TICKET_LIFETIME,
+        })
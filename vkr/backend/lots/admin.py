@@ -2,12 +2,14 @@ from django.contrib import admin
 from .models import Lot, Category, LotCategory, LotImage, DeliveryDetail
 from django.utils.html import format_html
 from django.contrib import messages
+from .moderation import moderate, RESULT_FORBIDDEN, RESULT_NOT_PENDING
 
 class LotAdmin(admin.ModelAdmin):
     list_display = ('title', 'auction', 'donor', 'status', 'created_at', 'approve_button', 'reject_button')
     list_filter = ('status', 'auction__charity', 'auction')
     search_fields = ('title', 'description', 'donor__email', 'auction__name')
     readonly_fields = ('created_at',)
+    actions = ['approve_selected', 'reject_selected']
 
     def approve_button(self, obj):
         if obj.status == Lot.STATUS_PENDING:
@@ -33,37 +35,35 @@ class LotAdmin(admin.ModelAdmin):
         return custom_urls + urls
 
     def approve_lot(self, request, lot_id):
-        lot = Lot.objects.get(pk=lot_id)
-        user = request.user
-        # Проверка: только организация-владелец аукциона
-        if hasattr(user, 'charity') and lot.auction.charity == user.charity:
-            if lot.status == Lot.STATUS_PENDING:
-                lot.status = Lot.STATUS_APPROVED
-                lot.save()
-                self.message_user(request, f'Лот "{lot.title}" одобрен.', messages.SUCCESS)
-            else:
-                self.message_user(request, 'Лот уже не на рассмотрении.', messages.WARNING)
-        else:
-            self.message_user(request, 'Вы не можете одобрять лоты чужих аукционов.', messages.ERROR)
+        self._moderate(request, [lot_id], Lot.STATUS_APPROVED)
         from django.shortcuts import redirect
         return redirect(request.META.get('HTTP_REFERER', '/admin/lots/lot/'))
 
     def reject_lot(self, request, lot_id):
-        lot = Lot.objects.get(pk=lot_id)
-        user = request.user
-        # Проверка: только организация-владелец аукциона
-        if hasattr(user, 'charity') and lot.auction.charity == user.charity:
-            if lot.status == Lot.STATUS_PENDING:
-                lot.status = Lot.STATUS_REJECTED
-                lot.save()
-                self.message_user(request, f'Лот "{lot.title}" отклонён.', messages.SUCCESS)
-            else:
-                self.message_user(request, 'Лот уже не на рассмотрении.', messages.WARNING)
-        else:
-            self.message_user(request, 'Вы не можете отклонять лоты чужих аукционов.', messages.ERROR)
+        self._moderate(request, [lot_id], Lot.STATUS_REJECTED)
         from django.shortcuts import redirect
         return redirect(request.META.get('HTTP_REFERER', '/admin/lots/lot/'))
 
+    @admin.action(description='Одобрить выбранные лоты')
+    def approve_selected(self, request, queryset):
+        self._moderate(request, list(queryset.values_list('id', flat=True)), Lot.STATUS_APPROVED)
+
+    @admin.action(description='Отклонить выбранные лоты')
+    def reject_selected(self, request, queryset):
+        self._moderate(request, list(queryset.values_list('id', flat=True)), Lot.STATUS_REJECTED)
+
+    def _moderate(self, request, lot_ids, status):
+        # Права, статусы и уведомления донорам обрабатываются пакетом (lots/moderation.py)
+        results = moderate(request.user, lot_ids, status).values()
+        done = sum(result == status for result in results)
+        if done:
+            verb = 'одобрено' if status == Lot.STATUS_APPROVED else 'отклонено'
+            self.message_user(request, f'Лотов {verb}: {done}.', messages.SUCCESS)
+        if RESULT_NOT_PENDING in results:
+            self.message_user(request, 'Часть лотов уже не на рассмотрении.', messages.WARNING)
+        if RESULT_FORBIDDEN in results:
+            self.message_user(request, 'Вы не можете модерировать лоты чужих аукционов.', messages.ERROR)
+
 admin.site.register(Lot, LotAdmin)
 admin.site.register(Category)
 admin.site.register(LotCategory)
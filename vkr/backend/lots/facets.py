@@ -0,0 +1,66 @@
+"""
+Фасеты поиска лотов: число лотов по категориям, статусам и ценовым диапазонам.
+
+Для отфильтрованной выборки числа считаются одним запросом с GROUPING SETS.
+Без фильтров (или только с фильтром по статусу) числа берутся из счетчиков
+LotFacetCount, которые поддерживают триггеры базы, и таблица лотов
+не просматривается.
+"""
+from django.db import connection
+
+from .models import Lot, LotCategory, LotFacetCount
+
+
+def count_facets(queryset):
+    """Числа лотов выборки по фасетам в формате LotFacetCount.totals()"""
+    lot_ids_sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    lot_table = Lot._meta.db_table
+    link_table = LotCategory._meta.db_table
+    sql = f"""
+        SELECT lc.category_id, l.status, l.price_bucket, COUNT(DISTINCT l.id),
+               GROUPING(lc.category_id), GROUPING(l.status)
+        FROM {lot_table} l
+        LEFT JOIN {link_table} lc ON lc.lot_id = l.id
+        WHERE l.id IN ({lot_ids_sql})
+        GROUP BY GROUPING SETS ((lc.category_id), (l.status), (l.price_bucket))
+    """
+    totals = {LotFacetCount.FACET_CATEGORY: {}, LotFacetCount.FACET_PRICE: {}, 'status': {}}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for category_id, status, bucket, count, no_category, no_status in cursor.fetchall():
+            if not no_category:
+                # Лоты без категорий не попадают в фасет категорий
+                if category_id is not None:
+                    totals[LotFacetCount.FACET_CATEGORY][category_id] = count
+            elif not no_status:
+                totals['status'][status] = count
+            else:
+                totals[LotFacetCount.FACET_PRICE][bucket] = count
+    return totals
+
+
+def price_buckets():
+    """Границы ценовых диапазонов: [(номер, от, до)], None — без границы"""
+    bounds = (None, *Lot.PRICE_BUCKETS, None)
+    return [(i, bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def format_facets(totals):
+    """Ответ API: списки значений фасетов с числом лотов, без пустых значений"""
+    categories = totals[LotFacetCount.FACET_CATEGORY]
+    statuses = totals['status']
+    prices = totals[LotFacetCount.FACET_PRICE]
+    return {
+        'categories': [
+            {'id': category_id, 'count': count}
+            for category_id, count in sorted(categories.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'status': [
+            {'value': status, 'count': statuses[status]}
+            for status, _ in Lot.STATUS_CHOICES if statuses.get(status)
+        ],
+        'price': [
+            {'bucket': bucket, 'min': low, 'max': high, 'count': prices[bucket]}
+            for bucket, low, high in price_buckets() if prices.get(bucket)
+        ],
+    }
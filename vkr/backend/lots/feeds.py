@@ -0,0 +1,65 @@
+"""
+Лента лотов, аукционы которых скоро завершаются.
+
+Лента считается одним запросом по индексу Auction(status, end_time) на
+интервал времени длиной ENDING_SOON_BUCKET и хранится в кэше как список
+пар (время завершения, id лота). Каждый запрос в пределах интервала берет
+из нее срез [сейчас, сейчас + ENDING_SOON_WINDOW] без обращения к базе.
+Изменения аукционов и лотов увеличивают версию ленты, и следующий запрос
+считает ее заново.
+"""
+import datetime
+import math
+import time
+from bisect import bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+
+from auctions.models import Auction
+from .models import Lot
+
+VERSION_KEY = 'ending_soon:version'
+
+
+def invalidate_ending_soon():
+    """Делает посчитанную ленту устаревшей"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, None)
+
+
+def _build(start, end):
+    rows = (
+        Lot.objects
+        .filter(
+            status=Lot.STATUS_APPROVED,
+            auction__status=Auction.STATUS_ACTIVE,
+            auction__end_time__gt=datetime.datetime.fromtimestamp(start, tz=datetime.timezone.utc),
+            auction__end_time__lte=datetime.datetime.fromtimestamp(end, tz=datetime.timezone.utc),
+        )
+        .order_by('auction__end_time', 'id')
+        .values_list('auction__end_time', 'id')
+    )
+    return [(end_time.timestamp(), lot_id) for end_time, lot_id in rows]
+
+
+def ending_soon(now=None):
+    """Пары (время завершения, id лота) по возрастанию времени завершения"""
+    now = now or time.time()
+    size = settings.ENDING_SOON_BUCKET
+    window = settings.ENDING_SOON_WINDOW
+    start = int(now) // size * size
+    version = cache.get_or_set(VERSION_KEY, 0, None)
+
+    key = f"ending_soon:{version}:{start}"
+    feed = cache.get(key)
+    if feed is None:
+        # Лента интервала покрывает окно от любого момента внутри интервала
+        feed = _build(start, start + size + window)
+        cache.set(key, feed, size)
+    # Лента упорядочена по времени завершения: границы среза находятся бинарным поиском
+    first = bisect_right(feed, (now, math.inf))
+    last = bisect_right(feed, (now + window, math.inf))
+    return feed[first:last]
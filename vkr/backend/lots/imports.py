@@ -0,0 +1,250 @@
+"""
+Импорт лотов аукциона из манифеста и ZIP-архива изображений.
+
+Манифест — CSV с заголовком, JSON-массив объектов или JSON Lines с полями
+title, description, starting_price, categories, images и donor_email.
+В CSV categories и images перечисляются через «;». Категории указываются
+названиями существующих категорий, изображения — именами файлов в архиве.
+donor_email нужен организации, импортирующей лоты доноров в свой аукцион;
+без него донором лота становится автор импорта. Лоты организации в своем
+аукционе сразу одобрены, лоты донора ждут рассмотрения.
+
+Импорт проходит по манифесту дважды:
+1. Проверка: строки читаются потоком и проверяются LotImportRowSerializer,
+   ошибки запоминаются по номерам строк. Если ошибки есть, в базу ничего
+   не записывается.
+2. Запись: строки читаются частями по LOT_IMPORT_CHUNK_SIZE, каждая часть
+   записывается в своей транзакции через bulk_create лотов, связей с
+   категориями и изображений вместе со счетчиком processed. Повторный запуск
+   после сбоя пропускает уже записанные строки.
+"""
+import csv
+import io
+import itertools
+import json
+import logging
+import posixpath
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+from core.cache import bump
+from core.images import schedule
+from users.models import User
+from .feeds import invalidate_ending_soon
+from .models import Category, Lot, LotCategory, LotImage, LotImport
+from .serializers import LotImportRowSerializer
+
+LIST_FIELDS = ('categories', 'images')
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(';') if item.strip()]
+
+
+def rows(lot_import):
+    """Строки манифеста по одной: (номер строки, данные)"""
+    name = lot_import.manifest.name.lower()
+    with lot_import.manifest.open('rb') as raw:
+        if name.endswith('.csv'):
+            text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                row = {key: value for key, value in row.items() if key is not None}
+                for field in LIST_FIELDS:
+                    row[field] = _split(row.get(field))
+                yield number, row
+        elif name.endswith('.jsonl'):
+            text = io.TextIOWrapper(raw, encoding='utf-8')
+            for number, line in enumerate(text, start=1):
+                if line.strip():
+                    yield number, _parse_json_line(line)
+        else:
+            # Массив JSON разбирается целиком, его размер ограничен LOT_IMPORT_MAX_MANIFEST_SIZE
+            data = json.load(raw)
+            if not isinstance(data, list):
+                raise ValueError("JSON-манифест должен быть массивом объектов")
+            yield from enumerate(data, start=1)
+
+
+def _parse_json_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+class _Context:
+    """Данные для проверки строк, общие для всего манифеста"""
+
+    def __init__(self, lot_import, archive):
+        self.lot_import = lot_import
+        self.archive = archive
+        self.members = {info.filename: info for info in archive.infolist()} if archive else {}
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.donors = {}
+
+    def resolve_donor(self, email):
+        user = self.lot_import.user
+        if user.role != User.CHARITY:
+            # Донор импортирует только свои лоты
+            return user if email.lower() == user.email.lower() else None
+        if email not in self.donors:
+            self.donors[email] = User.objects.filter(email__iexact=email, role=User.DONOR).first()
+        return self.donors[email]
+
+    def serializer(self, data):
+        return LotImportRowSerializer(data=data, context={
+            'categories': self.categories,
+            'archive': self.members,
+            'resolve_donor': self.resolve_donor,
+        })
+
+
+def _validate_row(context, data, verify_images=True):
+    if not isinstance(data, dict):
+        return None, {'non_field_errors': ["Строка должна быть объектом JSON"]}
+    serializer = context.serializer(data)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    if not verify_images:
+        return serializer.validated_data, None
+    broken = []
+    for name in serializer.validated_data['images']:
+        try:
+            with context.archive.open(name) as member:
+                Image.open(member).verify()
+        except Exception:
+            broken.append(name)
+    if broken:
+        return None, {'images': [f"Не изображения: {', '.join(broken)}"]}
+    return serializer.validated_data, None
+
+
+def validate(lot_import, archive):
+    """Проверяет все строки манифеста. Возвращает (число строк, ошибки)"""
+    context = _Context(lot_import, archive)
+    total = 0
+    errors = []
+    for number, data in rows(lot_import):
+        total += 1
+        _, row_errors = _validate_row(context, data)
+        if row_errors and len(errors) < settings.LOT_IMPORT_MAX_ERRORS:
+            errors.append({'row': number, 'errors': row_errors})
+    return total, errors
+
+
+def _write_chunk(lot_import, archive, chunk):
+    user = lot_import.user
+    auction = lot_import.auction
+    status = Lot.STATUS_APPROVED if user.role == User.CHARITY else Lot.STATUS_PENDING
+
+    # Файлы изображений записываются в хранилище до строк, а откат части их не
+    # удаляет: без уборки повторный запуск записал бы их снова под новыми именами
+    images = []
+    try:
+        with transaction.atomic():
+            lots = Lot.objects.bulk_create([
+                Lot(
+                    auction=auction,
+                    donor=row['donor_email'] or user,
+                    title=row['title'],
+                    description=row['description'],
+                    starting_price=row['starting_price'],
+                    status=status,
+                )
+                for row in chunk
+            ])
+            LotCategory.objects.bulk_create([
+                LotCategory(lot=lot, category_id=category_id)
+                for lot, row in zip(lots, chunk)
+                for category_id in row['categories']
+            ])
+            for lot, row in zip(lots, chunk):
+                for name in row['images']:
+                    with archive.open(name) as member:
+                        image = LotImage(lot=lot)
+                        image.image.save(posixpath.basename(name), File(member), save=False)
+                        images.append(image)
+            images = LotImage.objects.bulk_create(images)
+            LotImport.objects.filter(pk=lot_import.pk).update(processed=F('processed') + len(chunk))
+
+            # bulk_create не вызывает save() и сигналы: кэш ответов, лента
+            # и варианты изображений обновляются явно
+            bump('lots', f'auction:{auction.pk}')
+            transaction.on_commit(invalidate_ending_soon)
+            if images:
+                from .tasks import generate_lot_image_variants
+                image_ids = [image.pk for image in images]
+                transaction.on_commit(lambda: schedule(generate_lot_image_variants, image_ids))
+    except Exception:
+        for image in images:
+            image.image.delete(save=False)
+        raise
+    lot_import.processed += len(chunk)
+
+
+def schedule_import(import_id):
+    """Ставит задачу импорта; если брокер недоступен, импорт остается в очереди"""
+    from .tasks import import_lots
+    try:
+        import_lots.delay(import_id)
+    except Exception as e:
+        logging.error(f"Не удалось поставить задачу импорта лотов {import_id}: {e}")
+
+
+def run(lot_import, progress=None):
+    """
+    Проверяет манифест и записывает лоты. progress(lot_import) вызывается
+    после каждой записанной части.
+    """
+    archive = None
+    try:
+        try:
+            LotImport.objects.filter(pk=lot_import.pk).update(status=LotImport.STATUS_VALIDATING)
+            if lot_import.archive:
+                archive = zipfile.ZipFile(lot_import.archive.open('rb'))
+            total, errors = validate(lot_import, archive)
+        except (ValueError, UnicodeDecodeError, csv.Error, zipfile.BadZipFile) as e:
+            total, errors = 0, [{'row': None, 'errors': {'non_field_errors': [str(e)]}}]
+        lot_import.total = total
+        lot_import.errors = errors
+        if errors:
+            lot_import.status = LotImport.STATUS_FAILED
+            lot_import.finished_at = timezone.now()
+            lot_import.save(update_fields=['total', 'errors', 'status', 'finished_at'])
+            return lot_import
+
+        lot_import.status = LotImport.STATUS_IMPORTING
+        lot_import.save(update_fields=['total', 'errors', 'status'])
+        context = _Context(lot_import, archive)
+        # Строки, записанные до сбоя, пропускаются
+        pending = itertools.islice(rows(lot_import), lot_import.processed, None)
+        while True:
+            chunk = []
+            for number, data in itertools.islice(pending, settings.LOT_IMPORT_CHUNK_SIZE):
+                # Изображения проверены первым проходом, строка разбирается заново
+                # ради категорий и доноров, которые могли измениться
+                row, row_errors = _validate_row(context, data, verify_images=False)
+                if row_errors:
+                    lot_import.errors = [{'row': number, 'errors': row_errors}]
+                    break
+                chunk.append(row)
+            if lot_import.errors or not chunk:
+                break
+            _write_chunk(lot_import, archive, chunk)
+            if progress:
+                progress(lot_import)
+
+        lot_import.status = LotImport.STATUS_FAILED if lot_import.errors else LotImport.STATUS_COMPLETED
+        lot_import.finished_at = timezone.now()
+        lot_import.save(update_fields=['status', 'errors', 'finished_at'])
+        return lot_import
+    finally:
+        if archive:
+            archive.close()
+            lot_import.archive.close()
@@ -0,0 +1,152 @@
+"""
+Рейтинг популярных лотов по числу принятых ставок.
+
+За все время рейтинг берется из Lot.bid_count по индексу (status, -bid_count).
+За последний час и день каждая ставка увеличивает счетчики интервалов времени
+(ZINCRBY в отсортированных множествах Redis, O(log n)) для всего каталога,
+аукциона лота и каждой его категории. Рейтинг окна — объединение множеств
+интервалов, попадающих в окно (ZUNIONSTORE), которое кэшируется на несколько секунд.
+
+Таблица LotPopularity хранит те же счетчики с интервалом BUCKET_SECONDS и
+используется, если Redis не настроен (LEADERBOARD_REDIS_URL) или недоступен.
+"""
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Lot, LotCategory, LotPopularity
+
+KEY_PREFIX = 'popular:'
+# Интервал счетчиков в таблице LotPopularity
+BUCKET_SECONDS = 300
+# Окно -> (длина интервала в Redis, число интервалов в окне)
+WINDOWS = {
+    'hour': (300, 12),
+    'day': (3600, 24),
+}
+WINDOW_ALL = 'all'
+# Рейтинг читается с запасом: лоты, которые перестали быть активными, отбрасываются
+OVERFETCH = 3
+
+_client = None
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(settings.LEADERBOARD_REDIS_URL)
+    return _client
+
+
+def _bucket_start(moment, size):
+    """Начало интервала длиной size секунд, в который попадает moment (unix time)"""
+    return int(moment) // size * size
+
+
+def _scope(auction_id=None, category_id=None):
+    """Имя рейтинга: весь каталог, аукцион или категория"""
+    if category_id is not None:
+        return f'category:{category_id}'
+    if auction_id is not None:
+        return f'auction:{auction_id}'
+    return 'all'
+
+
+def record_bid(lot, bid):
+    """
+    Учитывает принятую ставку в рейтингах. Вызывается в транзакции ставки:
+    счетчик таблицы меняется вместе со ставкой, а Redis — после фиксации.
+    """
+    created = bid.created_at
+    bucket = datetime.datetime.fromtimestamp(
+        _bucket_start(created.timestamp(), BUCKET_SECONDS), tz=datetime.timezone.utc
+    )
+    LotPopularity.record(lot.pk, bucket)
+    if settings.LEADERBOARD_REDIS_URL:
+        lot_id, auction_id, moment = lot.pk, lot.auction_id, created.timestamp()
+        transaction.on_commit(lambda: _redis_record(lot_id, auction_id, moment))
+
+
+def _redis_record(lot_id, auction_id, moment):
+    category_ids = LotCategory.objects.filter(lot_id=lot_id).values_list('category_id', flat=True)
+    scopes = [_scope(), _scope(auction_id=auction_id)] + [_scope(category_id=c) for c in category_ids]
+    try:
+        pipe = _get_client().pipeline(transaction=False)
+        for size, count in WINDOWS.values():
+            start = _bucket_start(moment, size)
+            for scope in scopes:
+                key = f"{KEY_PREFIX}{scope}:{size}:{start}"
+                pipe.zincrby(key, 1, lot_id)
+                # Интервал живет, пока попадает хотя бы в одно окно
+                pipe.expireat(key, start + size * (count + 1))
+        pipe.execute()
+    except Exception as e:
+        logging.error(f"Не удалось обновить рейтинг лота {lot_id} в Redis: {e}")
+
+
+def _redis_top(scope, window, limit):
+    size, count = WINDOWS[window]
+    current = _bucket_start(time.time(), size)
+    client = _get_client()
+    target = f"{KEY_PREFIX}{scope}:{window}:{current}"
+    if not client.exists(target):
+        keys = [f"{KEY_PREFIX}{scope}:{size}:{current - i * size}" for i in range(count)]
+        pipe = client.pipeline()
+        pipe.zunionstore(target, keys)
+        pipe.expire(target, settings.LEADERBOARD_WINDOW_CACHE_TIMEOUT)
+        pipe.execute()
+    return [int(lot_id) for lot_id in client.zrevrange(target, 0, limit - 1)]
+
+
+def _db_top(window, auction_id, category_id, limit):
+    size, count = WINDOWS[window]
+    since = datetime.datetime.fromtimestamp(
+        _bucket_start(time.time(), size) - (count - 1) * size, tz=datetime.timezone.utc
+    )
+    rows = LotPopularity.objects.filter(bucket__gte=since, lot__status=Lot.STATUS_APPROVED)
+    if auction_id is not None:
+        rows = rows.filter(lot__auction_id=auction_id)
+    if category_id is not None:
+        rows = rows.filter(lot__lotcategory__category_id=category_id)
+    rows = rows.values('lot_id').annotate(score=Sum('bids')).order_by('-score', '-lot_id')[:limit]
+    return [row['lot_id'] for row in rows]
+
+
+def top_lot_ids(window=WINDOW_ALL, auction_id=None, category_id=None, limit=10):
+    """Id активных лотов с наибольшим числом ставок за окно, по убыванию"""
+    if window == WINDOW_ALL:
+        lots = Lot.objects.filter(status=Lot.STATUS_APPROVED)
+        if auction_id is not None:
+            lots = lots.filter(auction_id=auction_id)
+        if category_id is not None:
+            lots = lots.filter(lotcategory__category_id=category_id)
+        return list(lots.order_by('-bid_count', '-id').values_list('id', flat=True)[:limit])
+
+    if settings.LEADERBOARD_REDIS_URL:
+        try:
+            ids = _redis_top(_scope(auction_id, category_id), window, limit * OVERFETCH)
+        except Exception as e:
+            logging.error(f"Рейтинг лотов из Redis недоступен, используется таблица: {e}")
+        else:
+            # Рейтинг категории хранится отдельно от рейтинга аукциона,
+            # поэтому их пересечение проверяется запросом к лотам
+            active = Lot.objects.filter(pk__in=ids, status=Lot.STATUS_APPROVED)
+            if auction_id is not None:
+                active = active.filter(auction_id=auction_id)
+            active = set(active.values_list('id', flat=True))
+            return [lot_id for lot_id in ids if lot_id in active][:limit]
+    return _db_top(window, auction_id, category_id, limit)
+
+
+def prune(now=None):
+    """Удаляет из таблицы интервалы, которые уже не попадают ни в одно окно"""
+    longest = max(size * count for size, count in WINDOWS.values())
+    cutoff = (now or timezone.now()) - datetime.timedelta(seconds=longest + BUCKET_SECONDS)
+    deleted, _ = LotPopularity.objects.filter(bucket__lt=cutoff).delete()
+    return deleted
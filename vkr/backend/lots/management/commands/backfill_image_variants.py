@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.db.models.fields.json import KT
+
+from auctions.models import Auction
+from auctions.tasks import generate_auction_image_variants
+from lots.models import LotImage
+from lots.tasks import generate_lot_image_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Создает варианты (миниатюры, WebP и JPEG) для уже загруженных изображений "
+        "лотов и аукционов пачками задач Celery"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Изображений в одной задаче')
+        parser.add_argument('--force', action='store_true', help='Пересоздать и уже существующие варианты')
+        parser.add_argument('--sync', action='store_true', help='Обработать в этом процессе, без Celery')
+
+    def handle(self, *args, **options):
+        sources = [
+            ('лотов', LotImage.objects.exclude(image='').exclude(image__isnull=True), 'variants', generate_lot_image_variants),
+            ('аукционов', Auction.objects.exclude(image='').exclude(image__isnull=True),
+             'image_variants', generate_auction_image_variants),
+        ]
+        for label, queryset, variants_field, task in sources:
+            if not options['force']:
+                # Нет вариантов или они созданы для прежнего файла
+                queryset = queryset.annotate(source=KT(f'{variants_field}__source')).filter(
+                    Q(source__isnull=True) | ~Q(source=F('image'))
+                )
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+
+            for start in range(0, len(ids), options['batch_size']):
+                batch = ids[start:start + options['batch_size']]
+                if options['sync']:
+                    self.stdout.write(task(batch, force=options['force']))
+                else:
+                    task.delay(batch, force=options['force'])
+            self.stdout.write(self.style.SUCCESS(f"Изображений {label} к обработке: {len(ids)}"))
@@ -0,0 +1,53 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.models import Auction
+from lots.imports import run
+from lots.models import LotImport
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует лоты аукциона из манифеста CSV/JSON и ZIP-архива изображений "
+        "(формат описан в lots/imports.py) в этом процессе, без Celery"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('auction', type=int, help='ID аукциона')
+        parser.add_argument('manifest', help='Путь к манифесту (.csv, .json или .jsonl)')
+        parser.add_argument('--archive', help='Путь к ZIP-архиву изображений')
+        parser.add_argument('--user', required=True, help='Email организации или донора, от имени которого идет импорт')
+        parser.add_argument('--resume', type=int, help='Продолжить прерванный импорт с указанным ID')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                lot_import = LotImport.objects.select_related('auction', 'user').get(pk=options['resume'])
+            except LotImport.DoesNotExist:
+                raise CommandError(f"Импорт {options['resume']} не найден")
+        else:
+            try:
+                auction = Auction.objects.get(pk=options['auction'])
+                user = User.objects.get(email__iexact=options['user'])
+            except (Auction.DoesNotExist, User.DoesNotExist) as e:
+                raise CommandError(str(e))
+            lot_import = LotImport(auction=auction, user=user)
+            with open(options['manifest'], 'rb') as manifest:
+                lot_import.manifest.save(os.path.basename(options['manifest']), File(manifest), save=False)
+            if options['archive']:
+                with open(options['archive'], 'rb') as archive:
+                    lot_import.archive.save(os.path.basename(options['archive']), File(archive), save=False)
+            lot_import.save()
+
+        def progress(current):
+            self.stdout.write(f"Записано строк: {current.processed} из {current.total}")
+
+        lot_import = run(lot_import, progress=progress)
+        for error in lot_import.errors:
+            self.stdout.write(self.style.ERROR(f"Строка {error['row']}: {error['errors']}"))
+        if lot_import.status != LotImport.STATUS_COMPLETED:
+            raise CommandError(f"Импорт {lot_import.pk} не выполнен, повторить: --resume {lot_import.pk}")
+        self.stdout.write(self.style.SUCCESS(f"Импорт {lot_import.pk}: записано лотов {lot_import.processed}"))
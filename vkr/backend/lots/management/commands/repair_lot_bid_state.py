@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from lots.models import Lot
+from bids.models import Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет денормализованное состояние торгов лотов (current_price, current_leader, "
+        "bid_count, last_bid_at) с таблицей ставок и исправляет расхождения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auction', type=int, help='Проверить только лоты указанного аукциона')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать расхождения, ничего не меняя')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        top_bid = Bid.objects.filter(lot=OuterRef('pk')).order_by('-amount', 'created_at')
+        bid_count = (
+            Bid.objects.filter(lot=OuterRef('pk'))
+            .order_by()
+            .values('lot')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        last_bid = Bid.objects.filter(lot=OuterRef('pk')).order_by('-created_at')
+
+        lots = Lot.objects.annotate(
+            actual_price=Subquery(top_bid.values('amount')[:1]),
+            actual_leader=Subquery(top_bid.values('user')[:1]),
+            actual_count=Coalesce(Subquery(bid_count, output_field=IntegerField()), Value(0)),
+            actual_last_bid_at=Subquery(last_bid.values('created_at')[:1]),
+        ).only('id', 'current_price', 'current_leader', 'bid_count', 'last_bid_at')
+        if options['auction']:
+            lots = lots.filter(auction_id=options['auction'])
+
+        fields = ['current_price', 'current_leader', 'bid_count', 'last_bid_at']
+        broken = []
+        for lot in lots.iterator(chunk_size=options['batch_size']):
+            actual = (lot.actual_price, lot.actual_leader, lot.actual_count, lot.actual_last_bid_at)
+            stored = (lot.current_price, lot.current_leader_id, lot.bid_count, lot.last_bid_at)
+            if actual == stored:
+                continue
+            self.stdout.write(f"Лот {lot.id}: сохранено {stored}, по ставкам {actual}")
+            lot.current_price, lot.current_leader_id, lot.bid_count, lot.last_bid_at = actual
+            broken.append(lot)
+
+        if options['dry_run']:
+            self.stdout.write(f"Найдено расхождений: {len(broken)}")
+            return
+
+        with transaction.atomic():
+            Lot.objects.bulk_update(broken, fields, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Исправлено лотов: {len(broken)}"))
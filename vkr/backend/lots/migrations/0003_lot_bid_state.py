@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_state(apps, schema_editor):
+    Lot = apps.get_model('lots', 'Lot')
+    Bid = apps.get_model('bids', 'Bid')
+
+    top_bid = Bid.objects.filter(lot=OuterRef('pk')).order_by('-amount', 'created_at')
+    bid_count = (
+        Bid.objects.filter(lot=OuterRef('pk'))
+        .order_by()
+        .values('lot')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    last_bid = Bid.objects.filter(lot=OuterRef('pk')).order_by('-created_at')
+
+    Lot.objects.update(
+        current_price=Subquery(top_bid.values('amount')[:1]),
+        current_leader=Subquery(top_bid.values('user')[:1]),
+        bid_count=Coalesce(Subquery(bid_count, output_field=IntegerField()), Value(0)),
+        last_bid_at=Subquery(last_bid.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lots', '0002_initial'),
+        ('bids', '0003_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lot',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lot',
+            name='current_leader',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_lots', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='lot',
+            name='current_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='lot',
+            name='last_bid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_bid_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:39
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def mark_settled_lots(apps, schema_editor):
+    # Итоги уже проданных и непроданных лотов подведены при завершении аукциона
+    Lot = apps.get_model('lots', 'Lot')
+    Auction = apps.get_model('auctions', 'Auction')
+    Lot.objects.filter(status__in=['sold', 'not_sold']).update(
+        settled_at=Subquery(Auction.objects.filter(pk=OuterRef('auction_id')).values('end_time')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lots', '0003_lot_bid_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lot',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_settled_lots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:52
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0007_trigram_indexes'),
+        ('lots', '0005_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='category_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='lot_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
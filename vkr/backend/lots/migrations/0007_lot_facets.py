@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+# Триггеры добавляют записи изменений в lots_lotfacetcount (см. LotFacetCount).
+# Категории лота учитываются и при удалении лота, и при удалении связи с категорией:
+# какая из строк удаляется второй, та уже не находит пары и ничего не меняет.
+FACET_TRIGGERS = """
+CREATE FUNCTION lots_lot_facet_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO lots_lotfacetcount (facet, value, status, count)
+        VALUES ('price', OLD.price_bucket, OLD.status, -1);
+        IF TG_OP = 'DELETE' OR OLD.status <> NEW.status THEN
+            INSERT INTO lots_lotfacetcount (facet, value, status, count)
+            SELECT 'category', category_id, OLD.status, -1 FROM lots_lotcategory WHERE lot_id = OLD.id;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO lots_lotfacetcount (facet, value, status, count)
+        VALUES ('price', NEW.price_bucket, NEW.status, 1);
+        IF TG_OP = 'INSERT' OR OLD.status <> NEW.status THEN
+            INSERT INTO lots_lotfacetcount (facet, value, status, count)
+            SELECT 'category', category_id, NEW.status, 1 FROM lots_lotcategory WHERE lot_id = NEW.id;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION lots_lotcategory_facet_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO lots_lotfacetcount (facet, value, status, count)
+        SELECT 'category', OLD.category_id, status, -1 FROM lots_lot WHERE id = OLD.lot_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO lots_lotfacetcount (facet, value, status, count)
+        SELECT 'category', NEW.category_id, status, 1 FROM lots_lot WHERE id = NEW.lot_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Ставки обновляют строку лота постоянно, но статус и цену не меняют:
+-- условие WHEN не вызывает функцию для таких обновлений
+CREATE TRIGGER lots_lot_facet_counts AFTER INSERT OR DELETE ON lots_lot
+    FOR EACH ROW EXECUTE FUNCTION lots_lot_facet_counts();
+CREATE TRIGGER lots_lot_facet_counts_update AFTER UPDATE ON lots_lot
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.price_bucket IS DISTINCT FROM NEW.price_bucket)
+    EXECUTE FUNCTION lots_lot_facet_counts();
+CREATE TRIGGER lots_lotcategory_facet_counts AFTER INSERT OR DELETE ON lots_lotcategory
+    FOR EACH ROW EXECUTE FUNCTION lots_lotcategory_facet_counts();
+CREATE TRIGGER lots_lotcategory_facet_counts_update AFTER UPDATE ON lots_lotcategory
+    FOR EACH ROW
+    WHEN (OLD.lot_id IS DISTINCT FROM NEW.lot_id OR OLD.category_id IS DISTINCT FROM NEW.category_id)
+    EXECUTE FUNCTION lots_lotcategory_facet_counts();
+
+-- Начальные значения по существующим лотам: триггеры уже созданы и держат
+-- блокировку таблиц до конца миграции, поэтому изменения не теряются
+INSERT INTO lots_lotfacetcount (facet, value, status, count)
+SELECT 'price', price_bucket, status, COUNT(*) FROM lots_lot GROUP BY price_bucket, status;
+INSERT INTO lots_lotfacetcount (facet, value, status, count)
+SELECT 'category', lc.category_id, l.status, COUNT(*)
+FROM lots_lotcategory lc JOIN lots_lot l ON l.id = lc.lot_id
+GROUP BY lc.category_id, l.status;
+"""
+
+DROP_FACET_TRIGGERS = """
+DROP TRIGGER lots_lotcategory_facet_counts_update ON lots_lotcategory;
+DROP TRIGGER lots_lotcategory_facet_counts ON lots_lotcategory;
+DROP TRIGGER lots_lot_facet_counts_update ON lots_lot;
+DROP TRIGGER lots_lot_facet_counts ON lots_lot;
+DROP FUNCTION lots_lotcategory_facet_counts();
+DROP FUNCTION lots_lot_facet_counts();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lots', '0006_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lot',
+            name='price_bucket',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('starting_price'), function='width_bucket', template="%(function)s(%(expressions)s, '{1000,5000,10000,50000}'::numeric[])"), output_field=models.IntegerField()),
+        ),
+        migrations.CreateModel(
+            name='LotFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('category', 'Категория'), ('price', 'Ценовой диапазон')], max_length=10)),
+                ('value', models.IntegerField()),
+                ('status', models.CharField(choices=[('pending', 'На рассмотрении'), ('approved', 'Одобрен'), ('rejected', 'Отклонён'), ('sold', 'Продан'), ('not_sold', 'Не продан')], max_length=10)),
+                ('count', models.IntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'facet', 'value'], name='lots_lotfac_status_90800c_idx')],
+            },
+        ),
+        migrations.RunSQL(FACET_TRIGGERS, DROP_FACET_TRIGGERS),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0007_trigram_indexes'),
+        ('lots', '0007_lot_facets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LotPopularity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('bids', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(fields=['status', '-bid_count', '-id'], name='lot_popular_idx'),
+        ),
+        migrations.AddField(
+            model_name='lotpopularity',
+            name='lot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='popularity', to='lots.lot'),
+        ),
+        migrations.AddIndex(
+            model_name='lotpopularity',
+            index=models.Index(fields=['bucket', 'lot'], name='lots_lotpop_bucket_180e4f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lotpopularity',
+            constraint=models.UniqueConstraint(fields=('lot', 'bucket'), name='unique_lot_popularity_bucket'),
+        ),
+    ]
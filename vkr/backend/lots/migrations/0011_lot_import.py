@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:17
+
+import django.db.models.deletion
+import lots.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_image_variants'),
+        ('lots', '0010_lot_image_upload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LotImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('manifest', models.FileField(storage=lots.models.import_storage, upload_to='manifests/')),
+                ('archive', models.FileField(blank=True, null=True, storage=lots.models.import_storage, upload_to='archives/')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('validating', 'Проверка'), ('importing', 'Загрузка'), ('completed', 'Завершен'), ('failed', 'Ошибка')], default='pending', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('auction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_imports', to='auctions.auction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_hot_lookup_indexes'),
+        ('lots', '0011_lot_import'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(fields=['auction', 'status'], name='lot_auction_status_idx'),
+        ),
+    ]
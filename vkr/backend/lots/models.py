@@ -1,6 +1,18 @@
-from django.db import models
+import uuid
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, models, transaction
+from django.db.models import F, Func, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from auctions.models import Auction
 from users.models import User
+from core.search import document_vector
+from core.cache import bump
+from core.images import delete_variants, is_current, render_variants, schedule
 
 
 class Category(models.Model):
@@ -12,6 +24,10 @@ class Category(models.Model):
     
     class Meta:
         verbose_name_plural = "Categories"
+        indexes = [
+            # Подсказки при наборе (core.suggest)
+            GinIndex(fields=['name'], name='category_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
 
 class Lot(models.Model):
@@ -29,6 +45,10 @@ class Lot(models.Model):
         (STATUS_NOT_SOLD, 'Не продан'),
     ]
     
+    # Границы ценовых диапазонов для фасетов поиска: диапазон 0 — цена ниже
+    # первой границы, диапазон i — от границы i-1 до границы i, последний — выше всех
+    PRICE_BUCKETS = (1000, 5000, 10000, 50000)
+    
     auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='lots')
     donor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='donated_lots')
     title = models.CharField(max_length=255)
@@ -39,10 +59,78 @@ class Lot(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
     winner = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='won_lots', null=True, blank=True)
     winning_bid_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Денормализованное состояние торгов, обновляется в транзакции каждой ставки
+    current_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    current_leader = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='leading_lots', null=True, blank=True)
+    bid_count = models.PositiveIntegerField(default=0)
+    last_bid_at = models.DateTimeField(null=True, blank=True)
+    # Отметка о подведении итогов лота: проставляется в той же транзакции,
+    # что и результат, поэтому прерванное подведение итогов продолжается с необработанных лотов
+    settled_at = models.DateTimeField(null=True, blank=True)
+    # Полнотекстовый индекс по названию и описанию (см. core.search)
+    search_vector = models.GeneratedField(
+        expression=document_vector('title', 'description'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    # Номер ценового диапазона стартовой цены (см. PRICE_BUCKETS)
+    price_bucket = models.GeneratedField(
+        expression=Func(
+            F('starting_price'),
+            function='width_bucket',
+            template="%(function)s(%(expressions)s, '{" + ','.join(map(str, PRICE_BUCKETS)) + "}'::numeric[])",
+        ),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+    
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector']),
+            GinIndex(fields=['title'], name='lot_title_trgm', opclasses=['gin_trgm_ops']),
+            # Популярные лоты за все время (lots.leaderboard)
+            models.Index(fields=['status', '-bid_count', '-id'], name='lot_popular_idx'),
+            # Лоты аукциона с фильтром видимости по статусу (by_auction)
+            models.Index(fields=['auction', 'status'], name='lot_auction_status_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
+    def is_visible_to(self, user):
+        """
+        Лоты на рассмотрении и отклоненные видны только донору,
+        организации-владельцу аукциона и администраторам
+        """
+        if self.status not in (self.STATUS_PENDING, self.STATUS_REJECTED):
+            return True
+        return user.is_staff or user.id in (self.donor_id, self.auction.charity.user_id)
+    
+    def get_highest_amount(self):
+        """Текущая максимальная ставка или стартовая цена, если ставок ещё нет"""
+        if self.current_price is not None:
+            return self.current_price
+        return self.starting_price
+
+    def record_bid(self, bid):
+        """
+        Фиксирует принятую ставку в денормализованных полях лота.
+        Вызывается внутри транзакции создания ставки.
+        """
+        Lot.objects.filter(pk=self.pk).update(
+            current_price=bid.amount,
+            current_leader_id=bid.user_id,
+            bid_count=F('bid_count') + 1,
+            last_bid_at=bid.created_at,
+        )
+        self.current_price = bid.amount
+        self.current_leader_id = bid.user_id
+        self.bid_count += 1
+        self.last_bid_at = bid.created_at
+        # Общий список 'lots' не сбрасывается: он живет в кэше недолго
+        # (RESPONSE_CACHE_BIDS_TIMEOUT, см. core/cache.py)
+        bump(f'lot:{self.pk}', f'auction:{self.auction_id}')
+
 
 class LotCategory(models.Model):
     lot = models.ForeignKey(Lot, on_delete=models.CASCADE)
@@ -55,6 +143,107 @@ class LotCategory(models.Model):
         verbose_name_plural = "Lot Categories"
 
 
+class LotPopularity(models.Model):
+    """
+    Число принятых ставок на лот за интервал времени, начинающийся в bucket.
+    Резервная таблица рейтинга популярных лотов за час и за день
+    (основной рейтинг — отсортированные множества Redis, см. lots.leaderboard).
+    """
+    lot = models.ForeignKey(Lot, on_delete=models.CASCADE, related_name='popularity')
+    bucket = models.DateTimeField()
+    bids = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lot', 'bucket'], name='unique_lot_popularity_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket', 'lot']),
+        ]
+    
+    def __str__(self):
+        return f"{self.lot_id} @ {self.bucket:%Y-%m-%d %H:%M}: {self.bids}"
+    
+    @classmethod
+    def record(cls, lot_id, bucket):
+        """Увеличивает счетчик интервала одним INSERT ... ON CONFLICT без чтения строки"""
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {table} (lot_id, bucket, bids) VALUES (%s, %s, 1)
+                ON CONFLICT (lot_id, bucket) DO UPDATE SET bids = {table}.bids + 1
+            """, [lot_id, bucket])
+
+
+class LotFacetCount(models.Model):
+    """
+    Изменение числа лотов в значении фасета (категории или ценовом диапазоне)
+    с данным статусом. Записи добавляют триггеры базы на lots_lot и
+    lots_lotcategory при любом изменении, в том числе через queryset.update()
+    и bulk_create; текущее число — сумма записей. Записи только добавляются,
+    периодическая задача сворачивает их в одну запись на значение (compact).
+    """
+    FACET_CATEGORY = 'category'
+    FACET_PRICE = 'price'
+    
+    FACET_CHOICES = [
+        (FACET_CATEGORY, 'Категория'),
+        (FACET_PRICE, 'Ценовой диапазон'),
+    ]
+    
+    facet = models.CharField(max_length=10, choices=FACET_CHOICES)
+    value = models.IntegerField()
+    status = models.CharField(max_length=10, choices=Lot.STATUS_CHOICES)
+    count = models.IntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'facet', 'value']),
+        ]
+    
+    def __str__(self):
+        return f"{self.facet}={self.value} ({self.status}): {self.count:+d}"
+    
+    @classmethod
+    def totals(cls, statuses=None):
+        """
+        Числа лотов по фасетам одним запросом:
+        {'category': {id: n}, 'price': {bucket: n}, 'status': {status: n}}.
+        Каждый лот попадает ровно в один ценовой диапазон, поэтому число лотов
+        в статусе — сумма по ценовым диапазонам.
+        """
+        rows = cls.objects.all()
+        if statuses is not None:
+            rows = rows.filter(status__in=statuses)
+        rows = rows.values('facet', 'value', 'status').annotate(total=Sum('count')).filter(total__gt=0)
+
+        totals = {cls.FACET_CATEGORY: {}, cls.FACET_PRICE: {}, 'status': {}}
+        for row in rows:
+            values = totals[row['facet']]
+            values[row['value']] = values.get(row['value'], 0) + row['total']
+            if row['facet'] == cls.FACET_PRICE:
+                totals['status'][row['status']] = totals['status'].get(row['status'], 0) + row['total']
+        return totals
+    
+    @classmethod
+    def compact(cls):
+        """
+        Сворачивает записи в одну на (фасет, значение, статус). Записи, добавленные
+        параллельно, не удаляются и учитываются при следующем сворачивании.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                WITH removed AS (
+                    DELETE FROM {cls._meta.db_table} RETURNING facet, value, status, count
+                )
+                INSERT INTO {cls._meta.db_table} (facet, value, status, count)
+                SELECT facet, value, status, SUM(count) FROM removed
+                GROUP BY facet, value, status
+                HAVING SUM(count) <> 0
+            """)
+            return cursor.rowcount
+
+
 class LotImage(models.Model):
     lot = models.ForeignKey(
         Lot,
@@ -67,10 +256,116 @@ class LotImage(models.Model):
         blank=True    # ← и сюда
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Размеры исходного изображения и его уменьшенные копии (см. core.images)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return f"Image for {self.lot.title}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Варианты нового или замененного файла создаются в фоне
+        if self.image and not is_current(self.image, self.variants):
+            from .tasks import generate_lot_image_variants
+            image_id = self.pk
+            transaction.on_commit(lambda: schedule(generate_lot_image_variants, [image_id]))
+
+    def generate_variants(self, force=False):
+        """
+        Создает варианты изображения и сохраняет их описание.
+        Возвращает False, если варианты текущего файла уже есть.
+        """
+        if not self.image or (is_current(self.image, self.variants) and not force):
+            return False
+        if not is_current(self.image, self.variants):
+            delete_variants(self.image.storage, self.variants)
+        width, height, variants = render_variants(self.image)
+        # Если файл успели заменить, варианты создаст задача для нового файла
+        updated = LotImage.objects.filter(pk=self.pk, image=self.image.name).update(
+            width=width, height=height, variants=variants
+        )
+        if updated:
+            self.width, self.height, self.variants = width, height, variants
+            bump('lots', f'lot:{self.lot_id}', f'auction:{self.lot.auction_id}')
+        return bool(updated)
+
+
+class LotImageUpload(models.Model):
+    """
+    Загрузка изображения лота частями с возобновлением (см. lots/uploads.py).
+    received — число байт, принятых подряд с начала файла.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Загружается'),
+        (STATUS_COMPLETED, 'Завершена'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    lot = models.ForeignKey(Lot, on_delete=models.CASCADE, related_name='image_uploads')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lot_image_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    image = models.OneToOneField(LotImage, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            # Удаление брошенных загрузок
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename}: {self.received}/{self.size}"
+
+
+def import_storage():
+    """Файлы импорта хранятся вне MEDIA_ROOT и не раздаются по ссылкам"""
+    return FileSystemStorage(location=settings.LOT_IMPORT_DIR)
+
+
+class LotImport(models.Model):
+    """
+    Импорт лотов аукциона из манифеста CSV/JSON и архива изображений
+    (см. lots/imports.py). processed — число строк манифеста, уже записанных в базу.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_VALIDATING = 'validating'
+    STATUS_IMPORTING = 'importing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_VALIDATING, 'Проверка'),
+        (STATUS_IMPORTING, 'Загрузка'),
+        (STATUS_COMPLETED, 'Завершен'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+    
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='lot_imports')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lot_imports')
+    manifest = models.FileField(upload_to='manifests/', storage=import_storage)
+    archive = models.FileField(upload_to='archives/', storage=import_storage, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    # [{'row': номер строки, 'errors': {поле: [сообщения]}}]
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Import {self.pk} into {self.auction_id}: {self.processed}/{self.total} ({self.status})"
+
 
 class DeliveryDetail(models.Model):
     STATUS_PENDING = 'pending'
@@ -104,3 +399,41 @@ class DeliveryDetail(models.Model):
     
     def __str__(self):
         return f"Delivery for {self.transaction.lot.title} to {self.recipient_name}"
+
+
+@receiver([post_save, post_delete], sender=Lot)
+@receiver([post_save, post_delete], sender=Auction)
+def invalidate_ending_soon_feed(sender, **kwargs):
+    """
+    Лента завершающихся лотов пересчитывается после изменения аукциона или лота.
+    Версия меняется после фиксации: лента, собранная до нее, не попадет под новую версию.
+    """
+    from .feeds import invalidate_ending_soon
+    transaction.on_commit(invalidate_ending_soon)
+
+
+@receiver([post_save, post_delete], sender=Auction)
+def invalidate_auction_responses(sender, instance, **kwargs):
+    """Кэшированные ответы со списками аукционов и с этим аукционом устаревают"""
+    bump('auctions', f'auction:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=Lot)
+def invalidate_lot_responses(sender, instance, **kwargs):
+    bump('lots', f'lot:{instance.pk}', f'auction:{instance.auction_id}')
+
+
+@receiver([post_save, post_delete], sender=LotCategory)
+@receiver([post_save, post_delete], sender=LotImage)
+def invalidate_lot_relation_responses(sender, instance, **kwargs):
+    """Категории и изображения входят в ответы с лотом и со списком лотов аукциона"""
+    scopes = ['lots', f'lot:{instance.lot_id}']
+    auction_id = Lot.objects.filter(pk=instance.lot_id).values_list('auction_id', flat=True).first()
+    if auction_id is not None:
+        scopes.append(f'auction:{auction_id}')
+    bump(*scopes)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    bump('categories', 'lots')
@@ -0,0 +1,82 @@
+"""
+Пакетная модерация лотов организацией-владельцем аукциона.
+
+Права на весь набор лотов проверяются одним запросом, статусы меняются одним
+UPDATE, уведомления донорам создаются через bulk_create. Для каждого
+запрошенного лота возвращается результат:
+- approved / rejected — статус изменен;
+- not_found — лота нет;
+- forbidden — лот из аукциона другой организации;
+- not_pending — лот уже не на рассмотрении.
+"""
+from django.db import transaction
+
+from core.cache import bump
+from users.models import Notification
+from .feeds import invalidate_ending_soon
+from .models import Lot
+
+RESULT_NOT_FOUND = 'not_found'
+RESULT_FORBIDDEN = 'forbidden'
+RESULT_NOT_PENDING = 'not_pending'
+
+STATUSES = (Lot.STATUS_APPROVED, Lot.STATUS_REJECTED)
+
+
+def _notification(lot, status, reason):
+    if status == Lot.STATUS_APPROVED:
+        return Notification(
+            user_id=lot['donor_id'],
+            subject="Ваш лот одобрен",
+            message=f"Ваш лот '{lot['title']}' был одобрен благотворительной организацией."
+        )
+    message = f"Ваш лот '{lot['title']}' был отклонен благотворительной организацией."
+    if reason:
+        message += f" Причина: {reason}"
+    return Notification(user_id=lot['donor_id'], subject="Ваш лот отклонен", message=message)
+
+
+def moderate(user, lot_ids, status, reason=''):
+    """
+    Переводит лоты на рассмотрении в статус status от имени организации user.
+    Возвращает {id лота: результат} в порядке lot_ids.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"Недопустимый статус: {status}")
+    charity_id = user.charity.pk if hasattr(user, 'charity') else None
+    lot_ids = list(dict.fromkeys(lot_ids))
+
+    with transaction.atomic():
+        # Строки блокируются до UPDATE: параллельная модерация тех же лотов
+        # увидит уже измененный статус
+        lots = {
+            lot['id']: lot
+            for lot in Lot.objects.select_for_update(of=('self',))
+            .filter(pk__in=lot_ids)
+            .values('id', 'title', 'donor_id', 'status', 'auction_id', 'auction__charity_id')
+        }
+        results = {}
+        changed = []
+        for lot_id in lot_ids:
+            lot = lots.get(lot_id)
+            if lot is None:
+                results[lot_id] = RESULT_NOT_FOUND
+            elif charity_id is None or lot['auction__charity_id'] != charity_id:
+                results[lot_id] = RESULT_FORBIDDEN
+            elif lot['status'] != Lot.STATUS_PENDING:
+                results[lot_id] = RESULT_NOT_PENDING
+            else:
+                results[lot_id] = status
+                changed.append(lot)
+
+        if changed:
+            Lot.objects.filter(pk__in=[lot['id'] for lot in changed]).update(status=status)
+            Notification.objects.bulk_create([_notification(lot, status, reason) for lot in changed])
+            # UPDATE не отправляет сигналов: кэш ответов и лента сбрасываются явно
+            bump(
+                'lots',
+                *{f"auction:{lot['auction_id']}" for lot in changed},
+                *(f"lot:{lot['id']}" for lot in changed),
+            )
+            transaction.on_commit(invalidate_ending_soon)
+    return results
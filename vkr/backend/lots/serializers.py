@@ -1,5 +1,9 @@
 from rest_framework import serializers
-from .models import Lot, Category, LotCategory, LotImage, DeliveryDetail
+import re
+
+from django.conf import settings
+from .models import Lot, Category, LotCategory, LotImage, LotImageUpload, LotImport, DeliveryDetail
+from core.images import ImageVariantsField
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -9,10 +13,135 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class LotImageSerializer(serializers.ModelSerializer):
+    variants = ImageVariantsField('image', 'variants')
+    
     class Meta:
         model = LotImage
-        fields = ['id', 'lot', 'image', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'lot', 'image', 'width', 'height', 'variants', 'created_at']
+        read_only_fields = ['created_at', 'width', 'height']
+
+
+class LotImageUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LotImageUpload
+        fields = ['id', 'lot', 'filename', 'size', 'sha256', 'received', 'status', 'image', 'created_at']
+        read_only_fields = ['received', 'status', 'image', 'created_at']
+    
+    def validate_lot(self, lot):
+        user = self.context['request'].user
+        if lot.donor_id != user.id and not user.is_staff:
+            raise serializers.ValidationError("Загружать изображения может только донор лота")
+        return lot
+    
+    def validate_size(self, size):
+        if not 0 < size <= settings.LOT_IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Размер файла должен быть от 1 до {settings.LOT_IMAGE_UPLOAD_MAX_SIZE} байт"
+            )
+        return size
+    
+    def validate_sha256(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError("Ожидается SHA-256 файла в шестнадцатеричном виде")
+        return value.lower()
+    
+    def validate_filename(self, value):
+        # Каталоги из имени клиента не используются
+        name = value.replace('\\', '/').rsplit('/', 1)[-1].strip()
+        if not name:
+            raise serializers.ValidationError("Пустое имя файла")
+        return name
+
+
+class LotModerationSerializer(serializers.Serializer):
+    """Запрос пакетной модерации лотов (см. lots/moderation.py)"""
+    lot_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=settings.LOT_MODERATION_MAX_BATCH,
+    )
+    status = serializers.ChoiceField(choices=[Lot.STATUS_APPROVED, Lot.STATUS_REJECTED])
+    reason = serializers.CharField(required=False, allow_blank=True, default='', max_length=1000)
+
+
+class LotImportSerializer(serializers.ModelSerializer):
+    status_display = serializers.ReadOnlyField(source='get_status_display')
+    
+    class Meta:
+        model = LotImport
+        fields = [
+            'id', 'auction', 'manifest', 'archive', 'status', 'status_display',
+            'total', 'processed', 'errors', 'created_at', 'finished_at'
+        ]
+        read_only_fields = ['status', 'total', 'processed', 'errors', 'created_at', 'finished_at']
+        extra_kwargs = {
+            'manifest': {'write_only': True},
+            'archive': {'write_only': True},
+        }
+    
+    def validate_auction(self, auction):
+        user = self.context['request'].user
+        if user.role == user.CHARITY:
+            if not hasattr(user, 'charity') or auction.charity_id != user.charity.pk:
+                raise serializers.ValidationError("Импортировать лоты можно только в свой аукцион")
+        elif user.role != user.DONOR:
+            raise serializers.ValidationError("Импорт лотов доступен донорам и организациям")
+        if auction.status != auction.STATUS_ACTIVE:
+            raise serializers.ValidationError("Аукцион не принимает новые лоты")
+        return auction
+    
+    def validate_manifest(self, manifest):
+        if not manifest.name.lower().endswith(('.csv', '.json', '.jsonl')):
+            raise serializers.ValidationError("Манифест должен быть в формате CSV, JSON или JSON Lines")
+        if manifest.size > settings.LOT_IMPORT_MAX_MANIFEST_SIZE:
+            raise serializers.ValidationError("Слишком большой манифест")
+        return manifest
+    
+    def validate_archive(self, archive):
+        if archive is not None:
+            if not archive.name.lower().endswith('.zip'):
+                raise serializers.ValidationError("Изображения передаются ZIP-архивом")
+            if archive.size > settings.LOT_IMPORT_MAX_ARCHIVE_SIZE:
+                raise serializers.ValidationError("Слишком большой архив")
+        return archive
+
+
+class LotImportRowSerializer(serializers.Serializer):
+    """
+    Строка манифеста импорта. В контексте ожидаются categories (название -> id),
+    archive (имя файла -> ZipInfo) и resolve_donor (email -> пользователь или None).
+    """
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(allow_blank=True, required=False, default='')
+    starting_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    categories = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    images = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    donor_email = serializers.EmailField(required=False, allow_blank=True, default='')
+    
+    def validate_categories(self, names):
+        known = self.context['categories']
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise serializers.ValidationError(f"Нет категорий: {', '.join(unknown)}")
+        return [known[name] for name in dict.fromkeys(names)]
+    
+    def validate_images(self, names):
+        archive = self.context['archive']
+        missing = [name for name in names if name not in archive]
+        if missing:
+            raise serializers.ValidationError(f"Нет в архиве: {', '.join(missing)}")
+        too_large = [name for name in names if archive[name].file_size > settings.LOT_IMAGE_UPLOAD_MAX_SIZE]
+        if too_large:
+            raise serializers.ValidationError(f"Слишком большие файлы: {', '.join(too_large)}")
+        return names
+    
+    def validate_donor_email(self, email):
+        if not email:
+            return None
+        donor = self.context['resolve_donor'](email)
+        if donor is None:
+            raise serializers.ValidationError("Донор с таким email не найден")
+        return donor
 
 
 class LotCategorySerializer(serializers.ModelSerializer):
@@ -22,6 +151,7 @@ class LotCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = LotCategory
         fields = ['id', 'lot', 'lot_title', 'category', 'category_name']
+        select_related = ['lot', 'category']
 
 
 class LotSerializer(serializers.ModelSerializer):
@@ -35,16 +165,21 @@ class LotSerializer(serializers.ModelSerializer):
     auction_charity_id = serializers.SerializerMethodField()
     
     def get_auction_charity_id(self, obj):
-        return obj.auction.charity.id if obj.auction and obj.auction.charity else None
+        return obj.auction.charity_id if obj.auction else None
 
     class Meta:
         model = Lot
         fields = [
             'id', 'auction', 'donor', 'donor_username', 'donor_first_name', 'donor_last_name',
             'title', 'description', 'starting_price', 'created_at', 'categories', 'categories_info',
-            'images', 'status', 'status_display', 'auction_charity_id'
+            'images', 'status', 'status_display', 'auction_charity_id',
+            'current_price', 'current_leader', 'bid_count', 'last_bid_at'
+        ]
+        read_only_fields = [
+            'created_at', 'status', 'current_price', 'current_leader', 'bid_count', 'last_bid_at'
         ]
-        read_only_fields = ['created_at', 'status']
+        select_related = ['donor', 'auction']
+        prefetch_related = ['images', 'categories']
 
 
 class DeliveryDetailSerializer(serializers.ModelSerializer):
@@ -0,0 +1,75 @@
+import logging
+
+from celery import shared_task
+
+
+@shared_task
+def compact_lot_facet_counts():
+    """
+    Задача для периодического сворачивания записей счетчиков фасетов лотов
+    """
+    from .models import LotFacetCount
+    
+    rows = LotFacetCount.compact()
+    
+    return f"Записей счетчиков фасетов после сворачивания: {rows}"
+
+
+@shared_task
+def prune_lot_popularity():
+    """
+    Задача для удаления устаревших счетчиков рейтинга популярных лотов
+    """
+    from .leaderboard import prune
+    
+    deleted = prune()
+    
+    return f"Удалено устаревших счетчиков рейтинга: {deleted}"
+
+
+@shared_task
+def generate_lot_image_variants(image_ids, force=False):
+    """
+    Задача для создания вариантов изображений лотов: после загрузки
+    или пачкой при заполнении вариантов уже загруженных изображений
+    """
+    from .models import LotImage
+    
+    created = 0
+    for image in LotImage.objects.select_related('lot').filter(pk__in=image_ids):
+        try:
+            created += image.generate_variants(force=force)
+        except (OSError, ValueError) as e:
+            # Поврежденный файл не останавливает обработку пачки
+            logging.error(f"Не удалось создать варианты изображения лота {image.pk}: {e}")
+    
+    return f"Созданы варианты изображений лотов: {created} из {len(image_ids)}"
+
+
+@shared_task
+def prune_lot_image_uploads():
+    """
+    Задача для удаления брошенных загрузок изображений лотов
+    """
+    from .uploads import prune
+    
+    deleted = prune()
+    
+    return f"Удалено брошенных загрузок изображений: {deleted}"
+
+
+@shared_task
+def import_lots(import_id):
+    """
+    Задача для импорта лотов из манифеста и архива изображений.
+    Прогресс и ошибки строк сохраняются в LotImport.
+    """
+    from .imports import run
+    from .models import LotImport
+    
+    lot_import = LotImport.objects.select_related('auction', 'user').get(pk=import_id)
+    if lot_import.status == LotImport.STATUS_COMPLETED:
+        return f"Импорт {import_id} уже завершен"
+    run(lot_import)
+    
+    return f"Импорт {import_id}: {lot_import.get_status_display()}, записано строк {lot_import.processed} из {lot_import.total}"
@@ -1,3 +1,580 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from auctions.models import Auction
+from users.models import User, Balance, LedgerEntry, Notification
+from .models import Lot, Category, LotCategory, LotFacetCount, LotImage, LotImageUpload, LotImport, LotPopularity
+from .serializers import LotImageSerializer
+from .tasks import generate_lot_image_variants, import_lots
+from . import leaderboard
+from .facets import count_facets
+
+
+class LotFullTextSearchTest(TestCase):
+    """Поиск лотов по ?search= через search_vector"""
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Весенний аукцион',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(days=1),
+        )
+        lots = [
+            ('Картина маслом', 'Пейзаж с рекой'),
+            ('Ваза', 'Расписана вручную, к ней прилагается картина'),
+            ('Смартфон iPhone 12', 'Состояние нового'),
+            ('Книга', 'Первое издание'),
+        ]
+        self.lots = {
+            title: Lot.objects.create(
+                auction=auction, donor=donor, title=title, description=description,
+                starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+            )
+            for title, description in lots
+        }
+        self.client = APIClient()
+
+    def _search(self, terms):
+        response = self.client.get('/api/v1/lots/', {'search': terms})
+        self.assertEqual(response.status_code, 200)
+        return [lot['title'] for lot in response.data['results']]
+
+    def test_russian_stemming_and_title_ranked_first(self):
+        self.assertEqual(self._search('картины'), ['Картина маслом', 'Ваза'])
+
+    def test_simple_config_matches_unstemmed_words(self):
+        self.assertEqual(self._search('iphone'), ['Смартфон iPhone 12'])
+
+    def test_websearch_syntax(self):
+        self.assertEqual(self._search('картина -пейзаж'), ['Ваза'])
+        self.assertEqual(self._search(''), sorted(self.lots, key=lambda title: -self.lots[title].id))
+
+
+class LotFacetTest(TestCase):
+    """Числа лотов по фасетам: счетчики триггеров и агрегирующий запрос"""
+
+    def setUp(self):
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(days=1),
+        )
+        self.paintings = Category.objects.create(name='Живопись')
+        self.books = Category.objects.create(name='Книги')
+        self.lots = [
+            Lot.objects.create(
+                auction=auction, donor=donor, title=f'Лот {i}',
+                starting_price=Decimal(price), status=Lot.STATUS_APPROVED,
+            )
+            for i, price in enumerate(['500.00', '1000.00', '7500.00', '100000.00'])
+        ]
+        LotCategory.objects.bulk_create([
+            LotCategory(lot=self.lots[0], category=self.paintings),
+            LotCategory(lot=self.lots[0], category=self.books),
+            LotCategory(lot=self.lots[1], category=self.paintings),
+            LotCategory(lot=self.lots[2], category=self.books),
+        ])
+        self.client = APIClient()
+
+    def test_counters_follow_bulk_updates_and_deletes(self):
+        Lot.objects.filter(pk__in=[self.lots[0].pk, self.lots[1].pk]).update(status=Lot.STATUS_SOLD)
+        Lot.objects.filter(pk=self.lots[3].pk).update(starting_price=Decimal('20.00'))
+        LotCategory.objects.filter(lot=self.lots[2]).update(category=self.paintings)
+        self.lots[1].delete()
+        self.books.delete()
+
+        expected = count_facets(Lot.objects.all())
+        self.assertEqual(LotFacetCount.totals(), expected)
+        self.assertEqual(expected, {
+            'category': {self.paintings.id: 2},
+            'price': {0: 2, 2: 1},
+            'status': {Lot.STATUS_SOLD: 1, Lot.STATUS_APPROVED: 2},
+        })
+
+        LotFacetCount.compact()
+        self.assertEqual(LotFacetCount.totals(), expected)
+        self.assertEqual(LotFacetCount.objects.count(), 5)
+
+    def test_search_facets(self):
+        response = self.client.get('/api/v1/lots/search/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(response.data['facets'], {
+            'categories': [{'id': self.paintings.id, 'count': 2}, {'id': self.books.id, 'count': 2}],
+            'status': [{'value': Lot.STATUS_APPROVED, 'count': 4}],
+            'price': [
+                {'bucket': 0, 'min': None, 'max': 1000, 'count': 1},
+                {'bucket': 1, 'min': 1000, 'max': 5000, 'count': 1},
+                {'bucket': 2, 'min': 5000, 'max': 10000, 'count': 1},
+                {'bucket': 4, 'min': 50000, 'max': None, 'count': 1},
+            ],
+        })
+
+        response = self.client.get('/api/v1/lots/search/', {'category': self.books.id, 'max_price': 5000})
+        self.assertEqual([lot['title'] for lot in response.data['results']], ['Лот 0'])
+        self.assertEqual(response.data['facets'], {
+            'categories': [{'id': self.paintings.id, 'count': 1}, {'id': self.books.id, 'count': 1}],
+            'status': [{'value': Lot.STATUS_APPROVED, 'count': 1}],
+            'price': [{'bucket': 0, 'min': None, 'max': 1000, 'count': 1}],
+        })
+
+        response = self.client.get('/api/v1/lots/search/', {'price_bucket': 2})
+        self.assertEqual([lot['title'] for lot in response.data['results']], ['Лот 2'])
+        self.assertEqual(self.client.get('/api/v1/lots/search/', {'status': 'unknown'}).status_code, 400)
+
+
+class PopularLotsTest(TestCase):
+    """Рейтинг популярных лотов по таблице LotPopularity (без Redis)"""
+
+    def setUp(self):
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.auctions = []
+        for i in range(2):
+            organization = User.objects.create_user(email=f'org{i}@example.com', role=User.CHARITY)
+            self.auctions.append(Auction.objects.create(
+                charity=organization.charity,
+                name=f'Аукцион {i}',
+                start_time=timezone.now(),
+                end_time=timezone.now() + timedelta(days=1),
+            ))
+        self.lots = [
+            Lot.objects.create(
+                auction=auction, donor=donor, title=title,
+                starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+            )
+            for auction, title in (
+                (self.auctions[0], 'Картина'), (self.auctions[0], 'Ваза'), (self.auctions[1], 'Книга'),
+            )
+        ]
+        self.category = Category.objects.create(name='Живопись')
+        LotCategory.objects.create(lot=self.lots[1], category=self.category)
+
+        self.client = APIClient()
+        buyers = [User.objects.create_user(email=f'buyer{i}@example.com', role=User.BUYER) for i in range(2)]
+        for buyer in buyers:
+            Balance.credit(buyer.id, Decimal('1000.00'), LedgerEntry.KIND_TOP_UP)
+        for lot, bids in zip(self.lots, (3, 2, 1)):
+            for amount in range(bids):
+                self.client.force_authenticate(user=buyers[amount % 2])
+                response = self.client.post('/api/bids/', {'lot': lot.id, 'amount': 20 + amount}, format='json')
+                self.assertEqual(response.status_code, 201, response.content)
+        self.client.force_authenticate(user=None)
+
+    def _popular(self, **params):
+        response = self.client.get('/api/lots/popular/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [lot['title'] for lot in response.data]
+
+    def test_windows_and_scopes(self):
+        # Ставки на книгу двумя часами ранее попадают в окно дня, но не часа
+        LotPopularity.objects.create(
+            lot=self.lots[2], bucket=timezone.now() - timedelta(hours=2), bids=5,
+        )
+        self.assertEqual(self._popular(window='hour'), ['Картина', 'Ваза', 'Книга'])
+        self.assertEqual(self._popular(window='day'), ['Книга', 'Картина', 'Ваза'])
+        self.assertEqual(self._popular(), ['Картина', 'Ваза', 'Книга'])
+        self.assertEqual(self._popular(window='day', auction=self.auctions[0].id, limit=1), ['Картина'])
+        self.assertEqual(self._popular(window='hour', category=self.category.id), ['Ваза'])
+
+    def test_only_active_lots_and_prune(self):
+        Lot.objects.filter(pk=self.lots[0].pk).update(status=Lot.STATUS_SOLD)
+        self.assertEqual(self._popular(window='hour'), ['Ваза', 'Книга'])
+        self.assertEqual(self._popular(), ['Ваза', 'Книга'])
+
+        self.assertGreaterEqual(leaderboard.prune(timezone.now() + timedelta(days=2)), 3)
+        self.assertFalse(LotPopularity.objects.exists())
+        self.assertEqual(self.client.get('/api/lots/popular/', {'window': 'week'}).status_code, 400)
+
+
+class EndingSoonFeedTest(TestCase):
+    """Лента завершающихся лотов из кэша с пересчетом после изменений"""
+
+    def setUp(self):
+        cache.clear()
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.auctions = {}
+        for name, hours, status in (
+            ('Через час', 1, Auction.STATUS_ACTIVE),
+            ('Через два дня', 48, Auction.STATUS_ACTIVE),
+            ('Через неделю', 24 * 7, Auction.STATUS_ACTIVE),
+            ('Завершен', 1, Auction.STATUS_COMPLETED),
+        ):
+            self.auctions[name] = Auction.objects.create(
+                charity=organization.charity, name=name, status=status,
+                start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=hours),
+            )
+        for name, titles in (
+            ('Через час', ['Лот 1', 'Лот 2']),
+            ('Через два дня', ['Лот 3']),
+            ('Через неделю', ['Лот 4']),
+            ('Завершен', ['Лот 5']),
+        ):
+            for title in titles:
+                Lot.objects.create(
+                    auction=self.auctions[name], donor=donor, title=title,
+                    starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+                )
+        Lot.objects.create(
+            auction=self.auctions['Через час'], donor=donor, title='На рассмотрении',
+            starting_price=Decimal('10.00'),
+        )
+        self.client = APIClient()
+
+    def _titles(self):
+        titles, url = [], '/api/lots/ending_soon/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('max-age=', response['Cache-Control'])
+            titles.append([lot['title'] for lot in response.data['results']])
+            url = response.data['next']
+        return titles
+
+    def test_pages_in_end_time_order(self):
+        self.assertEqual(self._titles(), [['Лот 1', 'Лот 2'], ['Лот 3']])
+
+        response = self.client.get('/api/lots/ending_soon/?page_size=2')
+        previous = self.client.get(response.data['next']).data['previous']
+        self.assertEqual([lot['title'] for lot in self.client.get(previous).data['results']], ['Лот 1', 'Лот 2'])
+
+    def test_feed_is_cached_until_auction_changes(self):
+        self._titles()
+        soon = self.auctions['Через неделю']
+
+        # Изменение в обход модели не видно до пересчета ленты
+        Auction.objects.filter(pk=soon.pk).update(end_time=timezone.now() + timedelta(minutes=30))
+        self.assertEqual(self._titles(), [['Лот 1', 'Лот 2'], ['Лот 3']])
+
+        # До фиксации версия ленты не меняется, и пересчет не видит незафиксированных данных
+        soon.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            soon.save()
+            self.assertEqual(self._titles(), [['Лот 1', 'Лот 2'], ['Лот 3']])
+        self.assertEqual(self._titles(), [['Лот 4', 'Лот 1'], ['Лот 2', 'Лот 3']])
+
+
+class LotImageVariantsTest(TestCase):
+    """Варианты изображений лотов: размеры, поворот по EXIF, метаданные, повторный запуск"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(days=1),
+        )
+        self.lot = Lot.objects.create(
+            auction=auction, donor=donor, title='Картина',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+
+    def _photo(self):
+        # Снимок 1200x600, который по EXIF нужно повернуть на 90 градусов
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Camera'
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 600), (200, 30, 30)).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_variants_are_generated_once_without_metadata(self):
+        image = LotImage.objects.create(lot=self.lot, image=self._photo())
+        self.assertEqual(LotImageSerializer(image).data['variants'], {'sizes': {}, 'srcset': {}})
+
+        self.assertIn('1 из 1', generate_lot_image_variants([image.id]))
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (600, 1200))
+        sizes = image.variants['sizes']
+        self.assertEqual((sizes['thumb']['width'], sizes['thumb']['height']), (160, 320))
+        self.assertEqual((sizes['large']['width'], sizes['large']['height']), (600, 1200))
+        for name in (sizes['thumb']['webp'], sizes['medium']['jpeg']):
+            with default_storage.open(name) as variant:
+                self.assertEqual(len(Image.open(variant).getexif()), 0)
+
+        data = LotImageSerializer(image).data['variants']
+        self.assertEqual(data['sizes']['thumb']['webp'], default_storage.url(sizes['thumb']['webp']))
+        self.assertEqual(data['srcset']['jpeg'].count('w, '), 2)
+        self.assertTrue(data['srcset']['webp'].endswith(f"{sizes['large']['webp']} 600w"))
+
+        # Повторный запуск ничего не пересоздает
+        self.assertIn('0 из 1', generate_lot_image_variants([image.id]))
+
+
+class LotImageUploadTest(TestCase):
+    """Загрузка изображения частями: смещения, контрольные суммы, завершение"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            LOT_IMAGE_UPLOAD_DIR=os.path.join(self.media_root, 'uploads'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        self.donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        auction = Auction.objects.create(
+            charity=organization.charity,
+            name='Аукцион',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(days=1),
+        )
+        self.lot = Lot.objects.create(
+            auction=auction, donor=self.donor, title='Картина',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+        buffer = io.BytesIO()
+        Image.effect_noise((300, 200), 64).save(buffer, 'PNG')
+        self.content = buffer.getvalue()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.donor)
+
+    def _put(self, upload_id, offset, part, checksum=None):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if checksum:
+            headers['HTTP_X_PART_SHA256'] = checksum
+        return self.client.put(
+            f'/api/lot-image-uploads/{upload_id}/', part,
+            content_type='application/octet-stream', **headers
+        )
+
+    def test_resumable_upload_creates_lot_image(self):
+        response = self.client.post('/api/lot-image-uploads/', {
+            'lot': self.lot.id, 'filename': '../photo.png',
+            'size': len(self.content), 'sha256': hashlib.sha256(self.content).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        upload_id = response.data['id']
+        middle = len(self.content) // 2
+        first, second = self.content[:middle], self.content[middle:]
+
+        self.assertEqual(self._put(upload_id, 0, first).data['received'], middle)
+        # Повтор уже принятой части и поврежденная часть не меняют принятые байты
+        conflict = self._put(upload_id, 0, first)
+        self.assertEqual((conflict.status_code, conflict.data['received']), (409, middle))
+        self.assertEqual(self._put(upload_id, middle, second, checksum='0' * 64).status_code, 400)
+        self.assertEqual(self.client.post(f'/api/lot-image-uploads/{upload_id}/complete/').status_code, 400)
+
+        # Клиент узнает смещение после обрыва и продолжает с него
+        received = self.client.get(f'/api/lot-image-uploads/{upload_id}/').data['received']
+        checksum = hashlib.sha256(self.content[received:]).hexdigest()
+        self.assertEqual(self._put(upload_id, received, self.content[received:], checksum).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(f'/api/lot-image-uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 201, response.data)
+        # Постановка задачи вариантов и удаление принятых частей
+        self.assertGreaterEqual(len(callbacks), 2)
+        image = LotImage.objects.get(lot=self.lot)
+        self.assertEqual(response.data['id'], image.id)
+        self.assertTrue(image.image.name.startswith('lot_images/photo'))
+        with image.image.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertFalse(os.listdir(os.path.join(self.media_root, 'uploads')))
+        # Повторное завершение возвращает то же изображение
+        self.assertEqual(self.client.post(f'/api/lot-image-uploads/{upload_id}/complete/').data['id'], image.id)
+
+    def test_only_lot_donor_can_upload(self):
+        self.client.force_authenticate(user=User.objects.create_user(email='other@example.com', role=User.DONOR))
+        response = self.client.post('/api/lot-image-uploads/', {
+            'lot': self.lot.id, 'filename': 'photo.png', 'size': 10, 'sha256': 'a' * 64,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lot', response.data)
+        self.assertFalse(LotImageUpload.objects.exists())
+
+
+@override_settings(LOT_IMPORT_CHUNK_SIZE=2)
+class LotImportTest(TestCase):
+    """Импорт лотов из манифеста и архива: проверка строк, запись частями"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            LOT_IMPORT_DIR=os.path.join(self.media_root, 'imports'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        self.auction = Auction.objects.create(
+            charity=self.organization.charity,
+            name='Аукцион',
+            start_time=timezone.now(),
+            end_time=timezone.now() + timedelta(days=1),
+        )
+        self.painting = Category.objects.create(name='Живопись')
+        self.books = Category.objects.create(name='Книги')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.organization)
+
+    def _archive(self, names):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name in names:
+                image = io.BytesIO()
+                Image.new('RGB', (40, 30), (10, 120, 200)).save(image, 'JPEG')
+                archive.writestr(name, image.getvalue())
+            archive.writestr('notes.txt', 'не изображение')
+        return SimpleUploadedFile('images.zip', buffer.getvalue(), content_type='application/zip')
+
+    def _import(self, manifest):
+        response = self.client.post('/api/lot-imports/', {
+            'auction': self.auction.id,
+            'manifest': SimpleUploadedFile('lots.csv', manifest.encode(), content_type='text/csv'),
+            'archive': self._archive(['photos/one.jpg', 'two.jpg']),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 202, response.data)
+        import_lots(response.data['id'])
+        return self.client.get(f"/api/lot-imports/{response.data['id']}/").data
+
+    def test_manifest_is_imported_in_chunks(self):
+        data = self._import(
+            'title,description,starting_price,categories,images,donor_email\n'
+            'Картина,Масло,1500,Живопись,photos/one.jpg;two.jpg,donor@example.com\n'
+            'Книга,,200,Книги;Живопись,,\n'
+            'Ваза,Фарфор,300.50,,two.jpg,\n'
+        )
+        self.assertEqual((data['status'], data['total'], data['processed'], data['errors']), ('completed', 3, 3, []))
+
+        lots = {lot.title: lot for lot in Lot.objects.filter(auction=self.auction)}
+        self.assertEqual(set(lots), {'Картина', 'Книга', 'Ваза'})
+        self.assertEqual(lots['Картина'].donor.email, 'donor@example.com')
+        self.assertEqual(lots['Книга'].donor, self.organization)
+        self.assertEqual({lot.status for lot in lots.values()}, {Lot.STATUS_APPROVED})
+        self.assertEqual(lots['Ваза'].starting_price, Decimal('300.50'))
+        self.assertEqual(set(lots['Книга'].categories.all()), {self.painting, self.books})
+        self.assertEqual(lots['Картина'].images.count(), 2)
+        self.assertTrue(lots['Ваза'].images.get().image.name.startswith('lot_images/two'))
+
+    def test_failed_chunk_leaves_no_image_files(self):
+        response = self.client.post('/api/lot-imports/', {
+            'auction': self.auction.id,
+            'manifest': SimpleUploadedFile(
+                'lots.csv', 'title,starting_price,images\nКартина,1500,photos/one.jpg;two.jpg\n'.encode(),
+                content_type='text/csv',
+            ),
+            'archive': self._archive(['photos/one.jpg', 'two.jpg']),
+        }, format='multipart')
+        images_dir = os.path.join(self.media_root, 'lot_images')
+
+        # Сбой после записи файлов откатывает часть, и файлы удаляются вместе с ней
+        with mock.patch('lots.imports.bump', side_effect=RuntimeError('сбой')):
+            with self.assertRaises(RuntimeError):
+                import_lots(response.data['id'])
+        self.assertFalse(Lot.objects.filter(auction=self.auction).exists())
+        self.assertEqual(os.listdir(images_dir) if os.path.isdir(images_dir) else [], [])
+
+        import_lots(response.data['id'])
+        self.assertEqual(len(os.listdir(images_dir)), 2)
+        self.assertEqual(LotImage.objects.filter(lot__auction=self.auction).count(), 2)
+
+    def test_invalid_rows_are_reported_and_nothing_is_written(self):
+        data = self._import(
+            'title,starting_price,categories,images,donor_email\n'
+            'Картина,1500,Живопись,photos/one.jpg,\n'
+            ',abc,Скульптура,missing.jpg,\n'
+            'Книга,200,,notes.txt,nobody@example.com\n'
+        )
+        self.assertEqual((data['status'], data['total'], data['processed']), ('failed', 3, 0))
+        self.assertEqual([error['row'] for error in data['errors']], [2, 3])
+        self.assertEqual(
+            set(data['errors'][0]['errors']), {'title', 'starting_price', 'categories', 'images'}
+        )
+        self.assertEqual(set(data['errors'][1]['errors']), {'donor_email'})
+        self.assertFalse(Lot.objects.filter(auction=self.auction).exists())
+
+
+class LotModerationTest(TestCase):
+    """Пакетная модерация лотов организацией с результатом по каждому лоту"""
+
+    def setUp(self):
+        self.organization = User.objects.create_user(email='org@example.com', role=User.CHARITY)
+        other = User.objects.create_user(email='other@example.com', role=User.CHARITY)
+        self.donor = User.objects.create_user(email='donor@example.com', role=User.DONOR)
+        auctions = [
+            Auction.objects.create(
+                charity=organization.charity, name=f'Аукцион {organization.email}',
+                start_time=timezone.now(), end_time=timezone.now() + timedelta(days=1),
+            )
+            for organization in (self.organization, other)
+        ]
+        self.pending = [
+            Lot.objects.create(auction=auctions[0], donor=self.donor, title=f'Лот {i}', starting_price=Decimal('10.00'))
+            for i in range(3)
+        ]
+        self.foreign = Lot.objects.create(
+            auction=auctions[1], donor=self.donor, title='Чужой', starting_price=Decimal('10.00')
+        )
+        self.approved = Lot.objects.create(
+            auction=auctions[0], donor=self.donor, title='Одобрен',
+            starting_price=Decimal('10.00'), status=Lot.STATUS_APPROVED,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.organization)
+
+    def test_batch_reports_result_per_lot(self):
+        lot_ids = [lot.id for lot in self.pending] + [self.foreign.id, self.approved.id, 999999]
+        notifications = Notification.objects.filter(user=self.donor).count()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/lots/moderate/', {
+                'lot_ids': lot_ids, 'status': Lot.STATUS_REJECTED, 'reason': 'Нет фото',
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([item['id'] for item in response.data['results']], lot_ids)
+        self.assertEqual(
+            response.data['counts'], {'rejected': 3, 'forbidden': 1, 'not_pending': 1, 'not_found': 1}
+        )
+        self.assertEqual(
+            set(Lot.objects.filter(status=Lot.STATUS_REJECTED).values_list('id', flat=True)),
+            {lot.id for lot in self.pending},
+        )
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, Lot.STATUS_PENDING)
+        created = Notification.objects.filter(user=self.donor).order_by('-id')[:3]
+        self.assertEqual(Notification.objects.filter(user=self.donor).count(), notifications + 3)
+        self.assertTrue(all('Причина: Нет фото' in notification.message for notification in created))
+
+    def test_only_organization_can_moderate(self):
+        self.client.force_authenticate(user=self.donor)
+        response = self.client.post('/api/lots/moderate/', {
+            'lot_ids': [self.pending[0].id], 'status': Lot.STATUS_APPROVED,
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.pending[0].refresh_from_db()
+        self.assertEqual(self.pending[0].status, Lot.STATUS_PENDING)
@@ -0,0 +1,173 @@
+"""
+Загрузка изображений лотов частями с возобновлением после обрыва.
+
+1. POST /api/lot-image-uploads/ {lot, filename, size, sha256} создает загрузку.
+2. PUT /api/lot-image-uploads/<id>/ передает часть: тело запроса — байты части,
+   заголовок Upload-Offset — ее смещение, необязательный X-Part-SHA256 —
+   контрольная сумма части. Ответ содержит received — число принятых байт.
+3. После обрыва GET /api/lot-image-uploads/<id>/ возвращает received,
+   и клиент продолжает с этого смещения.
+4. POST /api/lot-image-uploads/<id>/complete/ проверяет размер и sha256 файла
+   и в одной транзакции создает LotImage, после чего создаются его варианты.
+
+Тело части читается из потока запроса блоками по BLOCK_SIZE во временный файл,
+поэтому память процесса не зависит от размера части. К файлу загрузки часть
+дописывается под блокировкой строки загрузки и только если ее смещение равно
+числу уже принятых байт: повтор или параллельная отправка той же части
+получают 409 с актуальным received.
+"""
+import datetime
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import LotImage, LotImageUpload
+
+BLOCK_SIZE = 64 * 1024
+
+
+class OffsetConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_code = 'offset_conflict'
+    default_detail = "Смещение части не совпадает с числом принятых байт"
+
+    def __init__(self, received):
+        super().__init__()
+        # received остается числом: клиент продолжает загрузку с этого смещения
+        self.detail = {'detail': self.detail, 'received': received}
+
+
+def part_path(upload):
+    """Файл с уже принятыми байтами загрузки"""
+    return os.path.join(settings.LOT_IMAGE_UPLOAD_DIR, f"{upload.pk}.part")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_part(upload, stream, offset, length, part_sha256=None):
+    """Принимает часть длиной length байт со смещением offset из потока stream"""
+    if upload.status != LotImageUpload.STATUS_PENDING:
+        raise ValidationError("Загрузка уже завершена")
+    if offset != upload.received:
+        raise OffsetConflict(upload.received)
+    if length <= 0 or length > settings.LOT_IMAGE_UPLOAD_PART_SIZE:
+        raise ValidationError(f"Размер части должен быть от 1 до {settings.LOT_IMAGE_UPLOAD_PART_SIZE} байт")
+    if offset + length > upload.size:
+        raise ValidationError("Часть выходит за объявленный размер файла")
+
+    os.makedirs(settings.LOT_IMAGE_UPLOAD_DIR, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=settings.LOT_IMAGE_UPLOAD_DIR, prefix=f"{upload.pk}.", suffix='.tmp')
+    try:
+        digest = hashlib.sha256()
+        written = 0
+        with os.fdopen(handle, 'wb') as target:
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                target.write(block)
+                digest.update(block)
+                written += len(block)
+        if written != length:
+            raise ValidationError(f"Часть получена не полностью: {written} из {length} байт")
+        if part_sha256 and digest.hexdigest() != part_sha256.lower():
+            raise ValidationError("Контрольная сумма части не совпадает")
+
+        with transaction.atomic():
+            upload = LotImageUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.status != LotImageUpload.STATUS_PENDING:
+                raise ValidationError("Загрузка уже завершена")
+            if upload.received != offset:
+                raise OffsetConflict(upload.received)
+            path = part_path(upload)
+            # Байты после offset мог оставить прерванный процесс: они перезаписываются
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as target, open(temporary, 'rb') as source:
+                target.seek(offset)
+                target.truncate()
+                for block in iter(lambda: source.read(BLOCK_SIZE), b''):
+                    target.write(block)
+                target.flush()
+                os.fsync(target.fileno())
+            upload.received = offset + length
+            upload.save(update_fields=['received', 'updated_at'])
+        return upload
+    finally:
+        _remove(temporary)
+
+
+def complete(upload):
+    """
+    Проверяет полученный файл и создает LotImage. Повторный вызов для
+    завершенной загрузки возвращает уже созданное изображение.
+    """
+    with transaction.atomic():
+        upload = LotImageUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status == LotImageUpload.STATUS_COMPLETED:
+            return upload.image
+        if upload.received != upload.size:
+            raise ValidationError(f"Получено {upload.received} из {upload.size} байт")
+        path = part_path(upload)
+        if _file_sha256(path) != upload.sha256:
+            raise ValidationError("Контрольная сумма файла не совпадает, загрузку нужно начать заново")
+
+        with open(path, 'rb') as source:
+            try:
+                Image.open(source).verify()
+            except Exception:
+                raise ValidationError("Файл не является изображением")
+            source.seek(0)
+            image = LotImage(lot_id=upload.lot_id)
+            image.image.save(upload.filename, File(source), save=False)
+        try:
+            # Варианты изображения создает задача, поставленная LotImage.save после фиксации
+            image.save()
+            upload.status = LotImageUpload.STATUS_COMPLETED
+            upload.image = image
+            upload.save(update_fields=['status', 'image', 'updated_at'])
+        except Exception:
+            image.image.delete(save=False)
+            raise
+        transaction.on_commit(lambda: _remove(path))
+    return image
+
+
+def abort(upload):
+    """Отменяет загрузку и удаляет принятые байты"""
+    path = part_path(upload)
+    upload.delete()
+    transaction.on_commit(lambda: _remove(path))
+
+
+def prune(now=None):
+    """Удаляет загрузки, которые не менялись дольше LOT_IMAGE_UPLOAD_EXPIRY"""
+    cutoff = (now or timezone.now()) - datetime.timedelta(seconds=settings.LOT_IMAGE_UPLOAD_EXPIRY)
+    expired = list(LotImageUpload.objects.filter(updated_at__lt=cutoff))
+    for upload in expired:
+        try:
+            _remove(part_path(upload))
+        except OSError as e:
+            logging.error(f"Не удалось удалить файл загрузки {upload.pk}: {e}")
+    LotImageUpload.objects.filter(pk__in=[upload.pk for upload in expired]).delete()
+    return len(expired)
@@ -16,4 +16,5 @@ urlpatterns = [
     path('<int:pk>/status/', views.LotStatusUpdateView.as_view(), name='lot-status-update'),
     path('<int:pk>/approve/', views.LotApproveView.as_view(), name='lot-approve'),
     path('<int:pk>/reject/', views.LotRejectView.as_view(), name='lot-reject'),
+    path('<int:pk>/stream/', views.lot_stream, name='lot-stream'),
 ]
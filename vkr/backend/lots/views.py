@@ -1,29 +1,43 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.http import Http404
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count
 from rest_framework.generics import (
     CreateAPIView, ListAPIView, RetrieveAPIView, 
     UpdateAPIView, DestroyAPIView, GenericAPIView
 )
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 import django_filters
+from django.db import transaction
 from django.db.models import Q
-from drf_yasg.utils import swagger_auto_schema
+from drf_yasg.utils import swagger_auto_schema, no_body
 from drf_yasg import openapi
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 
-from .models import Lot, Category, LotCategory, LotImage, DeliveryDetail
+from .models import Lot, Category, LotCategory, LotImage, LotImageUpload, LotImport, DeliveryDetail, LotFacetCount
+from .facets import count_facets, format_facets
+from . import feeds, imports, leaderboard, moderation, uploads
 from bids.models import Transaction
 from users.models import Notification
 from .serializers import (
     LotSerializer, CategorySerializer, LotCategorySerializer,
-    LotImageSerializer, DeliveryDetailSerializer
+    LotImageSerializer, LotImageUploadSerializer, LotImportSerializer, LotModerationSerializer,
+    DeliveryDetailSerializer
 )
 from users.permissions import IsOrganization, IsDonor, IsOwner, IsAuctionOwner
+from core.streams import lot_channel, event_stream_response, stream_error, stream_user
+from core.views import EagerLoadingMixin
+from core.search import FullTextSearchFilter
+from core.pagination import ListKeysetPagination
+from core.cache import cache_response
 
 
 class LotFilter(django_filters.FilterSet):
@@ -35,10 +49,11 @@ class LotFilter(django_filters.FilterSet):
     min_price = django_filters.NumberFilter(field_name='starting_price', lookup_expr='gte')
     max_price = django_filters.NumberFilter(field_name='starting_price', lookup_expr='lte')
     status = django_filters.ChoiceFilter(choices=Lot.STATUS_CHOICES)
+    price_bucket = django_filters.NumberFilter(field_name='price_bucket')
     
     class Meta:
         model = Lot
-        fields = ['auction', 'category', 'min_price', 'max_price', 'status']
+        fields = ['auction', 'category', 'min_price', 'max_price', 'status', 'price_bucket']
 
 
 class LotCreateView(CreateAPIView):
@@ -64,16 +79,15 @@ class LotCreateView(CreateAPIView):
         serializer.save(donor=self.request.user, status=Lot.STATUS_PENDING)
 
 
-class LotListView(ListAPIView):
+class LotListView(EagerLoadingMixin, ListAPIView):
     """
     Представление для получения списка всех лотов.
     Доступно для всех пользователей. Можно фильтровать по аукциону.
     """
     queryset = Lot.objects.all()
     serializer_class = LotSerializer
-    filter_backends = [django_filters.rest_framework.DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [django_filters.rest_framework.DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_class = LotFilter
-    search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'starting_price']
     
     @swagger_auto_schema(
@@ -119,11 +133,12 @@ class LotListView(ListAPIView):
         ],
         responses={200: LotSerializer(many=True)}
     )
+    @cache_response('lots', timeout='RESPONSE_CACHE_BIDS_TIMEOUT')
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
 
-class LotDetailView(RetrieveAPIView):
+class LotDetailView(EagerLoadingMixin, RetrieveAPIView):
     """
     Представление для получения деталей конкретного лота.
     Доступно для всех пользователей.
@@ -136,6 +151,7 @@ class LotDetailView(RetrieveAPIView):
         operation_description="Возвращает детальную информацию о конкретном лоте по его ID.",
         responses={200: LotSerializer, 404: "Лот не найден"}
     )
+    @cache_response('lot:{pk}')
     def get(self, request, *args, **kwargs):
         lot = self.get_object()
         
@@ -350,11 +366,10 @@ class LotRejectView(GenericAPIView):
         return Response({'detail': 'Лот был отклонён и удалён.'}, status=200)
 
 
-class LotViewSet(viewsets.ModelViewSet):
+class LotViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Lot.objects.all()
     serializer_class = LotSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'description']
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
     ordering_fields = ['created_at', 'starting_price']
     
     def get_permissions(self):
@@ -368,6 +383,8 @@ class LotViewSet(viewsets.ModelViewSet):
             permission_classes = [IsDonor]
         elif self.action in ['update', 'partial_update', 'destroy']:
             permission_classes = [IsDonor, IsOwner]
+        elif self.action == 'moderate':
+            permission_classes = [IsOrganization]
         else:
             permission_classes = [permissions.AllowAny]
         
@@ -377,6 +394,14 @@ class LotViewSet(viewsets.ModelViewSet):
         # Автоматически связываем лот с текущим пользователем как донором
         serializer.save(donor=self.request.user, status=Lot.STATUS_PENDING)
     
+    @cache_response('lots', timeout='RESPONSE_CACHE_BIDS_TIMEOUT')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response('lot:{pk}')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @swagger_auto_schema(
         operation_summary="Получить лоты по категории",
         operation_description="Возвращает список лотов, относящихся к указанной категории.",
@@ -397,42 +422,116 @@ class LotViewSet(viewsets.ModelViewSet):
         category_id = request.query_params.get('category_id', None)
         if category_id:
             lots = Lot.objects.filter(categories__id=category_id)
+            page = self.paginate_queryset(lots)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
             serializer = self.get_serializer(lots, many=True)
             return Response(serializer.data)
         return Response({"error": "Category ID is required"}, status=status.HTTP_400_BAD_REQUEST)
 
+    @swagger_auto_schema(
+        operation_summary="Поиск лотов с фасетами",
+        operation_description=(
+            "Возвращает страницу лотов с фильтрами LotFilter и ?search=, а в поле facets — "
+            "число найденных лотов по категориям, статусам и ценовым диапазонам. "
+            "Без фильтров и поиска (или только с фильтром status) числа берутся из счетчиков."
+        ),
+        manual_parameters=[
+            openapi.Parameter('auction', openapi.IN_QUERY, description="ID аукциона", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('category', openapi.IN_QUERY, description="ID категории", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('min_price', openapi.IN_QUERY, description="Минимальная стартовая цена", type=openapi.TYPE_NUMBER),
+            openapi.Parameter('max_price', openapi.IN_QUERY, description="Максимальная стартовая цена", type=openapi.TYPE_NUMBER),
+            openapi.Parameter(
+                'status', openapi.IN_QUERY, description="Статус лота",
+                type=openapi.TYPE_STRING, enum=[value for value, _ in Lot.STATUS_CHOICES]
+            ),
+            openapi.Parameter('price_bucket', openapi.IN_QUERY, description="Номер ценового диапазона из facets.price", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('search', openapi.IN_QUERY, description="Поиск по названию и описанию", type=openapi.TYPE_STRING),
+        ],
+        responses={200: LotSerializer(many=True), 400: "Неверные значения фильтров"}
+    )
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        filterset = LotFilter(request.query_params, queryset=self.filter_queryset(self.get_queryset()), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        lots = filterset.qs
+        
+        filters_used = {name for name, value in filterset.form.cleaned_data.items() if value not in (None, '')}
+        if request.query_params.get('search', '').strip():
+            filters_used.add('search')
+        if filters_used <= {'status'}:
+            # Каталог без фильтров: числа из счетчиков, лоты не пересчитываются
+            status_filter = filterset.form.cleaned_data.get('status')
+            totals = LotFacetCount.totals([status_filter] if status_filter else None)
+        else:
+            totals = count_facets(lots)
+        
+        page = self.paginate_queryset(lots)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['facets'] = format_facets(totals)
+        return response
+
     @swagger_auto_schema(
         operation_summary="Получить популярные лоты",
-        operation_description="Возвращает список из 10 лотов с наибольшим количеством ставок.",
-        responses={200: LotSerializer(many=True)}
+        operation_description=(
+            "Возвращает активные лоты с наибольшим количеством ставок: за все время, "
+            "за последний час или день, во всем каталоге, в аукционе или в категории."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'window', openapi.IN_QUERY, description="Период: all (по умолчанию), day, hour",
+                type=openapi.TYPE_STRING, enum=[leaderboard.WINDOW_ALL, *leaderboard.WINDOWS]
+            ),
+            openapi.Parameter('auction', openapi.IN_QUERY, description="ID аукциона", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('category', openapi.IN_QUERY, description="ID категории", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Число лотов (до 50), по умолчанию 10", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: LotSerializer(many=True), 400: "Неверные параметры"}
     )
     @action(detail=False, methods=['get'])
     def popular(self, request):
-        popular_lots = Lot.objects.annotate(
-            bid_count=Count('bids')
-        ).order_by('-bid_count')[:10]
-        serializer = self.get_serializer(popular_lots, many=True)
+        window = request.query_params.get('window', leaderboard.WINDOW_ALL)
+        if window != leaderboard.WINDOW_ALL and window not in leaderboard.WINDOWS:
+            return Response({"error": "Неизвестный период"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            params = {
+                name: int(request.query_params[name])
+                for name in ('auction', 'category', 'limit') if request.query_params.get(name)
+            }
+        except ValueError:
+            return Response({"error": "Параметры auction, category и limit должны быть числами"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ids = leaderboard.top_lot_ids(
+            window,
+            auction_id=params.get('auction'),
+            category_id=params.get('category'),
+            limit=min(max(params.get('limit', 10), 1), 50),
+        )
+        lots = {lot.id: lot for lot in self.eager_load(Lot.objects.filter(pk__in=ids))}
+        serializer = self.get_serializer([lots[lot_id] for lot_id in ids if lot_id in lots], many=True)
         return Response(serializer.data)
 
     @swagger_auto_schema(
         operation_summary="Получить лоты, завершающиеся в ближайшее время",
-        operation_description="Возвращает список лотов, аукционы которых завершаются в ближайшие 3 дня.",
+        operation_description=(
+            "Возвращает одобренные лоты активных аукционов, которые завершаются в ближайшие 3 дня, "
+            "в порядке завершения. Ответ можно кэшировать несколько секунд."
+        ),
         responses={200: LotSerializer(many=True)}
     )
     @action(detail=False, methods=['get'])
     def ending_soon(self, request):
-        from django.utils import timezone
-        import datetime
-        
-        today = timezone.now()
-        end_date = today + datetime.timedelta(days=3)
-        
-        ending_soon_lots = Lot.objects.filter(
-            auction__end_time__range=[today, end_date],
-            auction__status='active'
-        )
-        serializer = self.get_serializer(ending_soon_lots, many=True)
-        return Response(serializer.data)
+        # Страница берется из посчитанной ленты, лоты загружаются по id
+        paginator = ListKeysetPagination()
+        page = paginator.paginate_list(feeds.ending_soon(), request)
+        lots = {lot.id: lot for lot in self.eager_load(Lot.objects.filter(pk__in=[lot_id for _, lot_id in page]))}
+        serializer = self.get_serializer([lots[lot_id] for _, lot_id in page if lot_id in lots], many=True)
+        response = paginator.get_paginated_response(serializer.data)
+        patch_cache_control(response, public=True, max_age=settings.ENDING_SOON_MAX_AGE)
+        return response
     
     @swagger_auto_schema(
         operation_summary="Обновить статус лота",
@@ -485,6 +584,32 @@ class LotViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(lot)
         return Response(serializer.data)
 
+    @swagger_auto_schema(
+        operation_summary="Пакетная модерация лотов",
+        operation_description=(
+            "Одобряет или отклоняет сразу несколько лотов на рассмотрении. "
+            "Доступно организации-владельцу аукционов этих лотов. Для каждого лота "
+            "возвращается результат: approved, rejected, not_found, forbidden или not_pending; "
+            "донорам измененных лотов отправляются уведомления."
+        ),
+        request_body=LotModerationSerializer,
+        responses={200: "Результаты по лотам", 400: "Неверный запрос", 403: "Недостаточно прав"}
+    )
+    @action(detail=False, methods=['post'])
+    def moderate(self, request):
+        serializer = LotModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        results = moderation.moderate(request.user, data['lot_ids'], data['status'], data['reason'])
+        
+        counts = {}
+        for result in results.values():
+            counts[result] = counts.get(result, 0) + 1
+        return Response({
+            'results': [{'id': lot_id, 'result': result} for lot_id, result in results.items()],
+            'counts': counts,
+        })
+
     @swagger_auto_schema(
         operation_summary="Получить лоты по аукциону",
         operation_description="Возвращает список лотов, принадлежащих указанному аукциону.",
@@ -501,6 +626,7 @@ class LotViewSet(viewsets.ModelViewSet):
         }
     )
     @action(detail=False, url_path=r'auction/(?P<auction_id>\d+)', methods=['get'])
+    @cache_response('auction:{auction_id}')
     def by_auction(self, request, auction_id=None):
         """
         Получение списка лотов для конкретного аукциона
@@ -535,6 +661,10 @@ class LotViewSet(viewsets.ModelViewSet):
                 # Неавторизованные пользователи видят только одобренные и проданные лоты
                 lots = lots_query.filter(status__in=['approved', 'sold'])
             
+            page = self.paginate_queryset(lots)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
             serializer = self.get_serializer(lots, many=True)
             return Response(serializer.data)
             
@@ -545,6 +675,8 @@ class LotViewSet(viewsets.ModelViewSet):
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    # Небольшой справочник, отдается целиком
+    pagination_class = None
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
     
@@ -553,39 +685,21 @@ class CategoryViewSet(viewsets.ModelViewSet):
         operation_description="Возвращает список всех категорий лотов.",
         responses={200: CategorySerializer(many=True)}
     )
+    @cache_response('categories')
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        
-        # Фильтруем в зависимости от роли пользователя
-        if request.user.is_authenticated:
-            if request.user.role == 'donor':
-                queryset = queryset.filter(
-                    Q(status__in=['approved', 'sold']) | 
-                    Q(status='pending', donor=request.user)
-                )
-            elif request.user.role == 'charity' and hasattr(request.user, 'charity'):
-                queryset = queryset.filter(
-                    Q(status__in=['approved', 'sold']) | 
-                    Q(auction__charity=request.user.charity)
-                )
-            else:
-                queryset = queryset.filter(status__in=['approved', 'sold'])
-        else:
-            queryset = queryset.filter(status__in=['approved', 'sold'])
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return super().list(request, *args, **kwargs)
     
     @swagger_auto_schema(
         operation_summary="Получить категорию",
         operation_description="Возвращает информацию о категории по ее ID.",
         responses={200: CategorySerializer, 404: "Категория не найдена"}
     )
+    @cache_response('categories')
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
 
-class LotCategoryViewSet(viewsets.ModelViewSet):
+class LotCategoryViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = LotCategory.objects.all()
     serializer_class = LotCategorySerializer
 
@@ -598,6 +712,148 @@ class LotImageViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete', 'options']
 
 
+class LotImageUploadViewSet(viewsets.GenericViewSet):
+    """
+    Загрузка изображения лота частями с возобновлением (протокол в lots/uploads.py).
+    Доступна донору лота, каждый пользователь видит только свои загрузки.
+    """
+    serializer_class = LotImageUploadSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return LotImageUpload.objects.filter(user=self.request.user)
+    
+    @swagger_auto_schema(
+        operation_summary="Начать загрузку изображения",
+        operation_description="Создает загрузку: лот, имя файла, размер в байтах и SHA-256 всего файла.",
+        request_body=LotImageUploadSerializer,
+        responses={201: LotImageUploadSerializer, 400: "Неверные параметры загрузки"}
+    )
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @swagger_auto_schema(
+        operation_summary="Состояние загрузки",
+        operation_description="Возвращает received — смещение, с которого нужно продолжить загрузку после обрыва.",
+        responses={200: LotImageUploadSerializer, 404: "Загрузка не найдена"}
+    )
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+    
+    @swagger_auto_schema(
+        operation_summary="Передать часть файла",
+        operation_description=(
+            "Тело запроса — байты части (application/octet-stream), не больше "
+            "LOT_IMAGE_UPLOAD_PART_SIZE. Часть принимается, только если Upload-Offset "
+            "равен received, иначе ответ 409 с актуальным received."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'Upload-Offset', openapi.IN_HEADER,
+                description="Смещение части от начала файла",
+                type=openapi.TYPE_INTEGER, required=True
+            ),
+            openapi.Parameter(
+                'X-Part-SHA256', openapi.IN_HEADER,
+                description="SHA-256 части в шестнадцатеричном виде",
+                type=openapi.TYPE_STRING
+            ),
+        ],
+        responses={
+            200: LotImageUploadSerializer,
+            400: "Часть повреждена или выходит за размер файла",
+            409: "Смещение не совпадает с числом принятых байт"
+        }
+    )
+    def update(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            raise ValidationError("Нужны заголовки Upload-Offset и Content-Length")
+        # Тело читается из потока частями, без разбора парсерами DRF
+        stream = request.stream if length else None
+        upload = uploads.write_part(upload, stream, offset, length, request.headers.get('X-Part-SHA256'))
+        return Response(self.get_serializer(upload).data)
+    
+    @swagger_auto_schema(
+        operation_summary="Отменить загрузку",
+        responses={204: "Загрузка отменена", 404: "Загрузка не найдена"}
+    )
+    def destroy(self, request, pk=None):
+        uploads.abort(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @swagger_auto_schema(
+        operation_summary="Завершить загрузку",
+        operation_description=(
+            "Проверяет размер и SHA-256 файла и создает изображение лота. "
+            "Повторный вызов возвращает то же изображение."
+        ),
+        request_body=no_body,
+        responses={201: LotImageSerializer, 400: "Файл получен не полностью или поврежден"}
+    )
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        image = uploads.complete(self.get_object())
+        return Response(
+            LotImageSerializer(image, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+class LotImportViewSet(viewsets.GenericViewSet):
+    """
+    Импорт лотов аукциона из манифеста CSV/JSON и ZIP-архива изображений
+    (формат в lots/imports.py). Импорт выполняется задачей Celery,
+    состояние и ошибки строк возвращает GET.
+    """
+    serializer_class = LotImportSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def get_queryset(self):
+        return LotImport.objects.filter(user=self.request.user).order_by('-created_at')
+    
+    @swagger_auto_schema(
+        operation_summary="Импортировать лоты",
+        operation_description=(
+            "Принимает манифест (manifest: .csv, .json или .jsonl) и архив изображений "
+            "(archive: .zip) и ставит импорт в очередь. Донор импортирует свои лоты "
+            "на рассмотрение, организация — одобренные лоты в свой аукцион."
+        ),
+        request_body=LotImportSerializer,
+        responses={202: LotImportSerializer, 400: "Неверный аукцион или файлы"}
+    )
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lot_import = serializer.save(user=request.user)
+        transaction.on_commit(lambda: imports.schedule_import(lot_import.pk))
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+    
+    @swagger_auto_schema(
+        operation_summary="Мои импорты лотов",
+        responses={200: LotImportSerializer(many=True)}
+    )
+    def list(self, request):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @swagger_auto_schema(
+        operation_summary="Состояние импорта",
+        operation_description="Статус, число записанных строк из total и ошибки строк манифеста.",
+        responses={200: LotImportSerializer, 404: "Импорт не найден"}
+    )
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+
 class DeliveryDetailViewSet(viewsets.ModelViewSet):
     queryset = DeliveryDetail.objects.all()
     serializer_class = DeliveryDetailSerializer
@@ -735,3 +991,22 @@ class DeliveryDetailViewSet(viewsets.ModelViewSet):
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+@require_GET
+async def lot_stream(request, pk):
+    """
+    Поток событий лота в формате Server-Sent Events: bid_placed, outbid, lot_sold.
+    Заменяет периодический опрос BidViewSet.by_lot и, как он, требует
+    аутентификации. Лот на рассмотрении виден только его участникам,
+    за лотом платного аукциона следят только с билетом.
+    """
+    user = await stream_user(request)
+    if user is None:
+        return stream_error(401, "Учетные данные не были предоставлены.")
+    lot = await Lot.objects.select_related('auction__charity').filter(pk=pk).afirst()
+    if lot is None or not lot.is_visible_to(user):
+        raise Http404("Лот не найден")
+    if not await sync_to_async(lot.auction.has_access)(user):
+        return stream_error(403, "Для доступа к платному аукциону нужен билет")
+    return event_stream_response([lot_channel(pk)])
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_opening_snapshots(apps, schema_editor):
+    # Текущие балансы становятся начальными снимками, от которых считается журнал
+    Balance = apps.get_model('users', 'Balance')
+    BalanceSnapshot = apps.get_model('users', 'BalanceSnapshot')
+    BalanceSnapshot.objects.bulk_create(
+        [
+            BalanceSnapshot(user_id=balance.user_id, amount=balance.amount, last_entry_id=0)
+            for balance in Balance.objects.all().iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lots', '0003_lot_bid_state'),
+        ('users', '0002_subscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('last_entry_id', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_entry_id'], name='users_balan_user_id_1befaa_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('top_up', 'Пополнение'), ('hold', 'Удержание под ставку'), ('release', 'Возврат перебитой ставки'), ('capture', 'Списание выигравшей ставки'), ('refund', 'Возврат средств'), ('payment', 'Оплата')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='lots.lot')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='users_ledge_user_id_26a46f_idx')],
+            },
+        ),
+        migrations.RunPython(create_opening_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-sent_at', '-id'], name='users_notif_user_id_116c45_idx'),
+        ),
+    ]
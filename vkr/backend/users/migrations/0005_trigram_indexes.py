@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:52
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_notification_pagination_index'),
+    ]
+
+    operations = [
+        # Расширение нужно и индексам аукционов и лотов, которые зависят от этой миграции
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='charity',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='charity_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
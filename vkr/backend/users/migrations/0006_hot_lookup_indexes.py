@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-sent_at'], name='notification_unread_idx'),
+        ),
+    ]
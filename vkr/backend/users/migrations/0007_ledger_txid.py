@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:47
+
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lots', '0012_hot_lookup_indexes'),
+        ('users', '0006_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='balancesnapshot',
+            name='txid_horizon',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='txid',
+            field=models.BigIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='txid',
+            field=models.BigIntegerField(db_default=users.models.CurrentTransactionId(), editable=False),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:47
+
+from django.db import migrations, models
+from django.db.models import Case, F, Sum, When
+
+# Знаки операций журнала на момент миграции
+BALANCE_SIGN = {
+    'top_up': 1,
+    'release': 1,
+    'refund': 1,
+    'hold': -1,
+    'payment': -1,
+    'capture': 0,
+}
+
+
+def roll_snapshots_forward(apps, schema_editor):
+    # Записи, сделанные до миграции, получают txid = 0. Снимки переносятся на
+    # границу txid_horizon = 1: к последнему снимку пользователя прибавляются записи
+    # после его last_entry_id, и хвост журнала начинается с новых транзакций
+    BalanceSnapshot = apps.get_model('users', 'BalanceSnapshot')
+    LedgerEntry = apps.get_model('users', 'LedgerEntry')
+    signed = Case(
+        *[When(kind=kind, then=F('amount') * sign) for kind, sign in BALANCE_SIGN.items()],
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+    latest = {
+        snapshot.user_id: snapshot
+        for snapshot in BalanceSnapshot.objects.order_by('user_id', '-last_entry_id').distinct('user_id')
+    }
+    user_ids = set(latest) | set(LedgerEntry.objects.values_list('user_id', flat=True).distinct())
+    snapshots = []
+    for user_id in user_ids:
+        snapshot = latest.get(user_id)
+        entries = LedgerEntry.objects.filter(user_id=user_id)
+        if snapshot:
+            entries = entries.filter(id__gt=snapshot.last_entry_id)
+        delta = entries.aggregate(total=Sum(signed))['total'] or 0
+        snapshots.append(BalanceSnapshot(
+            user_id=user_id, amount=(snapshot.amount if snapshot else 0) + delta, last_entry_id=0, txid_horizon=1,
+        ))
+    BalanceSnapshot.objects.all().delete()
+    BalanceSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    # Только перенос данных: новые строки снимков оставляют отложенные проверки
+    # внешних ключей, и ALTER TABLE той же таблицы в этой транзакции не пройдет
+
+    dependencies = [
+        ('users', '0007_ledger_txid'),
+    ]
+
+    operations = [
+        migrations.RunPython(roll_snapshots_forward, migrations.RunPython.noop),
+    ]
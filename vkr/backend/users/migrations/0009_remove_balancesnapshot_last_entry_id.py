@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_roll_balance_snapshots'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='balancesnapshot',
+            name='users_balan_user_id_1befaa_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='ledgerentry',
+            name='users_ledge_user_id_26a46f_idx',
+        ),
+        migrations.RemoveField(
+            model_name='balancesnapshot',
+            name='last_entry_id',
+        ),
+        migrations.AddIndex(
+            model_name='balancesnapshot',
+            index=models.Index(fields=['user', '-txid_horizon'], name='users_balan_user_id_4bf27e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['user', 'txid'], name='users_ledge_user_id_d9c939_idx'),
+        ),
+    ]
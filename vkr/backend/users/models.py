@@ -1,4 +1,8 @@
-from django.db import models
+from decimal import Decimal
+from django.contrib.postgres.indexes import GinIndex
+from django.db import connection, models, transaction
+from django.db.models import Case, F, Func, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils import timezone
 from django.db.models.signals import post_save
@@ -76,6 +80,10 @@ class Charity(models.Model):
     
     class Meta:
         verbose_name_plural = "Charities"
+        indexes = [
+            # Подсказки при наборе (core.suggest)
+            GinIndex(fields=['name'], name='charity_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
 
 class Notification(models.Model):
@@ -85,6 +93,15 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     sent_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-sent_at', '-id']),
+            # Счетчик и список непрочитанных: в индекс попадают только они
+            models.Index(
+                fields=['user', '-sent_at'], condition=models.Q(is_read=False), name='notification_unread_idx'
+            ),
+        ]
+    
     def __str__(self):
         return f"{self.subject} for {self.user.email}"
 
@@ -97,28 +114,210 @@ class Balance(models.Model):
     def __str__(self):
         return f"Баланс {self.user.email}: {self.amount} руб."
     
-    def top_up(self, amount):
-        """Пополнение баланса"""
+    @classmethod
+    def credit(cls, user_id, amount, kind, lot=None):
+        """
+        Зачисление средств одним UPDATE без чтения строки баланса.
+        Каждое изменение фиксируется записью в журнале операций.
+        """
         if amount <= 0:
             raise ValueError("Сумма пополнения должна быть положительной")
-        self.amount += amount
-        self.save()
-        return self.amount
+        with transaction.atomic():
+            updated = cls.objects.filter(user_id=user_id).update(
+                amount=F('amount') + amount, updated_at=timezone.now()
+            )
+            if not updated:
+                raise ValueError("Баланс пользователя не найден")
+            LedgerEntry.objects.create(user_id=user_id, kind=kind, amount=amount, lot=lot)
     
-    def withdraw(self, amount):
-        """Списание средств с баланса"""
+    @classmethod
+    def debit(cls, user_id, amount, kind, lot=None):
+        """
+        Списание средств одним UPDATE с условием amount >= суммы списания,
+        поэтому баланс не может уйти в минус даже при параллельных списаниях.
+        """
         if amount <= 0:
             raise ValueError("Сумма списания должна быть положительной")
-        if self.amount < amount:
-            raise ValueError("Недостаточно средств на счете")
-        self.amount -= amount
-        self.save()
+        with transaction.atomic():
+            updated = cls.objects.filter(user_id=user_id, amount__gte=amount).update(
+                amount=F('amount') - amount, updated_at=timezone.now()
+            )
+            if not updated:
+                raise ValueError("Недостаточно средств на счете")
+            LedgerEntry.objects.create(user_id=user_id, kind=kind, amount=amount, lot=lot)
+    
+    @classmethod
+    def credit_many(cls, entries):
+        """
+        Групповое зачисление по списку несохраненных записей журнала:
+        один UPDATE по всем пользователям и одна вставка записей.
+        """
+        totals = {}
+        for entry in entries:
+            if entry.amount <= 0:
+                raise ValueError("Сумма пополнения должна быть положительной")
+            totals[entry.user_id] = totals.get(entry.user_id, 0) + entry.amount
+        if not totals:
+            return
+        with transaction.atomic():
+            cls.objects.filter(user_id__in=totals).update(
+                amount=F('amount') + Case(
+                    *[When(user_id=user_id, then=Value(total)) for user_id, total in totals.items()],
+                    output_field=models.DecimalField(max_digits=10, decimal_places=2),
+                ),
+                updated_at=timezone.now(),
+            )
+            LedgerEntry.objects.bulk_create(entries)
+    
+    def top_up(self, amount, kind=None, lot=None):
+        """Пополнение баланса"""
+        Balance.credit(self.user_id, amount, kind or LedgerEntry.KIND_TOP_UP, lot)
+        self.refresh_from_db(fields=['amount', 'updated_at'])
+        return self.amount
+    
+    def withdraw(self, amount, kind=None, lot=None):
+        """Списание средств с баланса"""
+        Balance.debit(self.user_id, amount, kind or LedgerEntry.KIND_PAYMENT, lot)
+        self.refresh_from_db(fields=['amount', 'updated_at'])
         return self.amount
     
     def check_funds(self, amount):
         """Проверка достаточности средств"""
         return self.amount >= amount
+
+
+class CurrentTransactionId(Func):
+    """Номер текущей транзакции Postgres (64-битный, не переполняется)"""
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+class LedgerEntry(models.Model):
+    """
+    Запись журнала операций по балансу. Журнал только дополняется:
+    записи не изменяются и не удаляются.
     
+    txid — номер транзакции, записавшей запись. По нему снимки отделяют
+    записи завершенных транзакций: id выдается последовательностью до
+    фиксации, и запись с меньшим id может стать видимой позже записи
+    с большим.
+    """
+    KIND_TOP_UP = 'top_up'
+    KIND_HOLD = 'hold'
+    KIND_RELEASE = 'release'
+    KIND_CAPTURE = 'capture'
+    KIND_REFUND = 'refund'
+    KIND_PAYMENT = 'payment'
+    
+    KIND_CHOICES = [
+        (KIND_TOP_UP, 'Пополнение'),
+        (KIND_HOLD, 'Удержание под ставку'),
+        (KIND_RELEASE, 'Возврат перебитой ставки'),
+        (KIND_CAPTURE, 'Списание выигравшей ставки'),
+        (KIND_REFUND, 'Возврат средств'),
+        (KIND_PAYMENT, 'Оплата'),
+    ]
+    
+    # Знак влияния операции на доступный баланс. Capture не меняет баланс:
+    # средства уже удержаны ставкой и лишь окончательно списываются.
+    BALANCE_SIGN = {
+        KIND_TOP_UP: 1,
+        KIND_RELEASE: 1,
+        KIND_REFUND: 1,
+        KIND_HOLD: -1,
+        KIND_PAYMENT: -1,
+        KIND_CAPTURE: 0,
+    }
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_entries')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    lot = models.ForeignKey('lots.Lot', on_delete=models.SET_NULL, related_name='ledger_entries', null=True, blank=True)
+    txid = models.BigIntegerField(db_default=CurrentTransactionId(), editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'txid']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.amount} руб. для {self.user_id}"
+    
+    @classmethod
+    def signed_amount(cls):
+        """Выражение для суммирования записей с учетом знака операции"""
+        return Case(
+            *[When(kind=kind, then=F('amount') * sign) for kind, sign in cls.BALANCE_SIGN.items()],
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+    
+    @classmethod
+    def balance_for(cls, user_id):
+        """
+        Баланс пользователя по журналу: последний снимок плюс записи после него.
+        Полный журнал при этом не просматривается.
+        """
+        snapshot = BalanceSnapshot.objects.filter(user_id=user_id).order_by('-txid_horizon').first()
+        entries = cls.objects.filter(user_id=user_id)
+        base = Decimal('0.00')
+        if snapshot:
+            entries = entries.filter(txid__gte=snapshot.txid_horizon)
+            base = snapshot.amount
+        delta = entries.aggregate(total=Sum(cls.signed_amount()))['total'] or 0
+        return base + delta
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Снимок баланса пользователя по журналу операций: записи транзакций
+    с номером меньше txid_horizon. Все такие транзакции к моменту снимка завершены,
+    поэтому новых записей ниже этой границы не появится.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_snapshots')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    txid_horizon = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-txid_horizon']),
+        ]
+    
+    def __str__(self):
+        return f"Снимок баланса {self.user_id}: {self.amount} руб."
+    
+    @classmethod
+    def take(cls):
+        """
+        Создает новые снимки для пользователей, у которых появились записи
+        в журнале после предыдущего снимка. Возвращает число созданных снимков.
+        """
+        # Самая старая незавершенная транзакция: ее записи и записи более
+        # новых транзакций еще могут появиться и остаются в хвосте журнала
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+            xmin = cursor.fetchone()[0]
+        latest = cls.objects.filter(user=OuterRef('user')).order_by('-txid_horizon')
+        deltas = (
+            LedgerEntry.objects
+            .annotate(snapshot_xmin=Coalesce(Subquery(latest.values('txid_horizon')[:1]), 0))
+            .filter(txid__gte=F('snapshot_xmin'), txid__lt=xmin)
+            .values('user')
+            .annotate(delta=Sum(LedgerEntry.signed_amount()))
+        )
+        deltas = {row['user']: row['delta'] for row in deltas}
+        previous = {
+            snapshot.user_id: snapshot.amount
+            for snapshot in cls.objects.filter(user_id__in=deltas).order_by('user_id', '-txid_horizon').distinct('user_id')
+        }
+        cls.objects.bulk_create([
+            cls(user_id=user_id, amount=previous.get(user_id, 0) + delta, txid_horizon=xmin)
+            for user_id, delta in deltas.items()
+        ], batch_size=1000)
+        return len(deltas)
+
+
 class Subscription(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='subscription')
     is_active = models.BooleanField(default=True)
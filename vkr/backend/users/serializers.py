@@ -82,6 +82,7 @@ class CharitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Charity
         fields = '__all__'
+        select_related = ['user']
 
 
 class NotificationSerializer(serializers.ModelSerializer):
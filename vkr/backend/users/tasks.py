@@ -103,6 +103,18 @@ def send_notification_email(user_id, subject, message):
     return f"Уведомление отправлено на {user.email}"
 
 
+@shared_task
+def take_balance_snapshots():
+    """
+    Задача для периодических снимков балансов по журналу операций
+    """
+    from .models import BalanceSnapshot
+    
+    created = BalanceSnapshot.take()
+    
+    return f"Создано снимков балансов: {created}"
+
+
 def send_mailgun_email(subject, text, html, to_email):
     try:
         response = requests.post(
@@ -1,3 +1,45 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from .models import Balance, BalanceSnapshot, LedgerEntry, User
+
+
+class BalanceSnapshotTest(TransactionTestCase):
+    """Снимок и хвост журнала сходятся с балансом при незафиксированных записях"""
+
+    def test_uncommitted_entry_with_lower_id_is_not_lost(self):
+        buyer = User.objects.create_user(email='buyer@example.com', role=User.BUYER)
+        other = User.objects.create_user(email='other@example.com', role=User.BUYER)
+        Balance.credit(buyer.id, Decimal('100.00'), LedgerEntry.KIND_TOP_UP)
+
+        written = threading.Event()
+        release = threading.Event()
+
+        def slow_debit():
+            # Запись получает id раньше записи other, но фиксируется после снимка
+            try:
+                with transaction.atomic():
+                    Balance.debit(buyer.id, Decimal('30.00'), LedgerEntry.KIND_HOLD)
+                    written.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        worker = threading.Thread(target=slow_debit)
+        worker.start()
+        self.assertTrue(written.wait(10))
+        Balance.credit(other.id, Decimal('50.00'), LedgerEntry.KIND_TOP_UP)
+        self.assertEqual(BalanceSnapshot.take(), 1)
+        release.set()
+        worker.join()
+
+        BalanceSnapshot.take()
+        for user in (buyer, other):
+            self.assertEqual(LedgerEntry.balance_for(user.id), Balance.objects.get(user=user).amount)
+        self.assertEqual(LedgerEntry.balance_for(buyer.id), Decimal('70.00'))
+        self.assertEqual(
+            BalanceSnapshot.objects.filter(user=buyer).order_by('-txid_horizon').first().amount, Decimal('70.00')
+        )
@@ -28,6 +28,7 @@ from .serializers import (
     TopUpBalanceSerializer
 )
 from .tasks import send_verification_email
+from core.views import EagerLoadingMixin
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -155,7 +156,7 @@ class EmailVerificationView(APIView):
         )
 
 
-class CharityListCreateView(generics.ListCreateAPIView):
+class CharityListCreateView(EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = Charity.objects.all()
     serializer_class = CharitySerializer
     permission_classes = [IsAuthenticated]
@@ -200,7 +201,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CharityViewSet(viewsets.ModelViewSet):
+class CharityViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Charity.objects.all()
     serializer_class = CharitySerializer
     filter_backends = [filters.SearchFilter]
@@ -29,7 +29,7 @@ export default {
   
   // Получение списка всех благотворительных организаций
   getCharities() {
-    return apiClient.get('/charities/');
+    return apiClient.get('/users/charities/');
   },
   
   // Проверка токена верификации email
@@ -0,0 +1,50 @@
+import apiClient from './axios';
+
+// Списки API отдаются страницами {next, previous, results} (курсорная пагинация).
+// Непагинированный ответ (массив) считается единственной страницей.
+function toPage(data) {
+  if (!data || !Array.isArray(data.results)) {
+    return { items: data, next: null };
+  }
+  return { items: data.results, next: data.next };
+}
+
+// Загружает одну страницу: элементы и ссылку на следующую (null на последней)
+export async function fetchPage(firstPage) {
+  const { data } = await firstPage;
+  return toPage(data);
+}
+
+// Загружает следующую страницу по ссылке next из предыдущего ответа
+export function fetchNextPage(next) {
+  return fetchPage(apiClient.get(next));
+}
+
+// Ищет элемент списка, загружая страницы только до первого совпадения
+export async function findInPages(firstPage, predicate) {
+  let page = await fetchPage(firstPage);
+  for (;;) {
+    const found = Array.isArray(page.items) ? page.items.find(predicate) : undefined;
+    if (found || !page.next) {
+      return found;
+    }
+    page = await fetchNextPage(page.next);
+  }
+}
+
+// Загружает список целиком, переходя по ссылкам next. Только для списков,
+// небольших по построению (билеты пользователя): каталоги и ставки
+// загружаются постранично через fetchPage и fetchNextPage.
+export async function fetchAllPages(firstPage) {
+  let page = await fetchPage(firstPage);
+  if (!Array.isArray(page.items)) {
+    return page.items;
+  }
+
+  const items = [...page.items];
+  while (page.next) {
+    page = await fetchNextPage(page.next);
+    items.push(...page.items);
+  }
+  return items;
+}
@@ -1,12 +1,18 @@
 import { defineStore } from 'pinia';
 import auctionsApi from '../api/auctionsApi';
+import { fetchNextPage, fetchPage } from '../api/pagination';
 
 export const useAuctionsStore = defineStore('auctions', {
   state: () => ({
     auctions: [],
+    // Ссылки на следующие страницы списков (null, если загружено все)
+    auctionsNext: null,
     currentAuction: null,
     auctionEvents: [],
+    auctionEventsNext: null,
     loading: false,
+    // Догрузка следующей страницы не скрывает уже показанный список
+    loadingMore: false,
     error: null,
     $api: auctionsApi
   }),
@@ -15,6 +21,10 @@ export const useAuctionsStore = defineStore('auctions', {
     // Проверка наличия аукционов
     hasAuctions: (state) => state.auctions.length > 0,
     
+    // Есть ли еще не загруженные страницы
+    hasMoreAuctions: (state) => Boolean(state.auctionsNext),
+    hasMoreAuctionEvents: (state) => Boolean(state.auctionEventsNext),
+    
     // Фильтр активных аукционов
     activeAuctions: (state) => {
       const now = new Date();
@@ -26,15 +36,16 @@ export const useAuctionsStore = defineStore('auctions', {
   },
   
   actions: {
-    // Получение списка всех аукционов
+    // Получение первой страницы аукционов
     async fetchAuctions() {
       this.loading = true;
       this.error = null;
       
       try {
-        const response = await this.$api.getAuctions();
-        this.auctions = response.data;
-        return response.data;
+        const { items, next } = await fetchPage(this.$api.getAuctions());
+        this.auctions = items;
+        this.auctionsNext = next;
+        return this.auctions;
       } catch (error) {
         this.error = error.response?.data?.detail || 'Ошибка при загрузке аукционов';
         console.error('Error fetching auctions:', error);
@@ -44,6 +55,28 @@ export const useAuctionsStore = defineStore('auctions', {
       }
     },
     
+    // Догрузка следующей страницы аукционов
+    async fetchMoreAuctions() {
+      if (!this.auctionsNext) {
+        return this.auctions;
+      }
+      this.loadingMore = true;
+      this.error = null;
+      
+      try {
+        const { items, next } = await fetchNextPage(this.auctionsNext);
+        this.auctions = [...this.auctions, ...items];
+        this.auctionsNext = next;
+        return this.auctions;
+      } catch (error) {
+        this.error = error.response?.data?.detail || 'Ошибка при загрузке аукционов';
+        console.error('Error fetching more auctions:', error);
+        return null;
+      } finally {
+        this.loadingMore = false;
+      }
+    },
+    
     // Получение данных конкретного аукциона
     async fetchAuctionById(id) {
       this.loading = true;
@@ -68,9 +101,10 @@ export const useAuctionsStore = defineStore('auctions', {
       this.error = null;
       
       try {
-        const response = await this.$api.getAuctionEvents(auctionId);
-        this.auctionEvents = response.data;
-        return response.data;
+        const { items, next } = await fetchPage(this.$api.getAuctionEvents(auctionId));
+        this.auctionEvents = items;
+        this.auctionEventsNext = next;
+        return this.auctionEvents;
       } catch (error) {
         this.error = error.response?.data?.detail || 'Ошибка при загрузке событий аукциона';
         console.error(`Error fetching auction events for auction ID ${auctionId}:`, error);
@@ -80,6 +114,28 @@ export const useAuctionsStore = defineStore('auctions', {
       }
     },
     
+    // Догрузка следующей страницы событий аукциона
+    async fetchMoreAuctionEvents() {
+      if (!this.auctionEventsNext) {
+        return this.auctionEvents;
+      }
+      this.loadingMore = true;
+      this.error = null;
+      
+      try {
+        const { items, next } = await fetchNextPage(this.auctionEventsNext);
+        this.auctionEvents = [...this.auctionEvents, ...items];
+        this.auctionEventsNext = next;
+        return this.auctionEvents;
+      } catch (error) {
+        this.error = error.response?.data?.detail || 'Ошибка при загрузке событий аукциона';
+        console.error('Error fetching more auction events:', error);
+        return null;
+      } finally {
+        this.loadingMore = false;
+      }
+    },
+    
     // Создание нового аукциона
     async createAuction(formData) {
       this.loading = true;
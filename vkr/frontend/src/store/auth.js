@@ -1,6 +1,8 @@
 import { defineStore } from 'pinia';
 import { jwtDecode } from 'jwt-decode';
 import authApi from '../api/authApi';
+import apiClient from '../api/axios';
+import { fetchAllPages, findInPages } from '../api/pagination';
 import { useTicketsStore } from './ticketsStore';
 
 export const useAuthStore = defineStore('auth', {
@@ -121,11 +123,11 @@ async login(credentials) {
     if (this.user?.role === 'buyer') {
       try {
         // Загружаем билеты с сервера
-        const ticketsResponse = await apiClient.get('/auctions/tickets/');
-        if (ticketsResponse.data && Array.isArray(ticketsResponse.data)) {
+        const tickets = await fetchAllPages(apiClient.get('/auctions/tickets/'));
+        if (tickets && Array.isArray(tickets)) {
           // Сохраняем билеты в localStorage
-          localStorage.setItem('user_tickets', JSON.stringify(ticketsResponse.data));
-          console.log('Загружены билеты пользователя:', ticketsResponse.data);
+          localStorage.setItem('user_tickets', JSON.stringify(tickets));
+          console.log('Загружены билеты пользователя:', tickets);
         }
       } catch (err) {
         console.error('Error fetching user tickets:', err);
@@ -194,20 +196,18 @@ async fetchUserCharity() {
     
     // Проверяем, существует ли уже организация для этого пользователя
     try {
-      // Запрашиваем список всех организаций
-      const charitiesResponse = await authApi.getCharities();
-      const charities = charitiesResponse.data;
+      // Ищем организацию, связанную с текущим пользователем, в общем списке
+      // (страницы загружаются только до первого совпадения)
+      const userCharity = await findInPages(
+        authApi.getCharities(),
+        c => c.user && c.user.id === this.user.id
+      );
       
-      if (charities && Array.isArray(charities)) {
-        // Ищем организацию, связанную с текущим пользователем
-        const userCharity = charities.find(c => c.user && c.user.id === this.user.id);
-        
-        if (userCharity) {
-          this.userCharity = userCharity;
-          this.user.charity = userCharity;
-          console.log('Найдена организация из общего списка:', userCharity);
-          return userCharity;
-        }
+      if (userCharity) {
+        this.userCharity = userCharity;
+        this.user.charity = userCharity;
+        console.log('Найдена организация из общего списка:', userCharity);
+        return userCharity;
       }
     } catch (err) {
       console.error('Error fetching charities list:', err);
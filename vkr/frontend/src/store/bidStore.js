@@ -1,11 +1,17 @@
 import { defineStore } from 'pinia';
 import bidsApi from '../api/bidsApi';
+import { fetchNextPage, fetchPage, findInPages } from '../api/pagination';
 
 export const useBidStore = defineStore('bid', {
   state: () => ({
     bids: [],
     winnings: [],
+    // Ссылки на следующие страницы ставок и выигрышей (null, если загружено все)
+    bidsNext: null,
+    winningsNext: null,
     loading: false,
+    // Догрузка следующей страницы не скрывает уже показанный список
+    loadingMore: false,
     error: null,
     bidSuccess: false,
     bidMessage: '',
@@ -15,6 +21,10 @@ export const useBidStore = defineStore('bid', {
   }),
   
   getters: {
+    // Есть ли еще не загруженные страницы
+    hasMoreBids: (state) => Boolean(state.bidsNext),
+    hasMoreWinnings: (state) => Boolean(state.winningsNext),
+    
     // Сортированные ставки по дате (от новых к старым)
     sortedBids: (state) => {
       return [...state.bids].sort((a, b) => 
@@ -39,15 +49,16 @@ export const useBidStore = defineStore('bid', {
   },
   
   actions: {
-    // Получить все ставки пользователя
+    // Получить первую страницу ставок пользователя
     async fetchUserBids() {
       this.loading = true;
       this.error = null;
       
       try {
-        const response = await bidsApi.getUserBids();
-        this.bids = response.data;
-        return response.data;
+        const { items, next } = await fetchPage(bidsApi.getUserBids());
+        this.bids = items;
+        this.bidsNext = next;
+        return this.bids;
       } catch (error) {
         this.error = error.response?.data?.detail || 'Ошибка при получении ставок';
         console.error('Error fetching user bids:', error);
@@ -57,15 +68,16 @@ export const useBidStore = defineStore('bid', {
       }
     },
     
-    // Получить выигрыши пользователя
+    // Получить первую страницу выигрышей пользователя
     async fetchUserWinnings() {
       this.loading = true;
       this.error = null;
       
       try {
-        const response = await bidsApi.getUserWinnings();
-        this.winnings = response.data;
-        return response.data;
+        const { items, next } = await fetchPage(bidsApi.getUserWinnings());
+        this.winnings = items;
+        this.winningsNext = next;
+        return this.winnings;
       } catch (error) {
         this.error = error.response?.data?.detail || 'Ошибка при получении выигрышей';
         console.error('Error fetching user winnings:', error);
@@ -75,6 +87,44 @@ export const useBidStore = defineStore('bid', {
       }
     },
     
+    // Догрузить следующую страницу выигрышей
+    async fetchMoreWinnings() {
+      if (!this.winningsNext) {
+        return this.winnings;
+      }
+      this.loadingMore = true;
+      this.error = null;
+      
+      try {
+        const { items, next } = await fetchNextPage(this.winningsNext);
+        this.winnings = [...this.winnings, ...items];
+        this.winningsNext = next;
+        return this.winnings;
+      } catch (error) {
+        this.error = error.response?.data?.detail || 'Ошибка при получении выигрышей';
+        console.error('Error fetching more winnings:', error);
+        return null;
+      } finally {
+        this.loadingMore = false;
+      }
+    },
+    
+    // Найти выигрыш пользователя, загружая страницы до первого совпадения
+    async findWinning(predicate) {
+      this.loading = true;
+      this.error = null;
+      
+      try {
+        return await findInPages(bidsApi.getUserWinnings(), predicate);
+      } catch (error) {
+        this.error = error.response?.data?.detail || 'Ошибка при получении выигрышей';
+        console.error('Error searching user winnings:', error);
+        return null;
+      } finally {
+        this.loading = false;
+      }
+    },
+    
     // Создать новую ставку
     async createBid(lotId, amount) {
       this.loading = true;
@@ -246,14 +296,15 @@ export const useBidStore = defineStore('bid', {
       this.confirmationSuccess = false;
     },
     
-    // Получить ставки по конкретному лоту
+    // Получить первую страницу ставок по лоту (старшие ставки идут первыми)
     async fetchLotBids(lotId) {
       this.loading = true;
       this.error = null;
       try {
-        const response = await bidsApi.getLotBids(lotId);
-        this.bids = response.data;
-        return response.data;
+        const { items, next } = await fetchPage(bidsApi.getLotBids(lotId));
+        this.bids = items;
+        this.bidsNext = next;
+        return this.bids;
       } catch (error) {
         this.error = error.response?.data?.detail || 'Ошибка при получении ставок';
         console.error('Error fetching lot bids:', error);
@@ -263,6 +314,28 @@ export const useBidStore = defineStore('bid', {
       }
     },
     
+    // Догрузить следующую страницу ставок (пользователя или лота)
+    async fetchMoreBids() {
+      if (!this.bidsNext) {
+        return this.bids;
+      }
+      this.loadingMore = true;
+      this.error = null;
+      
+      try {
+        const { items, next } = await fetchNextPage(this.bidsNext);
+        this.bids = [...this.bids, ...items];
+        this.bidsNext = next;
+        return this.bids;
+      } catch (error) {
+        this.error = error.response?.data?.detail || 'Ошибка при получении ставок';
+        console.error('Error fetching more bids:', error);
+        return null;
+      } finally {
+        this.loadingMore = false;
+      }
+    },
+    
     // Получить транзакцию по ID
     async fetchTransactionById(transactionId) {
       this.loading = true;
@@ -1,12 +1,17 @@
 import { defineStore } from 'pinia';
 import lotsApi from '../api/lotsApi';
+import { fetchNextPage, fetchPage } from '../api/pagination';
 
 export const useLotsStore = defineStore('lots', {
   state: () => ({
     lots: [],
+    // Ссылка на следующую страницу лотов (null, если загружено все)
+    lotsNext: null,
     currentLot: null,
     categories: [],
     loading: false,
+    // Догрузка следующей страницы не скрывает уже показанный список
+    loadingMore: false,
     error: null,
     success: false
   }),
@@ -15,6 +20,9 @@ export const useLotsStore = defineStore('lots', {
     // Проверка наличия лотов
     hasLots: (state) => state.lots.length > 0,
     
+    // Есть ли еще не загруженные лоты
+    hasMoreLots: (state) => Boolean(state.lotsNext),
+    
     // Фильтр активных лотов
     activeLots: (state) => {
       return state.lots.filter(lot => lot.status === 'active');
@@ -27,15 +35,16 @@ export const useLotsStore = defineStore('lots', {
   },
   
   actions: {
-    // Получение списка всех лотов
+    // Получение первой страницы лотов
     async fetchLots(params = {}) {
       this.loading = true;
       this.error = null;
       
       try {
-        const response = await lotsApi.getLots(params);
-        this.lots = response.data;
-        return response.data;
+        const { items, next } = await fetchPage(lotsApi.getLots(params));
+        this.lots = items;
+        this.lotsNext = next;
+        return this.lots;
       } catch (error) {
         this.error = error.response?.data?.detail || 'Ошибка при загрузке лотов';
         console.error('Error fetching lots:', error);
@@ -45,7 +54,7 @@ export const useLotsStore = defineStore('lots', {
       }
     },
     
-    // Получение списка лотов по аукциону
+    // Получение первой страницы лотов аукциона
     async fetchLotsByAuction(auctionId) {
       this.loading = true;
       this.error = null;
@@ -59,14 +68,15 @@ export const useLotsStore = defineStore('lots', {
           return [];
         }
         
-        const response = await lotsApi.getLotsByAuction(auctionId);
+        const { items: lots, next } = await fetchPage(lotsApi.getLotsByAuction(auctionId));
         
         // Дополнительная проверка, что все лоты действительно принадлежат этому аукциону
-        const filteredLots = response.data.filter(lot => lot.auction == auctionId);
+        const filteredLots = lots.filter(lot => lot.auction == auctionId);
         
-        console.log(`Store: получено ${response.data.length} лотов, отфильтровано ${filteredLots.length} лотов`);
+        console.log(`Store: получено ${lots.length} лотов, отфильтровано ${filteredLots.length} лотов`);
         
         this.lots = filteredLots;
+        this.lotsNext = next;
         return filteredLots;
       } catch (error) {
         this.error = error.response?.data?.detail || 'Ошибка при загрузке лотов';
@@ -77,6 +87,28 @@ export const useLotsStore = defineStore('lots', {
       }
     },
     
+    // Догрузка следующей страницы лотов (каталога или аукциона)
+    async fetchMoreLots() {
+      if (!this.lotsNext) {
+        return this.lots;
+      }
+      this.loadingMore = true;
+      this.error = null;
+      
+      try {
+        const { items, next } = await fetchNextPage(this.lotsNext);
+        this.lots = [...this.lots, ...items];
+        this.lotsNext = next;
+        return this.lots;
+      } catch (error) {
+        this.error = error.response?.data?.detail || 'Ошибка при загрузке лотов';
+        console.error('Error fetching more lots:', error);
+        return null;
+      } finally {
+        this.loadingMore = false;
+      }
+    },
+    
     // Получение данных конкретного лота
     async fetchLotById(id) {
       this.loading = true;
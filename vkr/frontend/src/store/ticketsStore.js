@@ -1,5 +1,6 @@
 import { defineStore } from 'pinia';
 import apiClient from '../api/axios';
+import { fetchAllPages } from '../api/pagination';
 
 export const useTicketsStore = defineStore('tickets', {
   state: () => ({
@@ -18,8 +19,7 @@ export const useTicketsStore = defineStore('tickets', {
     async fetchUserTickets() {
       this.loading = true;
       try {
-        const response = await apiClient.get('/auctions/tickets/');
-        this.tickets = response.data;
+        this.tickets = await fetchAllPages(apiClient.get('/auctions/tickets/'));
         // Сохраняем в localStorage
         localStorage.setItem('user_tickets', JSON.stringify(this.tickets));
         return this.tickets;